@@ -0,0 +1,126 @@
+"""
+语法树的二进制格式：把语法分析得到的 AST（函数的返回类型已经由语法分析器标注在 returns 中）
+以 pickle 协议 5 序列化，载入比重新做词法和语法分析快得多。
+
+    文件头  b'PYLLAST\0' | 格式版本 | Python 主次版本号 | 源代码的 SHA-256 | 前端（词法、语法分析器）的 SHA-256
+    数据    pickle((源文件名, ast.Module))
+
+AST 与代码生成的选项（-O、--checked 等）无关，可以按源代码缓存，也可以由一个进程解析、另一个进程生成代码。
+载入时检查格式版本、Python 版本和前端的散列，前端修改后旧的文件自动失效。
+pickle 载入时可以执行任意代码，只应载入自己生成的文件。
+"""
+import ast
+import gc
+import hashlib
+import os
+import pickle
+import struct
+import sys
+import tempfile
+
+from parser import parse_source
+
+MAGIC = b'PYLLAST\0'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sHBB32s32s')
+
+# 决定 AST 内容的模块，任何一个修改后缓存都会失效
+FRONTEND_MODULES = ('Token.py', 'lexer.py', 'parser.py', 'symbol_table.py', 'astcache.py')
+
+_frontend_digest = None
+
+def frontend_digest():
+    global _frontend_digest
+    if _frontend_digest is None:
+        h = hashlib.sha256()
+        root = os.path.dirname(os.path.abspath(__file__))
+        for name in FRONTEND_MODULES:
+            with open(os.path.join(root, name), 'rb') as f:
+                h.update(f.read())
+        _frontend_digest = h.digest()
+    return _frontend_digest
+
+def source_digest(code):
+    return hashlib.sha256(code.encode('utf-8')).digest()
+
+def dumps(tree, filename, code):
+    """
+    序列化 parse_source 得到的 AST，返回 bytes。
+    """
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, sys.version_info[0], sys.version_info[1],
+                         source_digest(code), frontend_digest())
+    return header + pickle.dumps((filename, tree), protocol=5)
+
+def loads(data, code=None):
+    """
+    载入 dumps 的结果，返回（源文件名, AST）。给出 code 时还检查 AST 是否由这段源代码得到。
+    文件格式不对、已经失效或内容损坏时抛出 ValueError。
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("not a PyLL AST file")
+    magic, version, major, minor, source, frontend = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a PyLL AST file")
+    if version != FORMAT_VERSION or (major, minor) != sys.version_info[:2]:
+        raise ValueError(f"AST file format {version} for Python {major}.{minor} cannot be loaded "
+                         f"(expected format {FORMAT_VERSION} for Python {sys.version_info[0]}.{sys.version_info[1]})")
+    if frontend != frontend_digest():
+        raise ValueError("AST file was written by a different version of the parser")
+    if code is not None and source != source_digest(code):
+        raise ValueError("AST file does not match the source code")
+    # 载入时一次创建大量节点对象，暂停循环垃圾回收以免反复扫描它们（AST 中没有引用环）
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        # 截断或来源不明的 pickle 可能抛出几乎任何异常（AttributeError、ImportError、IndexError 等）
+        result = pickle.loads(memoryview(data)[HEADER.size:])
+    except Exception as e:
+        raise ValueError(f"corrupt AST file ({type(e).__name__}: {e})") from None
+    finally:
+        if enabled:
+            gc.enable()
+    if not (isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], str)
+            and isinstance(result[1], ast.Module)):
+        raise ValueError("corrupt AST file (no syntax tree in it)")
+    return result
+
+def dump(tree, filename, code, path):
+    # 先写临时文件再改名，并发的读者不会读到不完整的文件
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(suffix='.ast', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dumps(tree, filename, code))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+def load(path, code=None):
+    with open(path, 'rb') as f:
+        return loads(f.read(), code)
+
+def default_cache_dir():
+    cache = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache, 'pyll', 'ast')
+
+def parse_cached(code, filename='<input>', cache_dir=None):
+    """
+    与 parse_source 相同，但先在缓存目录中按（前端, 源代码）的散列查找已经解析过的 AST。
+    有错误的源代码不缓存；缓存目录不可写时照常解析。
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    key = hashlib.sha256(frontend_digest() + source_digest(code)).hexdigest()
+    path = os.path.join(cache_dir, key + '.ast')
+    try:
+        return load(path, code)[1]
+    except Exception:
+        # 缓存文件有任何问题都当作没有命中
+        pass
+    tree = parse_source(code, filename)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        dump(tree, filename, code, path)
+    except OSError:
+        pass
+    return tree
@@ -0,0 +1,47 @@
+"""
+表达式解析基准：深度嵌套的括号表达式、一元运算符链以及很长的平铺运算链。
+每个表达式作为赋值语句 x = <表达式> 解析，计入语句层的类型推断。
+
+    python bench/bench_expr.py [depth]
+
+逐层递归下降的解析器在这些输入上会超出 Python 的递归深度限制。
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lexer import Lexer
+from parser import Parser
+
+def cases(depth):
+    return {
+        'nested parens': '(' * depth + '1' + ' + 1)' * depth,
+        'right nested': '1 + (' * depth + '1' + ')' * depth,
+        'unary chain': '- ' * depth + '1',
+        'not chain': 'not ' * depth + '0',
+        'flat chain': ' + '.join(['1 * 2 % 3 - 4 // 5'] * depth),
+        'comparisons': ' and '.join(['1 < 2'] * depth),
+        'compare chain': ' < '.join(['1'] * depth),
+    }
+
+def bench(source, repeat=5):
+    tokens = Lexer('x = ' + source + '\n').tokenize()
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        Parser(tokens).assignment_statement()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(tokens), best
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print(f"depth = {depth}, recursion limit = {sys.getrecursionlimit()}")
+    for name, source in cases(depth).items():
+        count, best = bench(source)
+        print(f"{name:>14}: {count:>7} tokens  {best * 1000:8.2f} ms  {best / count * 1e9:7.1f} ns/token")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+按剖面优化的基准：插桩运行一次得到剖面，再分别以普通方式和按剖面编译，比较 JIT 运行 main 的时间。
+
+    python bench/bench_pgo.py [file.pyll] [-O N]
+
+缺省的 bench/branchy.pyll 在热循环中有一个很少走到的分支，分支里调用一个较大的函数：
+普通编译时它只有一个调用点，总是被内联进热循环；按剖面编译时它是冷的，热循环保持紧凑。
+"""
+import ctypes
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import llvmlite.binding as binding
+
+import pgo
+from codegen import MEMO_CAP, compile_tree
+from extension import load_runtime
+from optimize import target_machine
+from parser import parse_source
+
+# 执行引擎接管了共享的 target machine，销毁引擎会连同它一起释放，因此引擎一直保留到进程结束
+engines = []
+
+def jit_main(module):
+    engine = binding.create_mcjit_compiler(module, target_machine())
+    engines.append(engine)
+    engine.finalize_object()
+    return ctypes.CFUNCTYPE(ctypes.c_int)(engine.get_function_address('main'))
+
+def measure(mains, repeat=5):
+    # 程序的输出写到 /dev/null，只计 main 本身的时间；各版本交替运行，各取最快的一次
+    libc = ctypes.CDLL(None)
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    best = [None] * len(mains)
+    try:
+        for _ in range(repeat):
+            for i, main in enumerate(mains):
+                start = time.perf_counter()
+                main()
+                elapsed = time.perf_counter() - start
+                best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+        libc.fflush(None)
+    finally:
+        os.dup2(saved, 1)
+        os.close(saved)
+        os.close(devnull)
+    return best
+
+def main():
+    args = sys.argv[1:]
+    opt_level = 2
+    if '-O' in args:
+        i = args.index('-O')
+        opt_level = int(args[i + 1])
+        del args[i:i + 2]
+    source = args[0] if args else os.path.join(ROOT, 'bench', 'branchy.pyll')
+    with open(source, 'r', encoding='utf-8') as f:
+        tree = parse_source(f.read(), source)
+    load_runtime()
+    profile = pgo.train(tree, source, opt_level, MEMO_CAP, False)
+    plain, guided = measure([jit_main(compile_tree(tree, source, opt_level)),
+                             jit_main(compile_tree(tree, source, opt_level, profile=profile))])
+    print(f"-O{opt_level}: plain {plain * 1000:8.1f} ms  pgo {guided * 1000:8.1f} ms  speedup {plain / guided:.2f}x")
+
+if __name__ == '__main__':
+    main()
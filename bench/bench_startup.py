@@ -0,0 +1,100 @@
+"""
+启动开销基准：用 python -X importtime 统计命令行入口在各种短任务中的导入时间，并检查是否超出预算。
+
+    python bench/bench_startup.py [file.pyll]
+
+--tokens、--ast 和出错退出都不应该导入 llvmlite；超出预算或导入了 llvmlite 时以非零状态退出。
+预算只计编译器自身模块（本仓库中的 .py）的导入时间：argparse、re 等标准库模块的开销随机器和 Python 版本变化，
+计入预算会让检查在不同机器上时过时不过。
+"""
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+ENTRY = os.path.join(ROOT, 'PyLL.py')
+
+# 不需要代码生成的任务中编译器自身模块的导入时间预算（毫秒，各模块自身的时间之和，不含标准库）
+IMPORT_BUDGET_MS = 10
+
+# 编译器自身的模块
+OWN_MODULES = {name[:-3] for name in os.listdir(ROOT) if name.endswith('.py')}
+
+# 字节码缓存放在临时目录中，测量的是已经缓存过字节码的正常情况
+PYCACHE = os.path.join(tempfile.gettempdir(), 'pyll-bench-pycache')
+
+def importtime(args):
+    """
+    运行 PyLL.py（args 为 None 时只启动解释器）并解析 -X importtime 的输出，
+    返回（墙钟时间, 模块名 ->（嵌套深度, 自身时间, 累计时间）（微秒））。
+    """
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    command = [sys.executable, '-X', 'importtime', '-X', f'pycache_prefix={PYCACHE}']
+    command += ['-c', 'pass'] if args is None else [ENTRY] + args
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=tempfile.gettempdir(), env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+    imports = {}
+    for line in result.stderr.splitlines():
+        m = re.match(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)', line)
+        if m:
+            imports[m.group(4)] = (len(m.group(3)), int(m.group(1)), int(m.group(2)))
+    return elapsed, imports
+
+def measure(args, baseline):
+    """
+    多次运行，各项分别取最小值：返回（墙钟时间, 解释器启动之外的顶层导入的累计时间, 编译器自身模块的导入时间（毫秒）,
+    导入的模块名集合）。
+    """
+    elapsed = total = own = None
+    modules = set()
+    for _ in range(5):
+        run_elapsed, imports = importtime(args)
+        run_total = sum(cumulative for name, (depth, _, cumulative) in imports.items()
+                        if depth == 1 and name not in baseline) / 1000
+        run_own = sum(self_time for name, (_, self_time, _) in imports.items() if name in OWN_MODULES) / 1000
+        elapsed = run_elapsed if elapsed is None else min(elapsed, run_elapsed)
+        total = run_total if total is None else min(total, run_total)
+        own = run_own if own is None else min(own, run_own)
+        modules |= set(imports)
+    return elapsed, total, own, modules
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, 'test', 'if.pyll')
+    with tempfile.NamedTemporaryFile('w', suffix='.pyll', delete=False) as f:
+        f.write('x = 1 $ 2\n')
+        broken = f.name
+    output = os.path.join(tempfile.gettempdir(), 'bench_startup.ll')
+    tasks = {
+        '--tokens': ([source, '--tokens'], True),
+        '--ast': ([source, '--ast'], True),
+        'lexer error': ([broken], True),
+        'compile -O0': ([source, '-O0', '-o', output], False),
+        'compile -O2': ([source, '-o', output], False),
+    }
+    failed = False
+    try:
+        baseline = importtime(None)[1]
+        for name, (args, light) in tasks.items():
+            importtime(args)  # 预热字节码缓存
+            elapsed, imports, own, modules = measure(args, baseline)
+            llvmlite = any(m.startswith('llvmlite') for m in modules)
+            status = ''
+            if light and (llvmlite or own > IMPORT_BUDGET_MS):
+                status = '  IMPORTS LLVMLITE' if llvmlite else '  OVER BUDGET'
+                failed = True
+            print(f"{name:>12}: {elapsed * 1000:7.1f} ms total  {imports:6.1f} ms imports  {own:6.1f} ms compiler modules  "
+                  f"llvmlite {'yes' if llvmlite else 'no '}{status}")
+    finally:
+        os.unlink(broken)
+        if os.path.exists(output):
+            os.unlink(output)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import ast
+
+# 函数体不超过这么多条语句的函数视为小函数，总是内联
+INLINE_SIZE = 8
+
+MODULE = '<module>'     # 顶层代码（编译为 main）在调用图中的名字
+
+# 有副作用的内置函数
+IMPURE_BUILTINS = {'print'}
+
+def body_nodes(body):
+    """
+    遍历一段语句中的所有节点，但不进入嵌套的函数定义。
+    """
+    stack = list(reversed(body))
+    while stack:
+        node = stack.pop()
+        yield node
+        for child in ast.iter_child_nodes(node):
+            if not isinstance(child, ast.FunctionDef):
+                stack.append(child)
+
+class CallGraph:
+    """
+    用户函数之间的调用图，直接由语法树构建。
+    记录每个函数的调用点数量、函数体大小和递归关系，作为内联等过程间优化的决策依据。
+    """
+    def __init__(self, tree):
+        self.functions = {}     # 函数名 -> FunctionDef
+        self.callees = {}       # 函数名 -> {被调函数名: 调用点数量}
+        self.call_sites = {}    # 函数名 -> 被调用的调用点总数
+        self.sizes = {}         # 函数名 -> 函数体语句数
+
+        bodies = {MODULE: [st for st in tree.body if not isinstance(st, ast.FunctionDef)]}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef):
+                self.functions[node.name] = node
+                bodies[node.name] = node.body
+        for name in self.functions:
+            self.call_sites[name] = 0
+
+        for name, body in bodies.items():
+            callees = {}
+            size = 0
+            for node in body_nodes(body):
+                if isinstance(node, ast.stmt):
+                    size += 1
+                elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in self.functions:
+                    callee = node.func.id
+                    callees[callee] = callees.get(callee, 0) + 1
+                    self.call_sites[callee] += 1
+            self.callees[name] = callees
+            self.sizes[name] = size
+
+        self.recursive = {name for name in self.functions if self.reaches(name, name)}
+
+    def reaches(self, start, target):
+        # 判断从 start 出发（至少经过一次调用）能否到达 target
+        seen = set()
+        stack = list(self.callees.get(start, ()))
+        while stack:
+            name = stack.pop()
+            if name == target:
+                return True
+            if name not in seen:
+                seen.add(name)
+                stack.extend(self.callees.get(name, ()))
+        return False
+
+    def is_recursive(self, name):
+        return name in self.recursive
+
+    def should_inline(self, name):
+        """
+        非递归的小函数，或只有一个调用点的函数，内联后不会增大代码体积，总是内联。
+        """
+        if name not in self.functions or self.is_recursive(name):
+            return False
+        return self.sizes[name] <= INLINE_SIZE or self.call_sites[name] == 1
+
+    def impurity(self, name, visiting=None):
+        """
+        返回函数不是纯函数的原因，纯函数返回 None。
+        调用 print、给列表元素赋值或调用有副作用的函数都视为有副作用；递归调用按纯函数处理。
+        """
+        visiting = visiting if visiting is not None else set()
+        visiting.add(name)
+        for node in body_nodes(self.functions[name].body):
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+                callee = node.func.id
+                if callee in IMPURE_BUILTINS:
+                    return f"it calls {callee}()"
+                if callee in self.functions and callee not in visiting and self.impurity(callee, visiting):
+                    return f"it calls '{callee}', which has side effects"
+            elif isinstance(node, ast.Subscript) and isinstance(node.ctx, ast.Store):
+                return "it assigns to list elements"
+        return None
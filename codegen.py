@@ -0,0 +1,1777 @@
+"""
+代码生成：把语法分析得到的 AST 翻译为 LLVM IR，再交给 LLVM 校验和优化。
+导入本模块会加载 llvmlite，命令行入口（PyLL.py）只在真正需要生成代码时才导入它。
+"""
+import ast
+from llvm import *
+from errors import CompilerError
+from parser import parse_source
+from callgraph import CallGraph, body_nodes
+from escape import escaping_lists, readonly_lists, constant_elements, allocates, owning_variables, \
+    owning_strings, string_source, STACK_LIST_LIMIT
+from deadcode import eliminate_dead_code
+from typeinfer import NumericTypes, constant_type, is_update, join, may_overflow
+from constants import MEMO_CAP
+
+# 当前正在生成的 LLVM 模块，每次编译时由 compile_tree 重新创建
+llvm = None
+
+# 参数类型注解对应的 LLVM 参数类型：str / list 以（指针, 长度）两个参数传递，不复制数据
+PARAM_TYPES = {
+    'int': [Int],
+    'bool': [Bool],
+    'float': [Double],
+    'str': [PChar, Int],
+    'list': [PInt, Int],
+    'dict': [PDict],
+}
+
+RETURN_TYPES = {
+    'int': Int,
+    'bool': Bool,
+    'float': Double,
+}
+
+# 比较运算符对应的 icmp / fcmp 谓词
+COMPARE_OPS = {
+    ast.Gt: '>', ast.GtE: '>=', ast.Lt: '<', ast.LtE: '<=', ast.Eq: '==', ast.NotEq: '!=',
+}
+
+# prange 循环最多分成这么多块，每块各保存一份归约变量的部分结果
+PRANGE_CHUNKS = 64
+
+def is_memo(func):
+    return any(decorator.id == 'memo' for decorator in func.decorator_list)
+
+class Visitor(ast.NodeVisitor):
+    def __init__(self, func_name, filename, arg_names=(), typ=None, arg_kinds=None):
+        self.filename = filename  # 存储文件名以在错误中引用
+        if func_name in llvm.functions:
+            # 函数已经定义，检查是否重定义
+            existing_func = llvm.functions[func_name]
+            if typ:
+                existing_typ = (existing_func.return_type, [arg.type for arg in existing_func.func.args])
+                if existing_typ != typ:
+                    # 函数签名不同，抛出重定义错误
+                    raise CompilerError(f"Function '{func_name}' is already defined with a different signature.", 
+                                       filename, 0, 0)  # 如果可以获取 node 信息，请在调用处传递
+            self.func = existing_func
+        else:
+            return_type, arg_types = typ if typ else (Void, [])
+            func_type = ir.FunctionType(return_type, arg_types)
+            llvm_func = ir.Function(llvm.module, func_type, name=func_name)
+            self.func = Function(llvm_func, True)
+            self.func.param_kinds = arg_kinds
+            llvm.functions[func_name] = self.func
+        self.list_lengths = {}      # 用于跟踪列表变量的长度（编译期已知时为 int，否则为保存长度的 Variable）
+        self.string_lengths = {}    # 用于跟踪字符串变量的长度（同上）
+        self.var_types = {}         # 用于跟踪变量类型
+        self.numeric_types = {}     # 类型推断为数值变量选择的类型（i1 / i32 / i64 / double）
+        self.string_names = set()   # 类型推断认出的字符串变量
+        self.counters = set()       # 类型推断认出的受循环条件约束的计数器加减，在 32 位中计算
+        self.function_types = {}    # 用户函数名 -> 函数体的 NumericTypes，在 visit_Module 中推断
+        self.result_type = None     # 正在求值的表达式最终要存入的类型，整数运算至少在这个宽度上进行
+        self.call_graph = None      # 整个程序的调用图，在 visit_Module 中构建
+        self.memo_cap = MEMO_CAP    # @memo 函数缓存的容量上限
+        self.checked = False        # 检查模式：整数溢出和除零在运行时报错，而不是静默回绕
+        self.export = False         # 扩展模式：用户函数对外可见并使用 C 调用约定，供 Python 直接调用
+        self.profile = None         # 插桩构建（--instrument）时为 instrument.Instrumentation，在各计数点生成计数器
+        self.pgo = None             # 按剖面优化（--profile-use）时为 pgo.ProfileUse，给条件跳转和函数加上执行次数
+        self.escaping = set()       # 会逃逸的列表字面量，每次求值都在堆上分配
+        self.readonly = set()       # 从不被写入的列表字面量，元素全是常量时直接使用全局常量
+        self.heap_lists = {}        # 不逃逸的大列表字面量 -> 在函数入口从堆上分配、返回前释放的存储
+        self.owned = {}             # 引用堆上存储（切片、拼接结果、字典字面量、逃逸的列表字面量）的变量 -> 保存这块存储的栈槽
+        self.owned_groups = {}      # 上述变量 -> 互相赋值、共用存储的同组变量名，存储在组内没有变量再引用时释放
+        self.arg_names = list(arg_names)
+        self.arg_kinds = arg_kinds or ['int'] * len(arg_names)
+        self.bind_args(self.arg_names, self.arg_kinds)
+        # 用户函数的参数保存完毕后跳转到函数体；自尾递归调用会更新参数并跳回 body 块，而不是真的发起调用
+        self.body_block = None
+        if arg_kinds is not None:
+            self.body_block = self.func.getBlock('body')
+            self.func.builder.branch(self.body_block)
+            self.func.builder.position_at_end(self.body_block)
+
+    def bind_args(self, arg_names, arg_kinds):
+        # 把参数保存到栈上的变量中，使参数可以像普通变量一样被重新赋值
+        llvm_args = iter(self.func.func.args)
+        for name, kind in zip(arg_names, arg_kinds):
+            value = next(llvm_args)
+            self.func.alloc(name, value, value.type)
+            self.var_types[name] = value.type
+            if kind in ('str', 'list'):
+                length = next(llvm_args)
+                self.func.alloc(name + '.len', length)
+                lengths = self.string_lengths if kind == 'str' else self.list_lengths
+                lengths[name] = self.func.var[name + '.len']
+            if kind == 'str':
+                # 参数不拥有字符串的缓冲区，第一次追加时才复制
+                self.func.alloc(name + '.cap', ir.Constant(Int, 0))
+
+    def length_of(self, var_name):
+        length = self.list_lengths[var_name] if var_name in self.list_lengths else self.string_lengths[var_name]
+        if isinstance(length, int):
+            return ir.Constant(Int, length)
+        return length.load()
+
+    def int(self, value):
+        # bool（i1）参与整数运算时扩展为 i32
+        if value.type == Bool:
+            return self.func.builder.zext(value, Int)
+        return value
+
+    def convert(self, value, typ):
+        """
+        数值类型之间的转换：整数之间按符号扩展或截断（bool / 字符按无符号扩展），整数与 double 之间按有符号转换。
+        非数值（指针等）原样返回。
+        """
+        b = self.func.builder
+        if value.type == typ or not isinstance(typ, (ir.IntType, ir.DoubleType)):
+            return value
+        if typ == Bool:
+            return self.bool(value)
+        if value.type == Double:
+            return b.fptosi(value, typ)
+        if not isinstance(value.type, ir.IntType):
+            return value
+        unsigned = value.type in (Bool, Char)
+        if typ == Double:
+            return b.uitofp(value, typ) if unsigned else b.sitofp(value, typ)
+        if value.type.width > typ.width:
+            return b.trunc(value, typ)
+        return b.zext(value, typ) if unsigned else b.sext(value, typ)
+
+    def narrow(self, value, typ, node):
+        """
+        把数值存入 typ 类型的位置（i32 的列表元素、字典的值、签名固定为 i32 的参数）。i64 的值存入 i32 时
+        先检查范围，超出时报告 OverflowError，而不是静默截断；检查模式下 double 转为整数（int()、浮点数实参）
+        也检查范围，NaN 和超出范围的值报告 OverflowError。其余情况与 convert 相同。
+        """
+        b = self.func.builder
+        if value.type == Long and isinstance(typ, ir.IntType) and typ not in (Long, Bool):
+            if isinstance(value, ir.Constant):
+                # 常量在编译时就能判断
+                if not -2 ** (typ.width - 1) <= value.constant < 2 ** (typ.width - 1):
+                    self.error(f"Integer {value.constant} does not fit in {typ.width} bits.", node)
+                return ir.Constant(typ, value.constant)
+            fits = b.icmp_signed('==', b.sext(b.trunc(value, typ), Long), value)
+            self.check(b.not_(fits), f"OverflowError: integer does not fit in {typ.width} bits", node)
+        elif self.checked and value.type == Double and isinstance(typ, ir.IntType) and typ != Bool:
+            # fptosi 向零取整，(MIN - 1, MAX + 1) 之内的值取整后都在范围内；与 NaN 的有序比较不成立
+            low, high = ir.Constant(Double, -2.0 ** (typ.width - 1) - 1), ir.Constant(Double, 2.0 ** (typ.width - 1))
+            fits = b.and_(b.fcmp_ordered('>', value, low), b.fcmp_ordered('<', value, high))
+            self.check(b.not_(fits), f"OverflowError: float does not fit in {typ.width} bits", node)
+        return self.convert(value, typ)
+
+    def arith_type(self, a, b):
+        # 二元运算的结果类型：有 double 时为 double，有 i64 时（或结果要存入 i64 变量时）为 i64，否则为 i32
+        if Double in (a, b):
+            return Double
+        if Long in (a, b, self.result_type):
+            return Long
+        return Int
+
+    def visit_as(self, node, typ):
+        # 求值一个结果将存入 typ 类型的表达式：s = s + a[i] * k 中的乘法在 s 是 i64 时也按 i64 计算
+        saved, self.result_type = self.result_type, typ
+        try:
+            return self.visit(node)
+        finally:
+            self.result_type = saved
+
+    # 定义错误处理方法
+    def error(self, msg, node):
+        raise CompilerError(msg, self.filename, node.lineno, node.col_offset)
+
+    # 将不支持的功能调用转换为详细错误
+    def not_supports(self, msg, node):
+        self.error(f"Compiler doesn't support {msg}.", node)
+
+    def bool(self, value):
+        if value.type == Bool: 
+            return value
+        if value.type == Double:
+            return self.func.builder.fcmp_ordered('!=', value, ir.Constant(Double, 0.0))
+        return self.func.builder.icmp_signed('!=', value, ir.Constant(value.type, 0))
+
+    def visit_Module(self, node):
+        self.call_graph = CallGraph(node)
+        self.infer_numeric_types(node)
+        self.hoist_lists([st for st in node.body if not isinstance(st, ast.FunctionDef)])
+        self.visit_body(node.body)
+        if not self.func.builder.block.is_terminated:
+            self.ret(ir.Constant(Int, 0))
+
+    def visit_body(self, body):
+        # 依次生成一段语句；当前块已经以 return 等终结指令结束时，其后的语句不可达，不再生成（函数定义除外）
+        for stmt in body:
+            if self.func.builder.block.is_terminated and not isinstance(stmt, ast.FunctionDef):
+                continue
+            if self.profile is not None and not isinstance(stmt, ast.FunctionDef):
+                self.profile.count(self.func, 'line', stmt)
+            self.visit(stmt)
+
+    def infer_numeric_types(self, node):
+        """
+        在生成代码前按定义顺序推断各函数变量和返回值的数值类型，最后推断顶层代码。
+        函数必须先定义后使用，因此推断某个函数时，它调用的函数的返回类型都已知。
+        int 参数还要能容纳调用处传入的值：有调用处传入 i64 的实参时参数放宽为 i64，这又可能改变其他函数的类型，
+        因此反复推断直到没有参数再放宽。@memo 函数和扩展模式下的函数签名固定为 i32，传入的 i64 实参在运行时检查范围，
+        @memo 函数的返回值同样固定为 i32，返回 i64 的值时检查范围。
+        递归函数推断时先假定返回声明的类型，返回类型放宽后同样重新推断。
+        """
+        functions = self.call_graph.functions
+        widened = {name: set() for name in functions}
+        returns = {name: RETURN_TYPES.get(func.returns.id) for name, func in functions.items() if func.returns is not None}
+        changed = True
+        while changed:
+            changed = False
+            scopes = []
+            for name, func in functions.items():
+                params = {}
+                strings = []
+                widenable = []
+                for arg in func.args.args:
+                    kind = arg.annotation.id if arg.annotation else 'int'
+                    if kind in RETURN_TYPES:
+                        params[arg.arg] = Long if arg.arg in widened[name] else RETURN_TYPES[kind]
+                        if kind == 'int' and self.has_wide_params(func):
+                            widenable.append(arg.arg)
+                    elif kind == 'str':
+                        strings.append(arg.arg)
+                types = NumericTypes(func.body, params, returns, strings, widenable)
+                self.function_types[name] = types
+                scopes.append((name, types))
+                if func.returns is not None:
+                    declared = RETURN_TYPES.get(func.returns.id)
+                    # 整数返回值可能需要放宽为 i64，@memo 函数的缓存值固定为 i32
+                    typ = declared if declared != Int or is_memo(func) else join(Int, types.returns)
+                    if typ != returns[name]:
+                        returns[name] = typ
+                        changed = True
+            body = [st for st in node.body if not isinstance(st, ast.FunctionDef)]
+            top = NumericTypes(body, functions=returns)
+            scopes.append((None, top))
+
+            for caller, types in scopes:
+                for callee, args, arg_types in types.calls():
+                    if callee not in functions or not self.has_wide_params(functions[callee]):
+                        continue
+                    for param, arg, typ in zip(functions[callee].args.args, args, arg_types):
+                        if param.annotation is not None and param.annotation.id != 'int':
+                            continue
+                        if callee == caller and typ == Int and is_update(param.arg, arg):
+                            # 自递归调用相当于循环：由参数自身递增得到的实参（sum_to(n - 1, acc + n)）与循环中的累加一样放宽
+                            typ = Long
+                        if typ == Long and param.arg not in widened[callee]:
+                            widened[callee].add(param.arg)
+                            changed = True
+        self.numeric_types = top.types
+        self.string_names = top.strings
+        self.counters = top.counters
+
+    def has_wide_params(self, func):
+        # @memo 的缓存键和扩展模式导出的 C 签名都是 i32，这些函数的 int 参数不放宽
+        return not self.export and not is_memo(func)
+
+    def hoist_lists(self, body):
+        """
+        在生成函数体之前做逃逸分析，并在入口为不逃逸的大列表分配堆存储，为引用堆上存储的变量分配初值为空的栈槽。
+        必须事先全部分配：函数体中任何一处返回都要释放它们，包括出现在这些列表之前的返回。
+        """
+        params = list(zip(self.arg_names, self.arg_kinds))
+        self.escaping = escaping_lists(body, params, self.func.func.name)
+        self.readonly = readonly_lists(body)
+        for node in body_nodes(body):
+            if isinstance(node, ast.List) and node not in self.escaping and len(node.elts) > STACK_LIST_LIMIT \
+                    and not (node in self.readonly and constant_elements(node)):
+                list_new = llvm.runtime('list_new', (PInt, [Int]))
+                self.heap_lists[node] = self.func.entry_call(list_new, [ir.Constant(Int, len(node.elts))])
+
+        def owned_slot(builder, name, typ):
+            slot = builder.alloca(typ, name=f'{name}.owned')
+            builder.store(ir.Constant(typ, None), slot)
+            return slot
+        non_lists = set(self.numeric_types) | self.string_names
+        owners = owning_variables(body, non_lists, params, self.func.func.name, self.escaping)
+        owners.update(owning_strings(body, self.string_names, params, self.func.func.name))
+        for name in sorted(owners):
+            kind, self.owned_groups[name] = owners[name]
+            typ = {'dict': PDict, 'str': PChar}.get(kind, PInt)
+            self.owned[name] = self.func.at_entry(lambda builder, name=name, typ=typ: owned_slot(builder, name, typ))
+
+    def replace_owned(self, var_name, ptr=None):
+        # 变量改为引用另一个列表或字典：ptr 是它新引用的堆上存储（不是时为 None），之前引用的存储没有同组变量再引用时释放
+        if var_name not in self.owned:
+            return
+        b = self.func.builder
+        slot = self.owned[var_name]
+        old = b.load(slot)
+        b.store(ptr if ptr is not None else ir.Constant(slot.type.pointee, None), slot)
+        self.release_unreferenced([(old, self.owned_groups[var_name])])
+
+    def owned_value(self, var_name):
+        # 变量当前引用的堆上存储，赋给同组的另一个变量时两者共同持有
+        return self.func.builder.load(self.owned[var_name]) if var_name in self.owned else None
+
+    def release_unreferenced(self, olds):
+        """
+        olds 是（不再被某个变量引用的存储, 同组的变量名）的列表：释放其中没有同组变量仍在引用、
+        也不与列表中前面的存储相同的那些。比较和选择不新建基本块，空指针的释放什么也不做。
+        """
+        b = self.func.builder
+        for i, (old, group) in enumerate(olds):
+            others = [b.load(self.owned[name]) for name in group] + [value for value, _ in olds[:i]]
+            if others:
+                held = b.icmp_unsigned('==', old, others[0])
+                for other in others[1:]:
+                    held = b.or_(held, b.icmp_unsigned('==', old, other))
+                old = b.select(held, ir.Constant(old.type, None), old)
+            self.release(old)
+
+    def free_temporary(self, node, ptr, copy=True):
+        # list_value(node, copy) 新分配的缓冲区、作为实参的逃逸列表字面量或字典字面量创建的字典、
+        # 以及拼接和 str() 新生成的字符串用完后立即释放
+        if ptr.type == PChar:
+            if self.fresh_string(ptr):
+                self.release(ptr)
+        elif allocates(node, copy) or node in self.escaping:
+            self.release(ptr)
+
+    def fresh_string(self, ptr):
+        # string_value 返回的指针是否是运行时刚在堆上分配（或映射）、还没有变量持有的缓冲区
+        return isinstance(ptr, ir.CallInstr) and ptr.callee.name in ('str_concat', 'str_from_i64', 'str_from_f64',
+                                                                     'read_bytes')
+
+    def string_owner(self, node, ptr):
+        # 字符串表达式的值所在的堆上缓冲区：新生成的缓冲区本身，或与之共用缓冲区的变量持有的缓冲区，不在堆上时为 None
+        if self.fresh_string(ptr):
+            return ptr
+        source = string_source(node)
+        return self.owned_value(source) if source is not None else None
+
+    def release(self, ptr):
+        if ptr.type == PDict:
+            self.func.builder.call(llvm.runtime('dict_free', (Void, [PDict])), [ptr])
+        elif ptr.type == PChar:
+            self.func.builder.call(llvm.runtime('str_free', (Void, [PChar])), [ptr])
+        else:
+            self.func.builder.call(llvm.runtime('list_free', (Void, [PInt])), [ptr])
+
+    def visit_FunctionDef(self, node):
+        # 检查函数是否已经定义，以及是否与程序入口或运行时库的函数同名
+        if node.name == 'main' or node.name in runtime_names():
+            self.error(f"Function name '{node.name}' is reserved, please choose another name.", node)
+        if node.name in llvm.functions:
+            self.error(f"Function '{node.name}' is already defined.", node)
+        
+        args = [arg.arg for arg in node.args.args]
+        # 参数类型取自类型注解（缺省为 int），返回类型由语法分析阶段根据 return 语句推断
+        arg_kinds = [arg.annotation.id if arg.annotation else 'int' for arg in node.args.args]
+        arg_types = []
+        param_types = self.function_types[node.name].types
+        for name, kind in zip(args, arg_kinds):
+            if kind not in PARAM_TYPES:
+                self.not_supports(f'parameter type "{kind}"', node)
+            # int 参数按类型推断的结果可能是 i64
+            arg_types.extend([param_types[name]] if kind == 'int' else PARAM_TYPES[kind])
+        if node.returns is None:
+            return_type = Void
+        elif node.returns.id in RETURN_TYPES:
+            return_type = RETURN_TYPES[node.returns.id]
+            if return_type == Int and not is_memo(node):
+                # 返回累加结果等 i64 值的函数返回 i64
+                return_type = join(Int, self.function_types[node.name].returns)
+        else:
+            self.not_supports(f'return type "{node.returns.id}"', node)
+        memo = is_memo(node)
+        if memo:
+            self.check_memo(node, arg_kinds, return_type)
+        # @memo 函数的函数体编译为 <name>.impl，<name> 本身是查询缓存的包装函数，递归调用也会经过缓存
+        visitor = Visitor(node.name + '.impl' if memo else node.name, self.filename, args, (return_type, arg_types), arg_kinds)
+        visitor.call_graph = self.call_graph
+        visitor.memo_cap = self.memo_cap
+        visitor.checked = self.checked
+        visitor.export = self.export
+        visitor.profile = self.profile
+        visitor.pgo = self.pgo
+        visitor.numeric_types = self.function_types[node.name].types
+        visitor.string_names = self.function_types[node.name].strings
+        visitor.counters = self.function_types[node.name].counters
+        visitor.hoist_lists(node.body)
+
+        # 用户函数只在模块内可见并使用 fastcc 调用约定，LLVM 可以自由地内联、特化或删除它们；
+        # 扩展模式下保留外部链接和 C 调用约定（@memo 函数导出的是包装函数）
+        llvm_func = visitor.func.func
+        if memo or not self.export:
+            llvm_func.linkage = 'internal'
+            llvm_func.calling_convention = 'fastcc'
+        llvm_func.attributes.add('nounwind')
+        # 有执行剖面时按调用次数决定是否内联（见 pgo.py）
+        if self.pgo is not None:
+            self.pgo.annotate_function(llvm_func, self.call_graph.should_inline(node.name))
+        elif self.call_graph.should_inline(node.name):
+            llvm_func.attributes.add('alwaysinline')
+        if memo:
+            self.memo_wrapper(node.name, visitor.func)
+
+        if self.profile is not None:
+            self.profile.count(visitor.func, 'entry', node)
+        visitor.visit_body(node.body)
+        # 函数末尾没有 return 时补上默认返回值
+        if not visitor.func.builder.block.is_terminated:
+            visitor.ret(None)
+
+    def check_memo(self, node, arg_kinds, return_type):
+        # 只有参数都是 int / bool、有返回值且没有副作用的函数，缓存结果才不改变程序行为
+        for kind in arg_kinds:
+            if kind not in ('int', 'bool'):
+                self.error(f"Function '{node.name}' cannot be memoized: parameter type '{kind}' is not int or bool.", node)
+        if return_type == Void:
+            self.error(f"Function '{node.name}' cannot be memoized: it does not return a value.", node)
+        if return_type not in (Int, Bool):
+            self.error(f"Function '{node.name}' cannot be memoized: its return value does not fit in an int.", node)
+        reason = self.call_graph.impurity(node.name)
+        if reason:
+            self.error(f"Function '{node.name}' cannot be memoized: {reason}.", node)
+
+    def memo_wrapper(self, name, impl):
+        """
+        生成 @memo 函数的包装函数：以参数为键查询运行时的缓存表，命中时直接返回，
+        否则调用真正的函数体并把结果存入缓存。缓存表在第一次存入时由运行时分配。
+        """
+        func_type = impl.func.function_type
+        wrapper = Function(ir.Function(llvm.module, func_type, name=name), True)
+        wrapper.param_kinds = impl.param_kinds
+        llvm.functions[name] = wrapper
+        llvm_func = wrapper.func
+        if not self.export:
+            llvm_func.linkage = 'internal'
+            llvm_func.calling_convention = 'fastcc'
+        llvm_func.attributes.add('nounwind')
+
+        table = ir.GlobalVariable(llvm.module, PChar, name=f"{name}.memo")
+        table.linkage = 'internal'
+        table.initializer = ir.Constant(PChar, None)
+        lookup = llvm.runtime('memo_lookup', (Int, [ir.PointerType(PChar), PInt, Int, PInt]))
+        store = llvm.runtime('memo_store', (Void, [ir.PointerType(PChar), PInt, Int, Int, Int]))
+
+        b = wrapper.builder
+        nargs = ir.Constant(Int, len(llvm_func.args))
+        keys = wrapper.entry_alloca(ir.ArrayType(Int, len(llvm_func.args)), 'memo.keys')
+        cached = wrapper.entry_alloca(Int, 'memo.value')
+        for i, arg in enumerate(llvm_func.args):
+            key = b.zext(arg, Int) if arg.type == Bool else arg
+            b.store(key, b.gep(keys, [ir.Constant(Int, 0), ir.Constant(Int, i)], inbounds=True))
+        keys = b.gep(keys, [ir.Constant(Int, 0), ir.Constant(Int, 0)], inbounds=True, name='memo.key_ptr')
+
+        hit_block = wrapper.getBlock('memo.hit')
+        miss_block = wrapper.getBlock('memo.miss')
+        found = b.call(lookup, [table, keys, nargs, cached])
+        b.cbranch(b.icmp_signed('!=', found, ir.Constant(Int, 0)), hit_block, miss_block)
+
+        b.position_at_end(hit_block)
+        value = b.load(cached)
+        b.ret(b.trunc(value, Bool) if func_type.return_type == Bool else value)
+
+        b.position_at_end(miss_block)
+        result = b.call(impl.func, llvm_func.args)
+        value = b.zext(result, Int) if result.type == Bool else result
+        b.call(store, [table, keys, nargs, value, ir.Constant(Int, self.memo_cap)])
+        b.ret(result)
+
+    def visit_Constant(self, node):
+        # bool 是 int 的子类，必须先判断
+        if isinstance(node.value, bool):
+            return ir.Constant(Bool, int(node.value))
+        elif isinstance(node.value, int):
+            # 超出 32 位范围的整数常量使用 i64
+            if not -2 ** 63 <= node.value < 2 ** 63:
+                self.not_supports('integers wider than 64 bits', node)
+            return ir.Constant(constant_type(node.value), node.value)
+        elif isinstance(node.value, float):
+            return ir.Constant(Double, node.value)
+        elif isinstance(node.value, str):
+            # 创建一个全局字符串常量
+            str_val = node.value + '\0'  # 以空字符结尾
+            str_bytes = bytearray(str_val.encode("utf8"))
+            str_type = ir.ArrayType(Char, len(str_bytes))
+            global_name = f"str_{len(llvm.module.global_values)}"
+            global_str = ir.GlobalVariable(llvm.module, str_type, name=global_name)
+            global_str.global_constant = True
+            global_str.initializer = ir.Constant(str_type, str_bytes)
+            return global_str  # 返回全局数组
+        else:
+            self.not_supports(f'Constant type {type(node.value)}', node)
+
+    def visit_Name(self, node):
+        if node.id in self.func.var:
+            return self.func.var[node.id].load()
+        self.error(f"Undefined variable '{node.id}'.", node)
+
+    def visit_Assign(self, node):
+        if len(node.targets) > 1: 
+            self.not_supports('Multiple variable assignment', node)
+        target = node.targets[0]
+        if isinstance(target, ast.Subscript):
+            base = self.visit(target.value)
+            if base.type == PDict:
+                return self.dict_call('set', base, target.slice, [self.dict_value(node.value)])
+            index = self.visit(target.slice)
+            # 确定 base 的类型
+            base_type = base.type.pointee
+            if isinstance(base_type, ir.ArrayType):
+                # 如果 base 是数组指针，则使用两个索引
+                elt_ptr = self.func.builder.gep(base, [ir.Constant(Int, 0), index], inbounds=True, name="elt_ptr")
+            elif isinstance(base_type, ir.IntType):
+                # 如果 base 是字符串指针（i8*）或列表参数（i32*），则使用一个索引
+                elt_ptr = self.func.builder.gep(base, [index], inbounds=True, name="elt_ptr")
+            else:
+                self.not_supports(f'Unsupported subscript type: {base_type}', node)
+            value = self.narrow(self.visit(node.value), elt_ptr.type.pointee, node.value)
+            self.func.builder.store(value, elt_ptr)
+        elif isinstance(target, ast.Name):
+            var_name = target.id
+            if isinstance(node.value, ast.List):
+                list_alloc = self.visit(node.value)
+                array_type = ir.ArrayType(Int, len(node.value.elts))
+                pArray = ir.PointerType(array_type)
+                self.func.alloc(var_name, list_alloc, pArray)
+                # 逃逸的字面量每次求值都新分配存储，由变量（及其同组的变量）持有
+                self.replace_owned(var_name, self.func.builder.bitcast(list_alloc, PInt) if node.value in self.escaping else None)
+                self.list_lengths[var_name] = len(node.value.elts)
+                self.var_types[var_name] = pArray
+            elif self.is_list_expression(node.value):
+                # 切片或拼接得到的新列表，长度在运行时才知道；变量持有新分配的缓冲区，先求值再释放旧的
+                ptr, length = self.list_value(node.value)
+                self.replace_owned(var_name, ptr if allocates(node.value) else None)
+                self.func.alloc(var_name, ptr, PInt)
+                self.func.alloc(var_name + '.len', length)
+                self.list_lengths[var_name] = self.func.var[var_name + '.len']
+                self.var_types[var_name] = PInt
+            elif isinstance(node.value, ast.Name) and node.value.id in self.list_lengths:
+                rhs = self.visit(node.value)  # 获取 x 的指针
+                self.replace_owned(var_name, self.owned_value(node.value.id))
+                self.func.alloc(var_name, rhs, rhs.type)
+                self.list_lengths[var_name] = self.list_lengths[node.value.id]
+                self.var_types[var_name] = rhs.type
+            elif self.is_string_expression(node.value):
+                self.assign_string(var_name, node.value)
+            else:
+                # 数值变量统一使用类型推断选出的类型（重新赋值时与已有的变量类型一致）
+                if var_name in self.func.var:
+                    typ = self.func.var[var_name].type
+                else:
+                    typ = self.numeric_types.get(var_name)
+                rhs = self.narrow(self.visit_as(node.value, typ), typ, node.value)
+                if isinstance(node.value, ast.Dict):
+                    # 变量持有字典字面量新建的字典，先求值再释放旧的
+                    self.replace_owned(var_name, rhs)
+                elif isinstance(node.value, ast.Name):
+                    self.replace_owned(var_name, self.owned_value(node.value.id))
+                self.func.alloc(var_name, rhs, rhs.type)
+                self.var_types[var_name] = rhs.type
+        else:
+            self.not_supports(f'Unsupported assignment target type: {type(target).__name__}', node)
+
+    def assign_string(self, var_name, value):
+        """
+        给字符串变量赋值。字符串变量的长度保存在 <name>.len 中，<name>.cap 是它独占的缓冲区容量。
+        s = s + x（以及 s = s + x + y）使用运行时的构建器在原缓冲区末尾追加，容量按两倍增长，
+        循环中反复追加的总开销是线性的；其他赋值都让变量放弃缓冲区（容量置 0），
+        因此不会有两个变量同时向同一个缓冲区追加。
+        堆上的缓冲区与列表一样由引用它的变量（包括指向其中的切片）共同持有，没有变量再引用时释放。
+        """
+        b = self.func.builder
+        parts = self.appended_parts(var_name, value)
+        if parts and var_name + '.cap' in self.func.var:
+            append = llvm.runtime('str_append', (PChar, [PChar, Int, PInt, PChar, Int]))
+            ptr = self.func.var[var_name].load()
+            length = self.length_of(var_name)
+            for part in parts:
+                part_ptr, part_length = self.string_value(part)
+                grown = b.call(append, [ptr, length, self.func.var[var_name + '.cap'].addr, part_ptr, part_length])
+                if var_name in self.owned:
+                    # 构建器换用了新的缓冲区时，变量改为持有新缓冲区
+                    self.replace_owned(var_name, b.select(b.icmp_unsigned('==', grown, ptr),
+                                                          b.load(self.owned[var_name]), grown))
+                self.free_temporary(part, part_ptr)
+                ptr = grown
+                length = b.add(length, part_length)
+        else:
+            ptr, length = self.string_value(value)
+            self.replace_owned(var_name, self.string_owner(value, ptr))
+        self.func.alloc(var_name, ptr, PChar)
+        self.func.alloc(var_name + '.len', length)
+        if not parts:
+            self.func.alloc(var_name + '.cap', ir.Constant(Int, 0))
+        self.string_lengths[var_name] = self.func.var[var_name + '.len']
+        self.var_types[var_name] = PChar
+
+    def appended_parts(self, var_name, value):
+        # value 形如 var_name + a + b + ... 时返回 [a, b, ...]，否则返回 None
+        parts = []
+        while isinstance(value, ast.BinOp) and isinstance(value.op, ast.Add):
+            parts.insert(0, value.right)
+            value = value.left
+        if isinstance(value, ast.Name) and value.id == var_name and var_name in self.string_lengths:
+            return parts
+        return None
+
+    def visit_UnaryOp(self, node):
+        oprnd = self.visit(node.operand)
+        b = self.func.builder
+        if isinstance(node.op, ast.USub):
+            if oprnd.type == Double:
+                return b.fneg(oprnd)
+            oprnd = self.int(oprnd)
+            if self.checked:
+                # -MIN 溢出
+                pair = b.ssub_with_overflow(ir.Constant(oprnd.type, 0), oprnd)
+                self.check(b.extract_value(pair, 1), f"OverflowError: integer result does not fit in {oprnd.type.width} bits", node)
+                return b.extract_value(pair, 0)
+            return b.neg(oprnd)
+        elif isinstance(node.op, ast.Not):
+            return b.not_(self.bool(oprnd))
+        else:
+            self.not_supports(f'"{node.op.__class__.__name__}" Operator', node)
+
+    def visit_BinOp(self, node):
+        if self.is_string_expression(node):
+            # 拼接的结果需要同时带上长度，由 string_value 求值
+            self.not_supports('string concatenation outside an assignment, comparison, print(), len() or call argument', node)
+        op1 = self.visit(node.left)
+        op2 = self.visit(node.right)
+        b = self.func.builder
+        # 两个操作数统一为较宽的类型
+        typ = self.arith_type(op1.type, op2.type)
+        if typ == Int and may_overflow(node) and node not in self.counters:
+            # 两个 32 位整数的和、差、积可能超出 32 位，在 i64 中计算，存入 32 位的位置时再检查范围
+            typ = Long
+        op1, op2 = self.convert(op1, typ), self.convert(op2, typ)
+        if typ == Double:
+            return self.float_binop(node, op1, op2)
+        if self.checked:
+            if isinstance(node.op, (ast.Add, ast.Sub, ast.Mult)):
+                return self.checked_arith(node, op1, op2)
+            if isinstance(node.op, (ast.FloorDiv, ast.Mod)):
+                op2 = self.check_divisor(node, op1, op2)
+        if isinstance(node.op, ast.Add):
+            return b.add(op1, op2)
+        elif isinstance(node.op, ast.Sub):
+            return b.sub(op1, op2)
+        elif isinstance(node.op, ast.Mult):
+            return b.mul(op1, op2)
+        elif isinstance(node.op, ast.Mod):
+            # Python 的取模结果与除数同号
+            rem = b.srem(op1, op2)
+            return b.select(self.floor_adjust(rem, op2), b.add(rem, op2), rem)
+        elif isinstance(node.op, ast.FloorDiv):
+            # Python 的整除向负无穷取整
+            quot = b.sdiv(op1, op2)
+            rem = b.srem(op1, op2)
+            return b.select(self.floor_adjust(rem, op2), b.sub(quot, ir.Constant(quot.type, 1)), quot)
+        else:
+            self.not_supports(f'"{node.op.__class__.__name__}" Operator', node)
+
+    def checked_arith(self, node, op1, op2):
+        """
+        检查模式下的加减乘：使用 llvm.s*.with.overflow，结果不溢出时与普通运算一样快，溢出时报告 OverflowError。
+        """
+        b = self.func.builder
+        if isinstance(node.op, ast.Add):
+            pair = b.sadd_with_overflow(op1, op2)
+        elif isinstance(node.op, ast.Sub):
+            pair = b.ssub_with_overflow(op1, op2)
+        else:
+            pair = b.smul_with_overflow(op1, op2)
+        self.check(b.extract_value(pair, 1), f"OverflowError: integer result does not fit in {op1.type.width} bits", node)
+        return b.extract_value(pair, 0)
+
+    def check_divisor(self, node, op1, op2):
+        # 除数为 0 时报告 ZeroDivisionError；MIN // -1 溢出，MIN % -1 在 LLVM 中未定义（结果应为 0），改为对 1 取模
+        b = self.func.builder
+        typ = op2.type
+        self.check(b.icmp_signed('==', op2, ir.Constant(typ, 0)), "ZeroDivisionError: integer division or modulo by zero", node)
+        overflow = b.and_(b.icmp_signed('==', op1, ir.Constant(typ, -2 ** (typ.width - 1))),
+                          b.icmp_signed('==', op2, ir.Constant(typ, -1)))
+        if isinstance(node.op, ast.FloorDiv):
+            self.check(overflow, f"OverflowError: integer result does not fit in {typ.width} bits", node)
+            return op2
+        return b.select(overflow, ir.Constant(typ, 1), op2)
+
+    def float_binop(self, node, op1, op2):
+        b = self.func.builder
+        if self.checked and isinstance(node.op, (ast.FloorDiv, ast.Mod)):
+            message = 'float floor division by zero' if isinstance(node.op, ast.FloorDiv) else 'float modulo'
+            self.check(b.fcmp_ordered('==', op2, ir.Constant(Double, 0.0)), f"ZeroDivisionError: {message}", node)
+        if isinstance(node.op, ast.Add):
+            return b.fadd(op1, op2)
+        elif isinstance(node.op, ast.Sub):
+            return b.fsub(op1, op2)
+        elif isinstance(node.op, ast.Mult):
+            return b.fmul(op1, op2)
+        elif isinstance(node.op, ast.FloorDiv):
+            floor = llvm.module.declare_intrinsic('llvm.floor', [Double])
+            return b.call(floor, [b.fdiv(op1, op2)])
+        elif isinstance(node.op, ast.Mod):
+            # frem 的结果与被除数同号，Python 的结果与除数同号
+            rem = b.frem(op1, op2)
+            zero = ir.Constant(Double, 0.0)
+            adjust = b.and_(b.fcmp_ordered('!=', rem, zero),
+                            b.icmp_unsigned('!=', b.fcmp_ordered('<', rem, zero), b.fcmp_ordered('<', op2, zero)))
+            return b.select(adjust, b.fadd(rem, op2), rem)
+        else:
+            self.not_supports(f'"{node.op.__class__.__name__}" Operator', node)
+
+    def floor_adjust(self, rem, divisor):
+        # 余数非零且与除数异号时，截断除法的结果需要向负无穷修正
+        b = self.func.builder
+        zero = ir.Constant(rem.type, 0)
+        return b.and_(b.icmp_signed('!=', rem, zero), b.icmp_signed('<', b.xor(rem, divisor), zero))
+
+    def visit_BoolOp(self, node):
+        oprnds = [self.bool(self.visit(i)) for i in node.values]
+        res = oprnds[0]
+        b = self.func.builder
+
+        if isinstance(node.op, ast.And):
+            s = b.and_
+        elif isinstance(node.op, ast.Or):
+            s = b.or_
+        else:
+            self.not_supports(f'"{node.op.__class__.__name__}" Operator', node)
+
+        for i in range(1, len(oprnds)):
+            res = s(res, oprnds[i])
+        return res
+
+    def visit_Compare(self, node):
+        if isinstance(node.ops[0], ast.In):
+            if len(node.comparators) > 1:
+                self.not_supports('Chained "in" comparison', node)
+            return self.visit_In(node)
+        # 链式比较 a < b < c 按 a < b and b < c 计算：每个操作数只求值一次，与 and 一样各个比较都会求值
+        operands = [node.left] + node.comparators
+        strings = [self.is_string_expression(operand) for operand in operands]
+        if any(strings) and not all(strings) and len(operands) > 2:
+            self.not_supports('Chained comparison of strings and other values', node)
+        if all(strings):
+            values = [self.string_value(operand) for operand in operands]
+            temporaries = [(operand, value[0]) for operand, value in zip(operands, values)]
+        else:
+            values = [self.visit(operand) for operand in operands]
+        b = self.func.builder
+        result = None
+        for i, op_node in enumerate(node.ops):
+            op = COMPARE_OPS.get(type(op_node))
+            if op is None:
+                self.not_supports(f'Unsupported comparison operator: {type(op_node).__name__}', node)
+            if all(strings):
+                compared = self.compare_strings(op, values[i], values[i + 1])
+            else:
+                compared = self.compare_values(op, values[i], values[i + 1], node)
+            result = compared if result is None else b.and_(result, compared)
+        if all(strings):
+            for operand, ptr in temporaries:
+                self.free_temporary(operand, ptr)
+        return result
+
+    def compare_values(self, op, op1, op2, node):
+        b = self.func.builder
+        if op1.type != op2.type:
+            # 不同的数值类型统一为较宽的类型再比较（bool 与整数比较时扩展为整数）
+            typ = self.arith_type(op1.type, op2.type)
+            op1, op2 = self.convert(op1, typ), self.convert(op2, typ)
+
+        # 根据类型选择比较指令
+        if op1.type == Double:
+            return b.fcmp_ordered(op, op1, op2)
+        elif op1.type in (Char, Bool) or isinstance(op1.type, ir.PointerType):
+            # 字符和 bool 按无符号比较
+            return b.icmp_unsigned(op, op1, op2)
+        elif isinstance(op1.type, ir.IntType):
+            return b.icmp_signed(op, op1, op2)
+        else:
+            self.not_supports(f'Unsupported type for comparison: {op1.type}', node)
+
+    def compare_strings(self, op, left_value, right_value):
+        # 字符串按字典序比较：运行时返回负数、0 或正数，再与 0 比较
+        left, left_length = left_value
+        right, right_length = right_value
+        compare = llvm.runtime('str_compare', (Int, [PChar, Int, PChar, Int]))
+        result = self.func.builder.call(compare, [left, left_length, right, right_length])
+        return self.func.builder.icmp_signed(op, result, ir.Constant(Int, 0))
+
+    def visit_In(self, node):
+        # k in d：查询字典中是否有这个键
+        container = self.visit(node.comparators[0])
+        if container.type != PDict:
+            self.not_supports('"in" on values other than dict', node)
+        found = self.dict_call('has', container, node.left, [])
+        self.free_temporary(node.comparators[0], container)
+        return self.func.builder.icmp_signed('!=', found, ir.Constant(Int, 0))
+
+    def visit_Call(self, node):
+        if node.keywords: 
+            self.not_supports('Keyword arguments', node)
+        if not isinstance(node.func, ast.Name):
+            self.not_supports('Unsupported function call type', node)
+        func_id = node.func.id
+        if func_id == 'len':
+            if len(node.args) != 1:
+                self.not_supports('len() takes exactly one argument', node)
+            arg = node.args[0]
+            if isinstance(arg, ast.Name):
+                var_name = arg.id
+                if var_name in self.list_lengths or var_name in self.string_lengths:
+                    return self.length_of(var_name)
+                elif self.var_types.get(var_name) == PDict:
+                    return self.func.builder.call(llvm.runtime('dict_len', (Int, [PDict])), [self.visit(arg)])
+                else:
+                    self.not_supports(f'Length of variable "{var_name}" is not known.', node)
+            elif self.is_list_expression(arg):
+                ptr, length = self.list_value(arg, copy=False)
+                self.free_temporary(arg, ptr, copy=False)
+                return length
+            elif self.is_string_expression(arg):
+                ptr, length = self.string_value(arg)
+                self.free_temporary(arg, ptr)
+                return length
+            else:
+                self.not_supports('len() argument is not a variable.', node)
+        elif func_id == 'sum':
+            if len(node.args) != 1:
+                self.not_supports('sum() with more than one argument', node)
+            ptr, length = self.list_value(node.args[0], copy=False)
+            result = self.reduce_list(ptr, length, 'sum', node)
+            self.free_temporary(node.args[0], ptr, copy=False)
+            return result
+        elif func_id in ('min', 'max'):
+            if not node.args:
+                self.error(f"{func_id}() expected at least 1 argument, got 0.", node)
+            if len(node.args) == 1:
+                ptr, length = self.list_value(node.args[0], copy=False)
+                result = self.reduce_list(ptr, length, func_id, node)
+                self.free_temporary(node.args[0], ptr, copy=False)
+                return result
+            # min(a, b, ...)：逐个比较并选择
+            b = self.func.builder
+            values = [self.visit(arg) for arg in node.args]
+            typ = Int
+            for value in values:
+                typ = self.arith_type(typ, value.type)
+            values = [self.convert(value, typ) for value in values]
+            op = '<' if func_id == 'min' else '>'
+            result = values[0]
+            for value in values[1:]:
+                less = b.fcmp_ordered(op, value, result) if typ == Double else b.icmp_signed(op, value, result)
+                result = b.select(less, value, result)
+            return result
+        elif func_id in ('int', 'float'):
+            if len(node.args) != 1:
+                self.not_supports(f'{func_id}() with {len(node.args)} arguments', node)
+            value = self.visit(node.args[0])
+            if func_id == 'float':
+                return self.convert(value, Double)
+            # int() 截断小数部分，double 的整数部分可能超出 32 位，转换为 i64；已经是 i64 的整数保持不变
+            if value.type == Double:
+                return self.narrow(value, Long, node)
+            return value if value.type == Long else self.convert(value, Int)
+        elif func_id == 'str':
+            self.not_supports('str() outside an assignment, comparison, print(), len() or call argument', node)
+        elif func_id in ('read_ints', 'read_bytes'):
+            self.not_supports(f'{func_id}() outside an assignment, len() or call argument', node)
+        elif func_id == 'print':
+            if len(node.args) != 1:
+                self.not_supports('print() with multiple arguments.', node)
+            arg = node.args[0]
+            if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                # 打印字符串
+                str_global = self.visit(arg)
+                # 获取字符串的指针
+                ptr = self.func.builder.gep(str_global, [ir.Constant(Int, 0), ir.Constant(Int, 0)], inbounds=True, name="str_ptr")
+                return self.func.builder.call(llvm.getFunction('print_str'), [ptr])
+            elif self.is_string_expression(arg):
+                # 运行时生成的字符串不以 NUL 结尾，按长度打印
+                print_strn = llvm.runtime('print_strn', (Void, [PChar, Int]))
+                ptr, length = self.string_value(arg)
+                call = self.func.builder.call(print_strn, [ptr, length])
+                self.free_temporary(arg, ptr)
+                return call
+            else:
+                # 假设是整数或字符
+                value = self.visit(arg)
+                if value.type == Int:
+                    return self.func.builder.call(llvm.getFunction('print_i32'), [value])
+                elif value.type == Long:
+                    return self.func.builder.call(llvm.runtime('print_i64', (Void, [Long])), [value])
+                elif value.type == Double:
+                    return self.func.builder.call(llvm.runtime('print_f64', (Void, [Double])), [value])
+                elif value.type == Bool:
+                    # 与 str() 一样打印 True / False
+                    print_strn = llvm.runtime('print_strn', (Void, [PChar, Int]))
+                    return self.func.builder.call(print_strn, list(self.bool_string(value)))
+                elif value.type == Char:
+                    # 需要实现打印字符的函数
+                    # 暂时使用 print_i32 将字符作为整数打印
+                    return self.func.builder.call(llvm.getFunction('print_i32'), [self.func.builder.zext(value, Int)])
+                elif value.type == PChar:
+                    return self.func.builder.call(llvm.getFunction('print_str'), [value])
+                else:
+                    self.not_supports(f'Unsupported print argument type: {value.type}', node)
+        else:
+            # 处理其他函数调用
+            try:
+                callee = llvm.functions[func_id]
+            except KeyError:
+                self.not_supports(f'Call to undefined function "{func_id}".', node)
+            arg_kinds = callee.param_kinds or ['int'] * len(node.args)
+            if len(arg_kinds) != len(node.args):
+                self.error(f"Function '{func_id}' takes {len(arg_kinds)} argument(s) but {len(node.args)} were given.", node)
+            param_types = callee.func.function_type.args
+            args = []
+            temporaries = []
+            for arg, kind in zip(node.args, arg_kinds):
+                values = self.call_argument(arg, kind, node, param_types[len(args)])
+                if kind == 'list' and self.is_list_expression(arg) or kind in ('dict', 'str'):
+                    # 被调函数不能保存列表、字典和字符串参数，作为实参的切片、拼接结果、逃逸的列表字面量、
+                    # 字典字面量和新生成的字符串在调用返回后释放
+                    temporaries.append((arg, values[0]))
+                args.extend(values)
+            call = self.func.builder.call(callee.func, args)
+            for arg, ptr in temporaries:
+                self.free_temporary(arg, ptr)
+            return call
+
+    def call_argument(self, arg, kind, node, typ):
+        """
+        按形参的类型准备实参：str / list 传递数据指针和长度（不复制数据），bool / int 按需转换，
+        typ 是（第一个）LLVM 参数的类型。
+        """
+        b = self.func.builder
+        if kind == 'int':
+            return [self.narrow(self.visit(arg), typ, arg)]
+        if kind == 'float':
+            return [self.convert(self.visit(arg), Double)]
+        if kind == 'dict':
+            # 字典按引用传递，被调函数的修改对调用者可见
+            value = self.visit(arg)
+            if value.type != PDict:
+                self.not_supports('passing this expression as a dict argument', node)
+            return [value]
+        if kind == 'bool':
+            return [self.bool(self.visit(arg))]
+        if kind == 'str' and self.is_string_expression(arg):
+            return list(self.string_value(arg))
+        if kind == 'list' and self.is_list_expression(arg):
+            return list(self.list_value(arg))
+        lengths = self.string_lengths if kind == 'str' else self.list_lengths
+        if not isinstance(arg, ast.Name) or arg.id not in lengths:
+            self.not_supports(f'passing this expression as a {kind} argument', node)
+        ptr = self.visit(arg)
+        if isinstance(ptr.type.pointee, ir.ArrayType):
+            # [N x T]* 退化为指向首元素的指针
+            ptr = b.gep(ptr, [ir.Constant(Int, 0), ir.Constant(Int, 0)], inbounds=True, name=f"{kind}_ptr")
+        return [ptr, self.length_of(arg.id)]
+
+    def is_list_expression(self, node):
+        # 结果是一个新列表的表达式：列表字面量、切片、拼接、read_ints()
+        if isinstance(node, ast.List):
+            return True
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'read_ints':
+            return True
+        if isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Slice):
+            return isinstance(node.value, ast.Name) and node.value.id in self.list_lengths
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            return all(self.is_list_expression(side) or (isinstance(side, ast.Name) and side.id in self.list_lengths)
+                       for side in (node.left, node.right))
+        return False
+
+    def is_string_expression(self, node):
+        # 结果是字符串的表达式：字符串字面量、字符串变量，以及它们的拼接、切片和 str()、read_bytes()
+        if isinstance(node, ast.Constant):
+            return isinstance(node.value, str)
+        if isinstance(node, ast.Name):
+            return node.id in self.string_lengths
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            return self.is_string_expression(node.left) or self.is_string_expression(node.right)
+        if isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Slice):
+            return isinstance(node.value, ast.Name) and node.value.id in self.string_lengths
+        return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in ('str', 'read_bytes')
+
+    def string_value(self, node):
+        """
+        求字符串表达式的值，返回（i8* 指针, 长度）。字符串的长度总是单独传递，内容不一定以 NUL 结尾。
+        字符串不可变，切片和下标直接指向原字符串而不复制；拼接和 str() 的结果由运行时在堆上分配。
+        """
+        b = self.func.builder
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            ptr = b.gep(self.visit(node), [ir.Constant(Int, 0), ir.Constant(Int, 0)], inbounds=True, name="str_ptr")
+            return ptr, ir.Constant(Int, len(node.value.encode("utf8")))
+        if isinstance(node, ast.Name) and node.id in self.string_lengths:
+            return self.visit(node), self.length_of(node.id)
+        if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) and node.value.id in self.string_lengths:
+            if isinstance(node.slice, ast.Slice):
+                start, length = self.slice_bounds(node.slice, self.length_of(node.value.id))
+            else:
+                # 与字符串拼接的 s[i] 是只含一个字符的字符串
+                start, length = self.convert(self.visit(node.slice), Long), ir.Constant(Int, 1)
+            return b.gep(self.visit(node.value), [start], inbounds=True, name="str_ptr"), length
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            left, left_length = self.string_value(node.left)
+            right, right_length = self.string_value(node.right)
+            concat = llvm.runtime('str_concat', (PChar, [PChar, Int, PChar, Int]))
+            ptr = b.call(concat, [left, left_length, right, right_length])
+            self.free_temporary(node.left, left)
+            self.free_temporary(node.right, right)
+            return ptr, b.add(left_length, right_length)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'str':
+            return self.str_value(node)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'read_bytes':
+            return self.map_file(node, PChar)
+        self.not_supports('this expression as a string', node)
+
+    def bool_string(self, value):
+        # bool 的字符串形式 "True" / "False"（指针, 长度）
+        b = self.func.builder
+        true, true_length = self.string_value(ast.Constant(value='True'))
+        false, false_length = self.string_value(ast.Constant(value='False'))
+        return b.select(value, true, false), b.select(value, true_length, false_length)
+
+    def str_value(self, node):
+        # str(x)：整数和浮点数由运行时格式化，bool 选择 "True" / "False"，字符串原样返回
+        if len(node.args) != 1:
+            self.not_supports(f'str() with {len(node.args)} arguments', node)
+        arg = node.args[0]
+        if self.is_string_expression(arg) or (isinstance(arg, ast.Subscript) and isinstance(arg.value, ast.Name)
+                                              and arg.value.id in self.string_lengths):
+            return self.string_value(arg)
+        b = self.func.builder
+        value = self.visit(arg)
+        if value.type == Bool:
+            return self.bool_string(value)
+        if value.type == Double:
+            format = llvm.runtime('str_from_f64', (PChar, [Double, PInt]))
+        elif isinstance(value.type, ir.IntType):
+            format = llvm.runtime('str_from_i64', (PChar, [Long, PInt]))
+            value = self.convert(value, Long)
+        else:
+            self.not_supports(f'str() of type {value.type}', node)
+        length = self.func.entry_alloca(Int, 'str.len')
+        return b.call(format, [value, length]), b.load(length)
+
+    def map_file(self, node, typ):
+        """
+        read_ints(path) / read_bytes(path)：运行时把文件映射到内存，返回（数据指针, 元素个数），长度在运行时才知道。
+        映射是私有的，结果可以像其他列表一样修改，但不会写回文件。映射与新分配的列表和字符串一样由持有它的变量释放。
+        """
+        if len(node.args) != 1:
+            self.not_supports(f'{node.func.id}() with {len(node.args)} arguments', node)
+        b = self.func.builder
+        path, path_length = self.string_value(node.args[0])
+        read = llvm.runtime(node.func.id, (typ, [PChar, Int, PInt, Int]))
+        length = self.func.entry_alloca(Int, f'{node.func.id}.len')
+        ptr = b.call(read, [path, path_length, length, ir.Constant(Int, node.lineno)])
+        self.free_temporary(node.args[0], path)
+        return ptr, b.load(length)
+
+    def list_pointer(self, var_name):
+        # 列表变量指向首元素的 i32* 指针，[N x i32]* 退化为首元素指针
+        ptr = self.func.var[var_name].load()
+        if isinstance(ptr.type.pointee, ir.ArrayType):
+            ptr = self.func.builder.gep(ptr, [ir.Constant(Int, 0), ir.Constant(Int, 0)], inbounds=True, name="list_ptr")
+        return ptr
+
+    def list_value(self, node, copy=True):
+        """
+        求列表表达式的值，返回（i32* 数据指针, 长度）。
+        copy 为 False 时只读取结果（sum / min / max / len），切片直接指向原列表而不复制；
+        否则切片和拼接的结果由运行时在堆上分配。
+        """
+        b = self.func.builder
+        if isinstance(node, ast.Name) and node.id in self.list_lengths:
+            return self.list_pointer(node.id), self.length_of(node.id)
+        if isinstance(node, ast.List):
+            ptr = b.gep(self.visit(node), [ir.Constant(Int, 0), ir.Constant(Int, 0)], inbounds=True, name="list_ptr")
+            return ptr, ir.Constant(Int, len(node.elts))
+        if isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Slice) and isinstance(node.value, ast.Name) \
+                and node.value.id in self.list_lengths:
+            src = self.list_pointer(node.value.id)
+            start, length = self.slice_bounds(node.slice, self.length_of(node.value.id))
+            ptr = b.gep(src, [start], inbounds=True, name="slice_ptr")
+            if copy:
+                ptr = b.call(llvm.runtime('list_copy', (PInt, [PInt, Int])), [ptr, length])
+            return ptr, length
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            left, left_length = self.list_value(node.left, copy=False)
+            right, right_length = self.list_value(node.right, copy=False)
+            concat = llvm.runtime('list_concat', (PInt, [PInt, Int, PInt, Int]))
+            result = b.call(concat, [left, left_length, right, right_length])
+            # a + b + c 的中间结果只用于这次拼接
+            self.free_temporary(node.left, left, copy=False)
+            self.free_temporary(node.right, right, copy=False)
+            return result, b.add(left_length, right_length)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'read_ints':
+            return self.map_file(node, PInt)
+        self.not_supports('this expression as a list', node)
+
+    def slice_bounds(self, node, length):
+        # 按 Python 的规则计算切片的起点和长度：负下标从末尾算起，越界的下标截断到 [0, len]
+        if node.step is not None:
+            self.not_supports('slices with a step', node)
+        b = self.func.builder
+        zero = ir.Constant(Int, 0)
+
+        def bound(expr, default):
+            if expr is None:
+                return default
+            # i64 的下标先在 64 位中截断到 [0, len]，之后一定在 i32 的范围内
+            value = self.visit(expr)
+            typ = Long if value.type == Long else Int
+            value = self.convert(value, typ)
+            size, low = self.convert(length, typ), ir.Constant(typ, 0)
+            value = b.select(b.icmp_signed('<', value, low), b.add(value, size), value)
+            value = b.select(b.icmp_signed('<', value, low), low, value)
+            return self.convert(b.select(b.icmp_signed('>', value, size), size, value), Int)
+
+        start = bound(node.lower, zero)
+        stop = bound(node.upper, length)
+        count = b.sub(stop, start)
+        return start, b.select(b.icmp_signed('<', count, zero), zero, count)
+
+    def reduce_list(self, ptr, length, op, node):
+        """
+        sum / min / max 编译为一个计数循环，累加器放在 phi 中，循环体没有分支，LLVM 可以将其向量化。
+        """
+        b = self.func.builder
+        zero = ir.Constant(Int, 0)
+        if op == 'sum':
+            # 在 i64 中累加，避免大列表求和溢出
+            init = ir.Constant(Long, 0)
+        else:
+            # 空列表的 min / max 是运行时错误
+            self.check(b.icmp_signed('==', length, zero), f"ValueError: {op}() arg is an empty sequence", node)
+            init = ir.Constant(Int, 2 ** 31 - 1 if op == 'min' else -2 ** 31)
+
+        entry_block = b.block
+        loop_block = self.func.getBlock(f'{op}.loop')
+        end_block = self.func.getBlock(f'{op}.end')
+        b.cbranch(b.icmp_signed('>', length, zero), loop_block, end_block)
+
+        b.position_at_end(loop_block)
+        index = b.phi(Int, name='i')
+        acc = b.phi(init.type, name='acc')
+        value = b.load(b.gep(ptr, [index], inbounds=True))
+        if op == 'sum':
+            result = b.add(acc, b.sext(value, Long))
+        else:
+            result = b.select(b.icmp_signed('<' if op == 'min' else '>', value, acc), value, acc)
+        next_index = b.add(index, ir.Constant(Int, 1))
+        index.add_incoming(zero, entry_block)
+        index.add_incoming(next_index, loop_block)
+        acc.add_incoming(init, entry_block)
+        acc.add_incoming(result, loop_block)
+        b.cbranch(b.icmp_signed('<', next_index, length), loop_block, end_block)
+
+        b.position_at_end(end_block)
+        total = b.phi(init.type, name=op)
+        total.add_incoming(init, entry_block)
+        total.add_incoming(result, loop_block)
+        return total
+
+    def check(self, failed, message, node):
+        # 条件成立时报告运行时错误；出错分支标记为极少执行，正常路径上只多一次比较和跳转
+        b = self.func.builder
+        fail_block = self.func.getBlock('check.fail')
+        ok_block = self.func.getBlock('check.ok')
+        b.cbranch(failed, fail_block, ok_block).set_weights([1, 1000])
+        b.position_at_end(fail_block)
+        self.runtime_error(message, node)
+        b.position_at_end(ok_block)
+
+    def runtime_error(self, message, node):
+        # 报告运行时错误（带源代码行号）并结束程序，当前块以 unreachable 结束
+        b = self.func.builder
+        text = self.visit(ast.Constant(value=message))
+        ptr = b.gep(text, [ir.Constant(Int, 0), ir.Constant(Int, 0)], inbounds=True, name="msg_ptr")
+        report = llvm.runtime('runtime_error', (Void, [PChar, Int]))
+        report.attributes.add('noreturn')
+        b.call(report, [ptr, ir.Constant(Int, node.lineno)])
+        b.unreachable()
+
+    def visit_If(self, node):
+        b = self.func.builder
+        pae = b.position_at_end
+        br = b.branch
+
+        test = self.visit(node.test)
+        test = self.bool(test)
+        
+        # 没有 else 子句时条件不成立直接跳到 endif，不生成空的 else 块
+        then_block = self.func.getBlock('then')
+        else_block = self.func.getBlock('else') if node.orelse else None
+        end_block = self.func.getBlock('endif')
+        reaches_end = not node.orelse
+        
+        branch = b.cbranch(test, then_block, else_block or end_block)
+        if self.pgo is not None:
+            self.pgo.weigh_if(branch, self.func.func.name, node)
+
+        # Then block
+        pae(then_block)
+        if self.profile is not None:
+            self.profile.count(self.func, 'then', node)
+        self.visit_body(node.body)
+        # 分支以 return 结束时已经有终结指令，不能再跳转
+        if not b.block.is_terminated:
+            b.branch(end_block)
+            reaches_end = True
+
+        # Else block
+        if node.orelse:
+            pae(else_block)
+            if self.profile is not None:
+                self.profile.count(self.func, 'else', node)
+            self.visit_body(node.orelse)
+            if not b.block.is_terminated:
+                b.branch(end_block)
+                reaches_end = True
+
+        # End block：两个分支都已返回时 endif 不可达，删除它，其后的语句也不再生成
+        if reaches_end:
+            pae(end_block)
+        else:
+            self.func.func.blocks.remove(end_block)
+
+    def visit_Expr(self, node):
+        self.visit(node.value)
+
+    def visit_While(self, node):
+        if node.orelse: 
+            self.not_supports('While - else statement', node)
+        
+        while_test = self.func.getBlock('while.test')
+        while_body = self.func.getBlock('while.body')
+
+        b = self.func.builder
+        pae = b.position_at_end
+        br = b.branch
+        
+        br(while_test)
+        pae(while_test)
+
+        test = self.visit(node.test)
+        test = self.bool(test)
+        # 求值条件时可能新建基本块（--checked 的溢出检查、sum/min/max 的循环），条件跳转放在求值结束的块末尾
+        test_end = b.block
+
+        pae(while_body)
+        if self.profile is not None:
+            self.profile.count(self.func, 'loop', node)
+        self.visit_body(node.body)
+        if not b.block.is_terminated:
+            br(while_test)
+
+        pae(test_end)
+        while_end = self.func.getBlock('while.end')
+        branch = b.cbranch(test, while_body, while_end)
+        if self.pgo is not None:
+            self.pgo.weigh_loop(branch, self.func.func.name, node)
+        
+        pae(while_end)
+
+    def visit_For(self, node):
+        if isinstance(node.iter, ast.Call) and isinstance(node.iter.func, ast.Name) and node.iter.func.id == 'prange':
+            return self.parallel_for(node)
+        b = self.func.builder
+        pae = b.position_at_end
+        br = b.branch
+
+        loop_test = self.func.getBlock('for.test')
+        loop_body = self.func.getBlock('for.body')
+        loop_end = self.func.getBlock('for.end')
+
+        target = node.target
+        iter_node = node.iter
+
+        if isinstance(iter_node, ast.Call) and isinstance(iter_node.func, ast.Name) and iter_node.func.id == 'range':
+            # 处理 range 调用
+            args = iter_node.args
+            if len(args) == 1:
+                start = ir.Constant(Int, 0)
+                stop = self.visit(args[0])
+                step = ir.Constant(Int, 1)
+            elif len(args) == 2:
+                start = self.visit(args[0])
+                stop = self.visit(args[1])
+                step = ir.Constant(Int, 1)
+            elif len(args) == 3:
+                start = self.visit(args[0])
+                stop = self.visit(args[1])
+                step = self.visit(args[2])
+            else:
+                self.not_supports('range with more than 3 arguments', node)
+
+            # 分配并初始化循环变量，范围超出 32 位时循环变量使用 i64
+            if target.id in self.func.var:
+                typ = self.func.var[target.id].type
+            else:
+                typ = self.numeric_types.get(target.id) or Int
+            start, stop, step = (self.convert(value, typ) for value in (start, stop, step))
+            self.func.alloc(target.id, start, typ)
+            self.var_types[target.id] = typ
+
+            # 分支到 loop_test
+            b.branch(loop_test)
+
+            # 设置 loop_test
+            pae(loop_test)
+            current = self.func.var[target.id].load()
+            cmp = self.func.builder.icmp_signed('<', current, stop)
+            branch = self.func.builder.cbranch(cmp, loop_body, loop_end)
+            if self.pgo is not None:
+                self.pgo.weigh_loop(branch, self.func.func.name, node)
+
+            # 设置 loop_body
+            pae(loop_body)
+            if self.profile is not None:
+                self.profile.count(self.func, 'loop', node)
+            self.visit_body(node.body)
+
+            if not b.block.is_terminated:
+                # 增加循环变量
+                current = self.func.var[target.id].load()
+                increment = self.func.builder.add(current, step)
+                self.func.builder.store(increment, self.func.var[target.id].addr)
+
+                # 分支回 loop_test
+                self.func.builder.branch(loop_test)
+
+            # 设置 loop_end
+            pae(loop_end)
+            self.visit_body(node.orelse)
+        else:
+            # 处理非 range 的 for 循环（未实现）
+            self.not_supports('for loops over non-range iterables', node)
+
+    def parallel_for(self, node):
+        """
+        for i in prange(...)：把循环体提取为函数 <func>.prangeN(ctx, lo, hi, chunk)，由运行时的线程池分块并行执行。
+        循环体读到的外部变量在循环开始时按值保存到 ctx 中（列表和字符串保存指针，元素是共享的）；
+        外部变量只能通过归约更新，每个分块在私有副本上累计，结果写入 ctx 中按块编号的数组，循环结束后依次合并。
+        """
+        args = node.iter.args
+        if not 1 <= len(args) <= 3:
+            self.not_supports(f'prange with {len(args)} arguments', node)
+        b = self.func.builder
+        reductions = self.prange_reductions(node)
+        start = self.convert(self.visit(args[0]), Long) if len(args) > 1 else ir.Constant(Long, 0)
+        stop = self.convert(self.visit(args[0 if len(args) == 1 else 1]), Long)
+        step = self.convert(self.visit(args[2]), Long) if len(args) == 3 else ir.Constant(Long, 1)
+
+        # ctx 的字段：外部变量（以及列表、字符串的长度）、range 的起点和步长、保存部分结果的数组
+        captures = []
+        for name in sorted({n.id for n in body_nodes(node.body) if isinstance(n, ast.Name)}):
+            if name not in self.func.var or reductions.get(name) == '+':
+                continue
+            captures.append((name, self.func.var[name].load()))
+            if isinstance(self.list_lengths.get(name), Variable) or name in self.string_lengths:
+                captures.append((name + '.len', self.func.var[name + '.len'].load()))
+        captures += [('.start', start), ('.step', step)]
+        if reductions:
+            partial_type = ir.LiteralStructType([self.func.var[name].type for name in reductions])
+            partials = self.func.entry_alloca(ir.ArrayType(partial_type, PRANGE_CHUNKS), 'prange.partials')
+            captures.append(('.partials', partials))
+        ctx_type = ir.LiteralStructType([value.type for name, value in captures])
+        ctx = self.func.entry_alloca(ctx_type, 'prange.ctx')
+        for index, (name, value) in enumerate(captures):
+            b.store(value, b.gep(ctx, [ir.Constant(Int, 0), ir.Constant(Int, index)], inbounds=True))
+
+        body = self.prange_body(node, captures, ctx_type, reductions)
+        run = llvm.runtime('prange_run', (Int, [body.type, PChar, Long, Long, Long, Int, Int]))
+        chunks = b.call(run, [body, b.bitcast(ctx, PChar), start, stop, step,
+                              ir.Constant(Int, PRANGE_CHUNKS), ir.Constant(Int, node.lineno)])
+        if reductions:
+            self.combine_partials(partials, chunks, reductions)
+
+    def prange_reductions(self, node):
+        """
+        检查 prange 的循环体能否并行执行，返回其中的归约变量（变量名 -> '+' / 'min' / 'max'）。
+        循环体不能 return、不能给外部变量赋值（归约除外）、不能写字典，也不能调用 @memo 函数（缓存不是线程安全的）；
+        归约变量在循环体中只能出现在归约语句里，因为每个线程看到的只是它自己的部分结果。
+        """
+        reductions = {}
+        counts = {}
+        uses = {}
+        memo = {name for name, func in self.call_graph.functions.items() if is_memo(func)}
+        for n in body_nodes(node.body):
+            if isinstance(n, ast.Name):
+                uses[n.id] = uses.get(n.id, 0) + 1
+            elif isinstance(n, ast.Return):
+                self.not_supports('return inside a prange loop', n)
+            elif isinstance(n, ast.Assign) and isinstance(n.targets[0], ast.Name) and n.targets[0].id in self.func.var:
+                name = n.targets[0].id
+                op = self.reduction_op(name, n.value)
+                if op is None or self.func.var[name].type not in (Int, Long, Double):
+                    self.error(f"Cannot assign to '{name}' inside a prange loop: variables defined outside the loop "
+                               f"can only be updated by a reduction (x = x + e, x = min(x, e) or x = max(x, e)).", n)
+                if reductions.setdefault(name, op) != op:
+                    self.error(f"Variable '{name}' is reduced with both '{reductions[name]}' and '{op}' inside a prange loop.", n)
+                counts[name] = counts.get(name, 0) + 1
+            elif isinstance(n, ast.Subscript) and isinstance(n.ctx, ast.Store) and isinstance(n.value, ast.Name) \
+                    and self.var_types.get(n.value.id) == PDict:
+                self.not_supports('assigning to a dict inside a prange loop', n)
+            elif isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id in self.call_graph.functions:
+                callee = n.func.id
+                if callee in memo or any(self.call_graph.reaches(callee, name) for name in memo):
+                    self.not_supports('calling @memo functions inside a prange loop', n)
+        for name, count in counts.items():
+            # 每条归约语句中变量名出现两次（赋值目标和运算数）
+            if uses[name] != 2 * count:
+                self.error(f"Reduction variable '{name}' can only be used in its reduction inside a prange loop.", node)
+        return reductions
+
+    def reduction_op(self, name, value):
+        # value 是 name + e / e + name 时为 '+'，min(name, e) / max(name, e) 时为 'min' / 'max'，否则为 None
+        if isinstance(value, ast.BinOp) and isinstance(value.op, ast.Add):
+            sides = (value.left, value.right)
+            op = '+'
+        elif isinstance(value, ast.Call) and isinstance(value.func, ast.Name) and value.func.id in ('min', 'max') \
+                and len(value.args) == 2:
+            sides = value.args
+            op = value.func.id
+        else:
+            return None
+        return op if any(isinstance(side, ast.Name) and side.id == name for side in sides) else None
+
+    def prange_body(self, node, captures, ctx_type, reductions):
+        # 生成提取出的循环体函数：恢复外部变量，执行第 lo 到 hi-1 次迭代，最后保存归约的部分结果
+        name = llvm.module.get_unique_name(f"{self.func.func.name}.prange")
+        visitor = Visitor(name, self.filename, ('.ctx', '.lo', '.hi', '.chunk'), (Void, [PChar, Long, Long, Int]))
+        visitor.call_graph = self.call_graph
+        visitor.memo_cap = self.memo_cap
+        visitor.checked = self.checked
+        visitor.export = self.export
+        visitor.profile = self.profile
+        visitor.pgo = self.pgo
+        visitor.numeric_types = self.numeric_types
+        visitor.string_names = self.string_names
+        visitor.counters = self.counters
+        visitor.hoist_lists(node.body)
+        func = visitor.func
+        func.func.linkage = 'internal'
+        func.func.attributes.add('nounwind')
+        b = func.builder
+
+        ctx = b.bitcast(func.var['.ctx'].load(), ctx_type.as_pointer())
+        for index, (field, value) in enumerate(captures):
+            func.alloc(field, b.load(b.gep(ctx, [ir.Constant(Int, 0), ir.Constant(Int, index)], inbounds=True)), value.type)
+        for field, value in captures:
+            if field.startswith('.') or field.endswith('.len'):
+                continue
+            visitor.var_types[field] = value.type
+            if field in self.list_lengths:
+                length = self.list_lengths[field]
+                visitor.list_lengths[field] = length if isinstance(length, int) else func.var[field + '.len']
+            elif field in self.string_lengths:
+                visitor.string_lengths[field] = func.var[field + '.len']
+                func.alloc(field + '.cap', ir.Constant(Int, 0))
+        for var_name, op in reductions.items():
+            # 求和从 0 开始，min / max 从外部变量的初值开始（重复计入初值不影响结果）
+            if op == '+':
+                func.alloc(var_name, ir.Constant(self.func.var[var_name].type, 0), self.func.var[var_name].type)
+
+        # for k in range(lo, hi): i = start + k * step
+        target = node.target.id
+        typ = self.numeric_types.get(target) or Int
+        func.alloc('.k', func.var['.lo'].load(), Long)
+        loop_test = func.getBlock('prange.test')
+        loop_body = func.getBlock('prange.body')
+        loop_end = func.getBlock('prange.end')
+        b.branch(loop_test)
+        b.position_at_end(loop_test)
+        b.cbranch(b.icmp_signed('<', func.var['.k'].load(), func.var['.hi'].load()), loop_body, loop_end)
+        b.position_at_end(loop_body)
+        index = b.add(func.var['.start'].load(), b.mul(func.var['.k'].load(), func.var['.step'].load()))
+        func.alloc(target, visitor.convert(index, typ), typ)
+        visitor.var_types[target] = typ
+        visitor.visit_body(node.body)
+        b.store(b.add(func.var['.k'].load(), ir.Constant(Long, 1)), func.var['.k'].addr)
+        b.branch(loop_test)
+
+        b.position_at_end(loop_end)
+        if reductions:
+            partial = b.gep(func.var['.partials'].load(), [ir.Constant(Int, 0), func.var['.chunk'].load()], inbounds=True)
+            for index, var_name in enumerate(reductions):
+                field = b.gep(partial, [ir.Constant(Int, 0), ir.Constant(Int, index)], inbounds=True)
+                b.store(func.var[var_name].load(), field)
+        visitor.ret(None)
+        return func.func
+
+    def combine_partials(self, partials, chunks, reductions):
+        # 按块的顺序把各块的部分结果合并到外部的归约变量中
+        b = self.func.builder
+        chunk = self.func.entry_alloca(Int, 'prange.chunk')
+        b.store(ir.Constant(Int, 0), chunk)
+        test = self.func.getBlock('prange.combine')
+        body = self.func.getBlock('prange.combine.body')
+        end = self.func.getBlock('prange.combine.end')
+        b.branch(test)
+        b.position_at_end(test)
+        b.cbranch(b.icmp_signed('<', b.load(chunk), chunks), body, end)
+        b.position_at_end(body)
+        partial = b.gep(partials, [ir.Constant(Int, 0), b.load(chunk)], inbounds=True)
+        for index, (var_name, op) in enumerate(reductions.items()):
+            var = self.func.var[var_name]
+            value = b.load(b.gep(partial, [ir.Constant(Int, 0), ir.Constant(Int, index)], inbounds=True))
+            current = var.load()
+            if op == '+':
+                result = b.fadd(current, value) if var.type == Double else b.add(current, value)
+            else:
+                cmp = '<' if op == 'min' else '>'
+                better = b.fcmp_ordered(cmp, value, current) if var.type == Double else b.icmp_signed(cmp, value, current)
+                result = b.select(better, value, current)
+            b.store(result, var.addr)
+        b.store(b.add(b.load(chunk), ir.Constant(Int, 1)), chunk)
+        b.branch(test)
+        b.position_at_end(end)
+
+    def visit_List(self, node):
+        """
+        列表字面量的存储由逃逸分析决定：不逃逸的小列表在入口块中分配栈空间，循环中反复求值也只占用一份；
+        不逃逸的大列表在函数入口从堆上分配一次、返回前释放；逃逸的列表每次求值都在堆上重新分配，
+        由引用它的变量持有，没有变量再引用它时释放（见 owning_variables）。
+        元素全是常量的列表保存为全局常量：从不被写入时直接使用，否则整块复制到上述存储中。
+        """
+        b = self.func.builder
+        values = constant_elements(node)
+        if values is not None and node in self.readonly:
+            return self.constant_list(values)
+        elements = [] if values is not None else [self.narrow(self.visit(elt), Int, elt) for elt in node.elts]
+        size = len(node.elts)
+        array_type = ir.ArrayType(Int, size)
+        if node in self.escaping:
+            ptr = b.call(llvm.runtime('list_new', (PInt, [Int])), [ir.Constant(Int, size)])
+            array_alloc = b.bitcast(ptr, array_type.as_pointer(), name="list_alloc")
+        elif node in self.heap_lists:
+            array_alloc = b.bitcast(self.heap_lists[node], array_type.as_pointer(), name="list_alloc")
+        else:
+            array_alloc = self.func.entry_alloca(array_type, name="list_alloc")
+        if values is not None:
+            memcpy = llvm.module.declare_intrinsic('llvm.memcpy', [PChar, PChar, Int])
+            b.call(memcpy, [b.bitcast(array_alloc, PChar), b.bitcast(self.constant_list(values), PChar),
+                            ir.Constant(Int, size * 4), ir.Constant(Bool, 0)])
+        for i, elt in enumerate(elements):
+            elt_ptr = self.func.builder.gep(array_alloc, [ir.Constant(Int, 0), ir.Constant(Int, i)], inbounds=True, name=f"list_{i}")
+            self.func.builder.store(elt, elt_ptr)
+        return array_alloc  # 返回指向整个数组的指针 [N x i32]*
+
+    def constant_list(self, values):
+        # 元素全是常量的列表字面量对应的只读全局数组 [N x i32]*
+        array_type = ir.ArrayType(Int, len(values))
+        data = ir.GlobalVariable(llvm.module, array_type, name=llvm.module.get_unique_name('list'))
+        data.global_constant = True
+        data.linkage = 'private'
+        data.unnamed_addr = True
+        data.initializer = ir.Constant(array_type, values)
+        return data
+
+    def visit_Dict(self, node):
+        d = self.func.builder.call(llvm.runtime('dict_new', (PDict, [])), [])
+        for key, value in zip(node.keys, node.values):
+            self.dict_call('set', d, key, [self.dict_value(value)])
+        return d
+
+    def dict_value(self, node):
+        # 字典的值是 i32：浮点数不能存入，超出 32 位的整数与其他收窄一样报错，不会被截断
+        value = self.visit(node)
+        if not isinstance(value.type, ir.IntType):
+            self.not_supports('dict values other than integers', node)
+        return self.narrow(value, Int, node)
+
+    def dict_call(self, op, d, key, extra):
+        """
+        调用运行时的字典操作 dict_<op>_i / dict_<op>_s：整数键以 i64 传递，字符串键以（指针, 长度）传递。
+        """
+        b = self.func.builder
+        if self.is_string_expression(key):
+            suffix, args = 's', list(self.string_value(key))
+        else:
+            value = self.visit(key)
+            if not isinstance(value.type, ir.IntType) or value.type == Char:
+                self.not_supports(f'dict keys of type {value.type}', key)
+            suffix, args = 'i', [self.convert(value, Long)]
+        args = [d] + args + extra
+        return_type = {'get': Int, 'has': Int, 'set': Void}[op]
+        func = llvm.runtime(f'dict_{op}_{suffix}', (return_type, [arg.type for arg in args]))
+        call = b.call(func, args)
+        if suffix == 's':
+            # 字典保存的是键的副本
+            self.free_temporary(key, args[1])
+        return call
+
+    def visit_Subscript(self, node):
+        list_ptr = self.visit(node.value)  # 可能是 [N x i32]* 或 [N x i8]* 或 i8*
+        if list_ptr.type == PDict:
+            return self.dict_call('get', list_ptr, node.slice, [ir.Constant(Int, node.lineno)])
+        if isinstance(node.slice, ast.Slice):
+            # 切片的结果需要同时带上长度，由 list_value / string_value 求值
+            self.not_supports('slices outside an assignment or call argument', node)
+        index = self.visit(node.slice)    # i32
+        
+        if isinstance(list_ptr.type.pointee, ir.ArrayType):
+            # pointer to array, use two indices
+            elt_ptr = self.func.builder.gep(list_ptr, [ir.Constant(Int, 0), index], inbounds=True, name="elt_ptr")
+        elif isinstance(list_ptr.type.pointee, ir.IntType):
+            # i8* or i32*, use single index
+            elt_ptr = self.func.builder.gep(list_ptr, [index], inbounds=True, name="elt_ptr")
+        else:
+            self.not_supports(f'Unsupported subscript type: {list_ptr.type}', node)
+        
+        return self.func.builder.load(elt_ptr)
+
+    def ret(self, value):
+        # 按函数的返回类型返回：void 函数不带返回值，缺省的返回值为 0
+        b = self.func.builder
+        return_type = self.func.func.function_type.return_type
+        for ptr in self.heap_lists.values():
+            self.release(ptr)
+        # 同组的变量可能引用同一块存储，每块只释放一次
+        for group in sorted(set(self.owned_groups.values())):
+            self.release_unreferenced([(b.load(self.owned[name]), ()) for name in group])
+        if isinstance(return_type, ir.VoidType):
+            return b.ret_void()
+        if value is None:
+            return b.ret(ir.Constant(return_type, 0))
+        return b.ret(self.convert(value, return_type))
+
+    def visit_Return(self, node):
+        call = node.value
+        if (isinstance(call, ast.Call) and isinstance(call.func, ast.Name) and call.func.id in llvm.functions
+                and llvm.functions[call.func.id].param_kinds is not None):
+            if self.body_block is not None and call.func.id == self.func.func.name:
+                return self.tail_recurse(call)
+            return self.tail_call(call, llvm.functions[call.func.id])
+        value = None
+        if node.value is not None:
+            return_type = self.func.func.function_type.return_type
+            value = self.visit_as(node.value, return_type)
+            if isinstance(return_type, ir.IntType):
+                # 返回类型固定为 i32 的 @memo 函数返回 i64 的值时检查范围
+                value = self.narrow(value, return_type, node.value)
+        self.ret(value)
+
+    def tail_recurse(self, node):
+        """
+        自尾递归：先求出全部新的实参，再写回参数变量并跳回函数体开头，递归被改写为循环，不再占用栈空间。
+        """
+        if len(node.args) != len(self.arg_names):
+            self.error(f"Function '{self.func.func.name}' takes {len(self.arg_names)} argument(s) but {len(node.args)} were given.", node)
+        param_types = self.func.func.function_type.args
+        values = []
+        index = 0
+        for arg, kind in zip(node.args, self.arg_kinds):
+            values.append(self.call_argument(arg, kind, node, param_types[index]))
+            index += len(values[-1])
+        b = self.func.builder
+        # 参数同时改为引用新的实参：先取出全部新旧存储，写回之后再释放不再被引用的旧存储
+        updates = []
+        for name, value, arg, kind in zip(self.arg_names, values, node.args, self.arg_kinds):
+            if isinstance(arg, ast.Name) and arg.id == name:
+                continue
+            if kind == 'str':
+                # 新的实参不是参数独占的缓冲区，与进入函数时一样不能在它的末尾追加
+                b.store(ir.Constant(Int, 0), self.func.var[name + '.cap'].addr)
+            if name not in self.owned:
+                continue
+            if kind == 'str':
+                ptr = self.string_owner(arg, value[0])
+            elif isinstance(arg, ast.Name):
+                ptr = self.owned_value(arg.id)
+            elif allocates(arg) and (self.is_list_expression(arg) or isinstance(arg, ast.Dict)) or arg in self.escaping:
+                ptr = value[0]
+            else:
+                ptr = None
+            updates.append((name, ptr, b.load(self.owned[name])))
+        for name, ptr, old in updates:
+            slot = self.owned[name]
+            b.store(ptr if ptr is not None else ir.Constant(slot.type.pointee, None), slot)
+        self.release_unreferenced([(old, self.owned_groups[name]) for name, ptr, old in updates])
+        for name, value in zip(self.arg_names, values):
+            b.store(value[0], self.func.var[name].addr)
+            if len(value) > 1:
+                b.store(value[1], self.func.var[name + '.len'].addr)
+        b.branch(self.body_block)
+
+    def tail_call(self, node, callee):
+        """
+        返回另一个用户函数的调用结果。只传标量参数时被调函数不会访问本函数的栈内存，可以标记为尾调用；
+        互相递归且原型完全相同的函数使用 musttail，保证即使不开优化也不会增长栈。
+        """
+        call = self.visit(node)
+        return_type = callee.func.function_type.return_type
+        if all(not isinstance(arg.type, ir.PointerType) for arg in call.args):
+            # 有需要在返回前释放的列表时，调用之后还有工作要做，不能使用 musttail
+            if (callee.func.function_type == self.func.func.function_type and self.call_graph.is_recursive(node.func.id)
+                    and callee.func.calling_convention == self.func.func.calling_convention
+                    and not self.heap_lists and not self.owned):
+                call.tail = 'musttail'
+                return self.func.builder.ret_void() if isinstance(return_type, ir.VoidType) else self.func.builder.ret(call)
+            call.tail = 'tail'
+        self.ret(None if isinstance(return_type, ir.VoidType) else call)
+
+def compile_tree(parsed_ast, filename='<input>', opt_level=2, memo_cap=MEMO_CAP, checked=False, export=False,
+                 instrument=False, profile=None):
+    """
+    将 parse_source 得到的 AST 编译为经过校验的 llvmlite.binding 模块。opt_level 大于 0 时经过 LLVM 优化管线，
+    memo_cap 是 @memo 缓存的容量上限，checked 为 True 时整数溢出和除零在运行时报错，
+    export 为 True 时用户函数对外可见（见 extension.py），instrument 为 True 时生成统计执行次数的插桩代码（见 instrument.py），
+    profile 是同一份源代码的执行剖面（profiledata.Profile），给出时按剖面优化（见 pgo.py）。
+    Python 端构建的 IR 只序列化一次，IR 文本、bitcode 和 JIT 都由 LLVM 从返回的模块生成。
+    每次调用都会重建全局的 LLVM 模块，因此可以在同一进程中反复调用（守护进程模式依赖这一点）。
+    """
+    global llvm
+    llvm = LLVM()
+
+    # 创建 Visitor 实例并遍历 AST
+    visitor = Visitor('main', filename)
+    visitor.memo_cap = memo_cap
+    visitor.checked = checked
+    visitor.export = export
+    if instrument:
+        from instrument import Instrumentation
+        from profiledata import tree_digest
+        visitor.profile = Instrumentation(llvm.module, filename, tree_digest(parsed_ast))
+    if profile is not None:
+        from pgo import ProfileUse
+        visitor.pgo = ProfileUse(profile)
+    visitor.visit(parsed_ast)
+    if instrument:
+        visitor.profile.register(llvm.main, llvm.runtime)
+    if profile is not None:
+        visitor.pgo.annotate_module(llvm.module, llvm.main.func)
+    eliminate_dead_code(llvm.module)
+    from optimize import optimize
+    return optimize(str(llvm.module), opt_level)
+
+def compile_module(code, filename='<input>', opt_level=2, memo_cap=MEMO_CAP, checked=False, export=False,
+                   instrument=False, profile=None):
+    """
+    将一段 .pyll 源代码编译为 llvmlite.binding 模块，参数与 compile_tree 相同。
+    """
+    return compile_tree(parse_source(code, filename), filename, opt_level, memo_cap, checked, export, instrument, profile)
+
+def compile_source(code, filename='<input>', opt_level=2, memo_cap=MEMO_CAP, checked=False, export=False,
+                   instrument=False, profile=None):
+    """
+    将一段 .pyll 源代码编译为 LLVM IR 文本，参数与 compile_tree 相同。
+    """
+    return str(compile_module(code, filename, opt_level, memo_cap, checked, export, instrument, profile))
+
+def exported_functions():
+    """
+    最近一次以 export=True 编译时对外可见的用户函数：函数名 ->（参数的类型注解列表, LLVM 函数类型）。
+    """
+    return {name: (func.param_kinds, func.func.function_type) for name, func in llvm.functions.items()
+            if func.param_kinds is not None and func.func.linkage != 'internal'}
@@ -1,4 +1,14 @@
 #include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+#include <pthread.h>
+#include <unistd.h>
+#include <errno.h>
+#include <setjmp.h>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
 
 // ʵ print_i32 ڴӡ
 void print_i32(int x)
@@ -11,3 +21,772 @@ void print_str(char *s)
 {
 	printf("%s\n", s);
 }
+
+// ʵ print_i64 ڴӡ 64 λ
+void print_i64(long long x)
+{
+	printf("%lld\n", x);
+}
+
+//  Python  repr ʽѸд buf 32 ֽڣ
+// ʹܾȷԭֵЧָ֣ [-4, 16) ֮ʱöʽܴС
+static void format_f64(char *buf, int size, double x)
+{
+	if (x != x)
+	{
+		snprintf(buf, size, "nan");
+		return;
+	}
+	if (x == HUGE_VAL || x == -HUGE_VAL)
+	{
+		snprintf(buf, size, x > 0 ? "inf" : "-inf");
+		return;
+	}
+	int digits = 1;
+	for (; digits < 17; digits++)
+	{
+		snprintf(buf, size, "%.*e", digits - 1, x);
+		if (strtod(buf, NULL) == x)
+			break;
+	}
+	snprintf(buf, size, "%.*e", digits - 1, x);
+	int exponent = atoi(strchr(buf, 'e') + 1);
+	if (exponent >= -4 && exponent < 16)
+	{
+		int decimals = digits - 1 - exponent;
+		snprintf(buf, size, "%.*f", decimals > 0 ? decimals : 1, x);
+	}
+	else if (digits == 1)
+	{
+		// Python д 1e+16  1.e+16
+		snprintf(buf, size, "%.0e", x);
+	}
+}
+
+// ʵ print_f64  Python ĸʽӡ
+void print_f64(double x)
+{
+	char buf[64];
+	format_f64(buf, sizeof(buf), x);
+	printf("%s\n", buf);
+}
+
+// ʵ print_strn ӡȵַʱɵַ NUL β
+void print_strn(char *s, int len)
+{
+	printf("%.*s\n", len, s);
+}
+
+// չģʽ Python õĺ֮ǰǼת㣨 extension.py
+// ʱ󱣴Ϣصڲ Python ׳쳣
+static __thread jmp_buf error_target;
+static __thread int error_catching;
+static __thread char error_message[512];
+
+jmp_buf *runtime_catch(void)
+{
+	error_catching = 1;
+	return &error_target;
+}
+
+void runtime_uncatch(void)
+{
+	error_catching = 0;
+}
+
+char *runtime_error_message(void)
+{
+	return error_message;
+}
+
+// ʱ󲢽򣨵Ǽתʱصڣline ǳԴк
+void runtime_error(char *message, int line)
+{
+	if (error_catching)
+	{
+		error_catching = 0;
+		snprintf(error_message, sizeof(error_message), "line %d: %s", line, message);
+		longjmp(error_target, 1);
+	}
+	fflush(stdout);
+	fprintf(stderr, "line %d: %s\n", line, message);
+	exit(1);
+}
+
+//  n Ԫص·бƬ
+int *list_copy(int *src, int n)
+{
+	int *dst = malloc(n > 0 ? (size_t)n * sizeof(int) : 1);
+	if (!dst)
+		runtime_error("MemoryError", 0);
+	memcpy(dst, src, (size_t)n * sizeof(int));
+	return dst;
+}
+
+// ƴбΪ·б
+int *list_concat(int *a, int na, int *b, int nb)
+{
+	int *dst = malloc(na + nb > 0 ? (size_t)(na + nb) * sizeof(int) : 1);
+	if (!dst)
+		runtime_error("MemoryError", 0);
+	memcpy(dst, a, (size_t)na * sizeof(int));
+	memcpy(dst + na, b, (size_t)nb * sizeof(int));
+	return dst;
+}
+
+// ڶϷ n ԪصбݵĻб
+int *list_new(int n)
+{
+	int *dst = malloc(n > 0 ? (size_t)n * sizeof(int) : 1);
+	if (!dst)
+		runtime_error("MemoryError", 0);
+	return dst;
+}
+
+// read_ints / read_bytes ӳļݵʼַӳĳȡӳĻ malloc һ
+// ɳıͷţlist_free / str_free ҵʱӳ
+static struct mapping
+{
+	void *data;
+	size_t size;
+	struct mapping *next;
+} *mappings;
+static int mapping_count;
+static pthread_mutex_t mapping_lock = PTHREAD_MUTEX_INITIALIZER;
+
+static void mapping_add(void *data, size_t size)
+{
+	struct mapping *m = malloc(sizeof(*m));
+	if (!m)
+		runtime_error("MemoryError", 0);
+	m->data = data;
+	m->size = size;
+	pthread_mutex_lock(&mapping_lock);
+	m->next = mappings;
+	mappings = m;
+	__atomic_store_n(&mapping_count, mapping_count + 1, __ATOMIC_RELAXED);
+	pthread_mutex_unlock(&mapping_lock);
+}
+
+// ͷбַĻӳļӳ䣬 malloc ġûӳʱ
+static void buffer_free(void *data)
+{
+	if (data && __atomic_load_n(&mapping_count, __ATOMIC_RELAXED) > 0)
+	{
+		pthread_mutex_lock(&mapping_lock);
+		for (struct mapping **p = &mappings; *p; p = &(*p)->next)
+		{
+			struct mapping *m = *p;
+			if (m->data == data)
+			{
+				*p = m->next;
+				__atomic_store_n(&mapping_count, mapping_count - 1, __ATOMIC_RELAXED);
+				pthread_mutex_unlock(&mapping_lock);
+				munmap(m->data, m->size);
+				free(m);
+				return;
+			}
+		}
+		pthread_mutex_unlock(&mapping_lock);
+	}
+	free(data);
+}
+
+void list_free(int *list)
+{
+	buffer_free(list);
+}
+
+// @memo Ľ棺ԲԪΪĿѰַϣ
+//  MEMO_INIT_SLOTS ۿʼ跭ʱޣ
+// ޺ݣ½ֱӸ̽ϵĵһۣڴռн
+typedef struct {
+	int nargs;
+	int mask;	//  - 1Ϊ 2 ݣ
+	int count;	// ռõĲ
+	int *slots;	// ÿ nargs + 2  intռñǡ
+} memo_table;
+
+#define MEMO_INIT_SLOTS 64
+#define MEMO_PROBES 8
+
+static unsigned memo_hash(const int *keys, int nargs)
+{
+	unsigned h = 2166136261u;
+	for (int i = 0; i < nargs; i++)
+	{
+		h ^= (unsigned)keys[i];
+		h *= 16777619u;
+	}
+	return h ^ (h >> 15);
+}
+
+static int *memo_slot(memo_table *t, unsigned i)
+{
+	return t->slots + (size_t)(i & t->mask) * (t->nargs + 2);
+}
+
+// ҲӦĲۣؼͬĲۻһղۣ̽ MEMO_PROBES δҵʱ NULL
+static int *memo_find(memo_table *t, const int *keys)
+{
+	unsigned h = memo_hash(keys, t->nargs);
+	for (int p = 0; p < MEMO_PROBES; p++)
+	{
+		int *slot = memo_slot(t, h + p);
+		if (!slot[0] || memcmp(slot + 1, keys, t->nargs * sizeof(int)) == 0)
+			return slot;
+	}
+	return NULL;
+}
+
+static memo_table *memo_alloc(int nargs, int size)
+{
+	memo_table *t = malloc(sizeof(memo_table));
+	if (!t)
+		return NULL;
+	t->slots = calloc((size_t)size * (nargs + 2), sizeof(int));
+	if (!t->slots)
+	{
+		free(t);
+		return NULL;
+	}
+	t->nargs = nargs;
+	t->mask = size - 1;
+	t->count = 0;
+	return t;
+}
+
+// Ϊ²ɽŲµľɽֱӶʧ
+static memo_table *memo_grow(memo_table *t)
+{
+	memo_table *bigger = memo_alloc(t->nargs, (t->mask + 1) * 2);
+	if (!bigger)
+		return t;
+	for (int i = 0; i <= t->mask; i++)
+	{
+		int *old = memo_slot(t, i);
+		if (!old[0])
+			continue;
+		int *slot = memo_find(bigger, old + 1);
+		if (slot && !slot[0])
+		{
+			memcpy(slot, old, (t->nargs + 2) * sizeof(int));
+			bigger->count++;
+		}
+	}
+	free(t->slots);
+	free(t);
+	return bigger;
+}
+
+// ѯ棬ʱѽд *value  1
+int memo_lookup(void **table, int *keys, int nargs, int *value)
+{
+	memo_table *t = *table;
+	if (!t)
+		return 0;
+	int *slot = memo_find(t, keys);
+	if (!slot || !slot[0])
+		return 0;
+	*value = slot[nargs + 1];
+	return 1;
+}
+
+// ¼һεõĽcap ǲ
+void memo_store(void **table, int *keys, int nargs, int value, int cap)
+{
+	memo_table *t = *table;
+	if (!t)
+	{
+		int size = MEMO_INIT_SLOTS;
+		while (size > 1 && size > cap)
+			size /= 2;
+		t = *table = memo_alloc(nargs, size);
+		if (!t)
+			return;
+	}
+	int can_grow = (t->mask + 1) <= cap / 2;
+	if (can_grow && t->count * 4 >= (t->mask + 1) * 3)
+		t = *table = memo_grow(t);
+	int *slot = memo_find(t, keys);
+	while (!slot && can_grow && (t->mask + 1) <= cap / 2)
+	{
+		memo_table *bigger = memo_grow(t);
+		if (bigger == t)
+			break;
+		t = *table = bigger;
+		slot = memo_find(t, keys);
+	}
+	if (!slot)
+		slot = memo_slot(t, memo_hash(keys, nargs));	// ̽ϵĵһ
+	else if (!slot[0])
+		t->count++;
+	slot[0] = 1;
+	memcpy(slot + 1, keys, nargs * sizeof(int));
+	slot[nargs + 1] = value;
+}
+
+// ֵ䣺Ѱַ̽⣩ϣΪֵַΪ int
+// Ϊ 2 ݣװӳ 3/4 ʱΪַᱻƣߵڴ
+typedef struct {
+	long long ikey;
+	char *skey;	// ַʱΪ NULL
+	int len;	// ַĳ
+	int value;
+	unsigned hash;
+	int used;
+} dict_entry;
+
+typedef struct {
+	int count;
+	int mask;
+	dict_entry *entries;
+} dict;
+
+#define DICT_INIT_SLOTS 8
+
+static unsigned dict_hash_i(long long key)
+{
+	unsigned long long h = (unsigned long long)key;
+	h ^= h >> 33;
+	h *= 0xff51afd7ed558ccdULL;
+	h ^= h >> 33;
+	return (unsigned)h;
+}
+
+static unsigned dict_hash_s(const char *key, int len)
+{
+	unsigned h = 2166136261u;
+	for (int i = 0; i < len; i++)
+	{
+		h ^= (unsigned char)key[i];
+		h *= 16777619u;
+	}
+	return h;
+}
+
+// ҼڵĲۣʱ̽ϵĵһղ
+static dict_entry *dict_find(dict *d, long long ikey, const char *skey, int len, unsigned hash)
+{
+	for (unsigned i = hash;; i++)
+	{
+		dict_entry *e = &d->entries[i & d->mask];
+		if (!e->used)
+			return e;
+		if (e->hash == hash && (skey ? e->skey && e->len == len && memcmp(e->skey, skey, len) == 0
+		                             : !e->skey && e->ikey == ikey))
+			return e;
+	}
+}
+
+dict *dict_new(void)
+{
+	dict *d = malloc(sizeof(dict));
+	dict_entry *entries = calloc(DICT_INIT_SLOTS, sizeof(dict_entry));
+	if (!d || !entries)
+		runtime_error("MemoryError", 0);
+	d->count = 0;
+	d->mask = DICT_INIT_SLOTS - 1;
+	d->entries = entries;
+	return d;
+}
+
+static void dict_grow(dict *d)
+{
+	int size = (d->mask + 1) * 2;
+	dict_entry *old = d->entries;
+	int old_size = d->mask + 1;
+	d->entries = calloc(size, sizeof(dict_entry));
+	if (!d->entries)
+		runtime_error("MemoryError", 0);
+	d->mask = size - 1;
+	for (int i = 0; i < old_size; i++)
+		if (old[i].used)
+			*dict_find(d, old[i].ikey, old[i].skey, old[i].len, old[i].hash) = old[i];
+	free(old);
+}
+
+static void dict_insert(dict *d, long long ikey, const char *skey, int len, unsigned hash, int value)
+{
+	dict_entry *e = dict_find(d, ikey, skey, len, hash);
+	if (!e->used)
+	{
+		if ((d->count + 1) * 4 > (d->mask + 1) * 3)
+		{
+			dict_grow(d);
+			e = dict_find(d, ikey, skey, len, hash);
+		}
+		e->used = 1;
+		e->hash = hash;
+		e->ikey = ikey;
+		e->len = len;
+		e->skey = NULL;
+		if (skey)
+		{
+			e->skey = malloc(len + 1);
+			if (!e->skey)
+				runtime_error("MemoryError", 0);
+			memcpy(e->skey, skey, len);
+			e->skey[len] = '\0';
+		}
+		d->count++;
+	}
+	e->value = value;
+}
+
+void dict_set_i(dict *d, long long key, int value)
+{
+	dict_insert(d, key, NULL, 0, dict_hash_i(key), value);
+}
+
+void dict_set_s(dict *d, char *key, int len, int value)
+{
+	dict_insert(d, 0, key, len, dict_hash_s(key, len), value);
+}
+
+int dict_has_i(dict *d, long long key)
+{
+	return dict_find(d, key, NULL, 0, dict_hash_i(key))->used;
+}
+
+int dict_has_s(dict *d, char *key, int len)
+{
+	return dict_find(d, 0, key, len, dict_hash_s(key, len))->used;
+}
+
+// ȡڵļʱ Python һ KeyError
+int dict_get_i(dict *d, long long key, int line)
+{
+	dict_entry *e = dict_find(d, key, NULL, 0, dict_hash_i(key));
+	if (!e->used)
+	{
+		char message[64];
+		snprintf(message, sizeof(message), "KeyError: %lld", key);
+		runtime_error(message, line);
+	}
+	return e->value;
+}
+
+int dict_get_s(dict *d, char *key, int len, int line)
+{
+	dict_entry *e = dict_find(d, 0, key, len, dict_hash_s(key, len));
+	if (!e->used)
+	{
+		char message[128];
+		snprintf(message, sizeof(message), "KeyError: '%.*s'", len > 100 ? 100 : len, key);
+		runtime_error(message, line);
+	}
+	return e->value;
+}
+
+int dict_len(dict *d)
+{
+	return d->count;
+}
+
+// ͷֵֵƵַռı¸ֵػΪʵεĵ÷ʱͷ
+void dict_free(dict *d)
+{
+	if (!d)
+		return;
+	for (int i = 0; i <= d->mask; i++)
+		if (d->entries[i].used)
+			free(d->entries[i].skey);
+	free(d->entries);
+	free(d);
+}
+
+// ַԣָ, ȣʾݲɱ䣬ʱɵַڶ
+// ϵĻɳıͷţ str_free
+static char *str_alloc(int size)
+{
+	char *s = malloc(size > 0 ? size : 1);
+	if (!s)
+		runtime_error("MemoryError", 0);
+	return s;
+}
+
+void str_free(char *s)
+{
+	buffer_free(s);
+}
+
+char *str_concat(char *a, int alen, char *b, int blen)
+{
+	char *s = str_alloc(alen + blen);
+	memcpy(s, a, alen);
+	memcpy(s + alen, b, blen);
+	return s;
+}
+
+// s = s + x ַ*cap  s ǰռĻ0 ʾ s ӵл
+// 㹻ʱֱд s ĩβⲿݲκַ·䣬
+// ѭз׷ӵܿԵ
+char *str_append(char *s, int len, int *cap, char *x, int xlen)
+{
+	if (*cap >= len + xlen)
+	{
+		memcpy(s + len, x, xlen);
+		return s;
+	}
+	int size = 2 * (len + xlen);
+	if (size < 16)
+		size = 16;
+	char *buf = str_alloc(size);
+	memcpy(buf, s, len);
+	memcpy(buf + len, x, xlen);
+	*cap = size;
+	return buf;
+}
+
+// ֵȽַظ0 
+int str_compare(char *a, int alen, char *b, int blen)
+{
+	int n = alen < blen ? alen : blen;
+	int c = memcmp(a, b, n);
+	if (c != 0)
+		return c;
+	return alen < blen ? -1 : alen > blen;
+}
+
+char *str_from_i64(long long x, int *len)
+{
+	char buf[32];
+	*len = snprintf(buf, sizeof(buf), "%lld", x);
+	return memcpy(str_alloc(*len), buf, *len);
+}
+
+char *str_from_f64(double x, int *len)
+{
+	char buf[64];
+	format_f64(buf, sizeof(buf), x);
+	*len = strlen(buf);
+	return memcpy(str_alloc(*len), buf, *len);
+}
+
+// prange ĲѭѭȡΪһ lo  hi-1 ε
+// chunk ǷֿıţԼĲֽű棬ɵѭϲ
+typedef void (*prange_body)(void *ctx, long long lo, long long hi, int chunk);
+
+// פ̳߳أ߳ڵһʹʱ prange_run ߳Ҳִ
+static struct
+{
+	pthread_mutex_t lock;
+	pthread_cond_t start;	// µ
+	pthread_cond_t done;	// зֿ鶼
+	int workers;			// ߳-1 ʾδ
+	long generation;		// ÿһһ
+	prange_body body;
+	void *ctx;
+	long long n;			// 
+	int chunks;				// ֿ
+	int next;				// һȡķֿ
+	int remaining;			// δɵķֿ
+} pool = {PTHREAD_MUTEX_INITIALIZER, PTHREAD_COND_INITIALIZER, PTHREAD_COND_INITIALIZER, -1};
+
+// ǰ߳Ƿִĳ prange ѭ壬Ƕ׵ prange ֱӴִ
+static __thread int in_prange;
+
+// ȡִзֿ飬ֱûʣķֿ顣úͷʱ
+static void prange_work(void)
+{
+	while (pool.next < pool.chunks)
+	{
+		int chunk = pool.next++;
+		long long size = pool.n / pool.chunks, extra = pool.n % pool.chunks;
+		long long lo = chunk * size + (chunk < extra ? chunk : extra);
+		long long hi = lo + size + (chunk < extra);
+		prange_body body = pool.body;
+		void *ctx = pool.ctx;
+		pthread_mutex_unlock(&pool.lock);
+		body(ctx, lo, hi, chunk);
+		pthread_mutex_lock(&pool.lock);
+		if (--pool.remaining == 0)
+			pthread_cond_signal(&pool.done);
+	}
+}
+
+static void *prange_worker(void *arg)
+{
+	long seen = 0;
+	(void)arg;
+	in_prange = 1;
+	pthread_mutex_lock(&pool.lock);
+	for (;;)
+	{
+		while (pool.generation == seen)
+			pthread_cond_wait(&pool.start, &pool.lock);
+		seen = pool.generation;
+		prange_work();
+	}
+	return NULL;
+}
+
+// ߳ PYLL_THREADSȱʡΪߵ CPU 
+static int prange_threads(void)
+{
+	char *env = getenv("PYLL_THREADS");
+	long n = env ? atol(env) : sysconf(_SC_NPROCESSORS_ONLN);
+	return n > 0 ? (int)n : 1;
+}
+
+// ִ for i in prange(start, stop, step)ʵʹõķֿ max_chunks
+int prange_run(prange_body body, void *ctx, long long start, long long stop, long long step, int max_chunks, int line)
+{
+	if (step == 0)
+		runtime_error("ValueError: prange() arg 3 must not be zero", line);
+	long long n = step > 0 ? (stop > start ? (stop - start - 1) / step + 1 : 0)
+						   : (stop < start ? (start - stop - 1) / -step + 1 : 0);
+	if (n == 0)
+		return 0;
+
+	pthread_mutex_lock(&pool.lock);
+	if (pool.workers < 0)
+	{
+		pool.workers = 0;
+		for (int i = prange_threads() - 1; i > 0; i--)
+		{
+			pthread_t thread;
+			if (pthread_create(&thread, NULL, prange_worker, NULL) != 0)
+				break;
+			pthread_detach(thread);
+			pool.workers++;
+		}
+	}
+	if (in_prange || pool.workers == 0)
+	{
+		pthread_mutex_unlock(&pool.lock);
+		body(ctx, 0, n, 0);
+		return 1;
+	}
+
+	// ֿ߳ʱʱɵ߳̿Լȡ
+	long long chunks = 4LL * (pool.workers + 1);
+	if (chunks > max_chunks)
+		chunks = max_chunks;
+	if (chunks > n)
+		chunks = n;
+	pool.body = body;
+	pool.ctx = ctx;
+	pool.n = n;
+	pool.chunks = (int)chunks;
+	pool.next = 0;
+	pool.remaining = (int)chunks;
+	pool.generation++;
+	pthread_cond_broadcast(&pool.start);
+
+	// ִ̻߳ѭʱ޷صڣѭеĴ빤߳еһ
+	int catching = error_catching;
+	error_catching = 0;
+	in_prange = 1;
+	prange_work();
+	while (pool.remaining > 0)
+		pthread_cond_wait(&pool.done, &pool.lock);
+	in_prange = 0;
+	error_catching = catching;
+	pthread_mutex_unlock(&pool.lock);
+	return (int)chunks;
+}
+
+// read_ints / read_bytesļӳ䵽ڴ棬ΪбֱַʹãҲơ
+// ӳ˽еģбԪظֵдļӳıͷʱӳ䣨 buffer_free
+static void *map_file(char *path, int path_len, int item_size, int writable, int *len, int line)
+{
+	char message[512];
+	char *name = malloc(path_len + 1);
+	if (!name)
+		runtime_error("MemoryError", line);
+	memcpy(name, path, path_len);
+	name[path_len] = '\0';
+
+	int fd = open(name, O_RDONLY);
+	struct stat st;
+	if (fd < 0 || fstat(fd, &st) != 0)
+	{
+		snprintf(message, sizeof(message), "OSError: cannot open '%s': %s", name, strerror(errno));
+		runtime_error(message, line);
+	}
+	if (st.st_size % item_size != 0)
+	{
+		snprintf(message, sizeof(message), "ValueError: size of '%s' (%lld bytes) is not a multiple of %d",
+				 name, (long long)st.st_size, item_size);
+		runtime_error(message, line);
+	}
+	if (st.st_size / item_size > 0x7fffffff)
+	{
+		snprintf(message, sizeof(message), "OverflowError: '%s' has more than 2147483647 items", name);
+		runtime_error(message, line);
+	}
+	*len = (int)(st.st_size / item_size);
+	void *data = malloc(1);
+	if (st.st_size > 0)
+	{
+		free(data);
+		data = mmap(NULL, st.st_size, PROT_READ | (writable ? PROT_WRITE : 0), MAP_PRIVATE, fd, 0);
+		if (data == MAP_FAILED)
+		{
+			snprintf(message, sizeof(message), "OSError: cannot map '%s': %s", name, strerror(errno));
+			runtime_error(message, line);
+		}
+		// ͨ˳һ
+		madvise(data, st.st_size, MADV_SEQUENTIAL);
+		mapping_add(data, st.st_size);
+	}
+	close(fd);
+	free(name);
+	return data;
+}
+
+// ļݰֽ 32 λ
+int *read_ints(char *path, int path_len, int *len, int line)
+{
+	return map_file(path, path_len, sizeof(int), 1, len, line);
+}
+
+char *read_bytes(char *path, int path_len, int *len, int line)
+{
+	return map_file(path, path_len, 1, 0, len, line);
+}
+
+// --instrument ִ棺Ϊÿһ 64 λmain ʼʱ profile_register Ǽǣ
+// ˳ʱʱд档header ļͷsites ÿһ㣬 counters һһӦ
+// ȱʡд path PYLL_PROFILE ָ·
+static struct
+{
+	long long **counters;
+	int count;
+	const char *header;
+	const char *sites;
+	const char *path;
+} profile;
+
+static void profile_dump(void)
+{
+	FILE *f = fopen(profile.path, "w");
+	if (!f)
+	{
+		fprintf(stderr, "cannot write profile '%s': %s\n", profile.path, strerror(errno));
+		return;
+	}
+	fputs(profile.header, f);
+	const char *site = profile.sites;
+	for (int i = 0; i < profile.count; i++)
+	{
+		const char *end = strchr(site, '\n');
+		fprintf(f, "%lld\t%.*s\n", *profile.counters[i], (int)(end - site), site);
+		site = end + 1;
+	}
+	if (fclose(f) != 0)
+		fprintf(stderr, "cannot write profile '%s': %s\n", profile.path, strerror(errno));
+}
+
+void profile_register(long long **counters, int count, char *header, char *sites, char *path)
+{
+	const char *env = getenv("PYLL_PROFILE");
+	profile.counters = counters;
+	profile.count = count;
+	profile.header = header;
+	profile.sites = sites;
+	profile.path = env && *env ? env : path;
+	atexit(profile_dump);
+}
@@ -0,0 +1,10 @@
+"""
+编译器各部分共用的常量。命令行入口也从这里取缺省值，因此这个模块不能导入 llvmlite 或代码生成。
+"""
+
+# @memo 函数的缓存最多保存的结果条数，缓存满后新结果覆盖旧结果
+MEMO_CAP = 1 << 16
+
+# 语法分析之后的各遍（类型推断、常量折叠、代码生成）按语法树递归，每层嵌套的表达式约用 4 层 Python 调用；
+# 缺省的 1000 层只够几百层括号，这个上限可以编译约 5000 层嵌套，又远小于 8 MB 的线程栈能容纳的深度
+RECURSION_LIMIT = 20000
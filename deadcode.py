@@ -0,0 +1,85 @@
+"""
+代码生成之后的清理：删除只写不读的局部变量（死存储）、结果没有被使用的无副作用指令和没有被引用的全局值。
+不开优化时生成的 IR 因此更小；开优化时 LLVM 的管线和后端需要处理的代码也更少。
+"""
+from llvmlite import ir
+
+# 没有副作用的指令，结果没有被使用时可以直接删除
+PURE_OPS = {
+    'add', 'sub', 'mul', 'sdiv', 'srem', 'fadd', 'fsub', 'fmul', 'fdiv', 'frem', 'fneg',
+    'and', 'or', 'xor', 'shl', 'ashr', 'lshr', 'icmp', 'fcmp', 'select', 'phi',
+    'load', 'getelementptr', 'zext', 'sext', 'trunc', 'sitofp', 'fptosi', 'bitcast', 'extractvalue',
+}
+
+def operands(instr):
+    # phi 的输入不在 operands 中
+    if isinstance(instr, ir.PhiInstr):
+        return [value for value, block in instr.incomings]
+    return instr.operands
+
+def remove_dead_stores(func):
+    """
+    删除从未被读取的 alloca 以及写入它们的 store，再删除结果没有被使用的无副作用指令，反复进行直到没有变化。
+    只作为 store 的目标地址出现的 alloca（赋值后没有再用到的变量、没有用到的长度和容量等）不会被读取，写入的值没有意义。
+    """
+    while True:
+        used = set()
+        read = set()
+        for block in func.blocks:
+            for instr in block.instructions:
+                for i, op in enumerate(operands(instr)):
+                    if isinstance(op, ir.Instruction):
+                        used.add(op)
+                        if isinstance(op, ir.AllocaInstr) and not (isinstance(instr, ir.StoreInstr) and i == 1):
+                            read.add(op)
+
+        def dead(instr):
+            if isinstance(instr, ir.AllocaInstr):
+                return instr not in read
+            if isinstance(instr, ir.StoreInstr):
+                ptr = instr.operands[1]
+                return isinstance(ptr, ir.AllocaInstr) and ptr not in read
+            return instr.opname in PURE_OPS and instr not in used
+
+        removed = False
+        for block in func.blocks:
+            live = [instr for instr in block.instructions if not dead(instr)]
+            removed = removed or len(live) != len(block.instructions)
+            block.instructions = live
+        if not removed:
+            return
+
+def initializer_references(value):
+    # 全局变量的初始值中引用的全局值：只有元素是指针的常量数组（如插桩计数器的地址表）才会引用
+    constant = value.initializer
+    if isinstance(constant, ir.Constant) and isinstance(constant.type, ir.ArrayType) \
+            and isinstance(constant.type.element, ir.PointerType) and isinstance(constant.constant, (list, tuple)):
+        return [element.name for element in constant.constant if isinstance(element, ir.GlobalValue)]
+    return []
+
+def remove_unused_globals(module):
+    """
+    删除没有被任何指令或其他全局变量的初始值引用的全局变量、函数声明和 internal 函数，直到不再有可删除的全局值。
+    只能从外部调用的函数（main）不是 internal 的，总是保留。
+    """
+    while True:
+        used = set()
+        for value in module.globals.values():
+            if isinstance(value, ir.Function):
+                for block in value.blocks:
+                    for instr in block.instructions:
+                        used.update(op.name for op in operands(instr) if isinstance(op, ir.GlobalValue))
+            elif isinstance(value, ir.GlobalVariable):
+                used.update(initializer_references(value))
+        unused = [name for name, value in module.globals.items() if name not in used and (
+            isinstance(value, ir.GlobalVariable) or value.is_declaration or value.linkage == 'internal')]
+        if not unused:
+            return
+        for name in unused:
+            del module.globals[name]
+
+def eliminate_dead_code(module):
+    for value in list(module.globals.values()):
+        if isinstance(value, ir.Function):
+            remove_dead_stores(value)
+    remove_unused_globals(module)
@@ -0,0 +1,14 @@
+# 定义自定义异常类以包含详细的错误信息
+class CompilerError(Exception):
+    def __init__(self, message, filename, lineno, col_offset):
+        super().__init__(f"{filename}:{lineno}:{col_offset}: {message}")
+        self.message = message
+        self.filename = filename
+        self.lineno = lineno
+        self.col_offset = col_offset
+
+# 一次编译中收集到的全部错误（词法 / 语法阶段会尽量继续分析，最后统一报告）
+class CompilerErrors(Exception):
+    def __init__(self, errors):
+        super().__init__("\n".join(str(e) for e in errors))
+        self.errors = list(errors)
@@ -0,0 +1,180 @@
+"""
+列表字面量的逃逸分析：决定列表字面量的存储放在栈上还是堆上。
+列表只能通过变量之间的赋值（b = a）和自尾递归的实参被别的变量引用；作为参数传给其他调用时被调函数不能保存它，
+返回值和字典的值也只能是标量。因此没有被别名引用的列表，在下一次求值同一个字面量之前就已经不再可见，
+可以在入口块中分配一次、每次求值时复用。
+元素全是常量且从不被写入的列表字面量不需要存储，直接使用全局常量。
+逃逸的列表字面量、切片、拼接的结果和字典字面量创建的字典在堆上分配，由引用它的变量所在的组共同持有，
+组内没有变量再引用它时释放（见 owning_variables）。字符串的拼接和 str() 的结果同样如此（见 owning_strings），
+字符串的切片不复制，与原字符串共用缓冲区。
+"""
+import ast
+from callgraph import body_nodes
+
+# 不逃逸的列表不超过这么多个元素时放在栈上，更大的列表在函数入口从堆上分配一次、返回前释放
+STACK_LIST_LIMIT = 1024
+
+# 只读取列表参数的内置函数
+READONLY_BUILTINS = ('len', 'sum', 'min', 'max')
+
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+def escaping_lists(body, params=(), function=None):
+    """
+    返回一段代码（不含嵌套的函数定义）中会逃逸的列表字面量节点的集合：赋给某个变量、且这个变量又被赋给
+    其他变量或作为实参传给自递归调用 function 的另一个参数的列表字面量，以及直接作为自递归调用实参的列表字面量。
+    params 是（参数名, 类型注解）的列表。循环或自尾递归会再次求值同一个字面量，逃逸的列表每次求值都需要新的存储。
+    """
+    literals = {}   # 变量名 -> 赋给它的列表字面量
+    aliased = set() # 被赋给其他变量的变量名
+    escaping = set()
+    for node in body_nodes(body):
+        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+            if isinstance(node.value, ast.List):
+                literals.setdefault(node.targets[0].id, []).append(node.value)
+            elif isinstance(node.value, ast.Name):
+                aliased.add(node.value.id)
+        elif is_self_call(node, function):
+            for (name, kind), arg in zip(params, node.args):
+                if isinstance(arg, ast.Name) and arg.id != name:
+                    aliased.add(arg.id)
+                elif isinstance(arg, ast.List):
+                    escaping.add(arg)
+    return escaping | {literal for name in aliased for literal in literals.get(name, ())}
+
+def is_self_call(node, function):
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == function
+
+def readonly_lists(body):
+    """
+    返回一段代码（不含嵌套的函数定义）中从不被写入的列表字面量的集合：
+    直接作为 len / sum / min / max 参数的字面量，以及赋给某个变量、而这个变量既没有元素赋值，
+    也没有被赋给其他变量或作为参数传给其他函数（被调函数可能给元素赋值）的字面量。
+    """
+    literals = {}   # 变量名 -> 赋给它的列表字面量
+    written = set() # 元素可能被修改的变量名
+    readonly = set()
+    for node in body_nodes(body):
+        if isinstance(node, ast.Assign):
+            target = node.targets[0]
+            if isinstance(target, ast.Name):
+                if isinstance(node.value, ast.List):
+                    literals.setdefault(target.id, []).append(node.value)
+                elif isinstance(node.value, ast.Name):
+                    written.add(node.value.id)
+            elif isinstance(target, ast.Subscript) and isinstance(target.value, ast.Name):
+                written.add(target.value.id)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if node.func.id in READONLY_BUILTINS:
+                readonly.update(arg for arg in node.args if isinstance(arg, ast.List))
+            else:
+                written.update(arg.id for arg in node.args if isinstance(arg, ast.Name))
+    return readonly | {literal for name, nodes in literals.items() if name not in written for literal in nodes}
+
+def allocates(node, copy=True):
+    """
+    求值列表表达式或字典字面量 node 是否在堆上分配新的存储：拼接、字典字面量和 read_ints() 映射的文件总是分配，
+    切片只在需要复制（copy 为 True）时分配。
+    """
+    if isinstance(node, (ast.BinOp, ast.Dict)):
+        return True
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'read_ints':
+        return True
+    return copy and isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Slice)
+
+def owning_variables(body, non_lists, params=(), function=None, escaping=()):
+    """
+    返回一段代码（不含嵌套的函数定义）中引用堆上存储的变量：变量名 ->（'list' / 'dict', 同组的变量名）。
+    变量被赋值为切片、拼接的结果、字典字面量或逃逸的列表字面量（escaping）时引用新分配的存储；
+    互相赋值（b = a）的变量共用存储，分在同一组，存储在组内没有变量再引用它时才释放。
+    params 是（参数名, 类型注解）的列表，自递归调用 function 时实参到参数的传递同样算作赋值。
+    non_lists 是已知不是列表的变量（数值和字符串），它们的加法和切片不分配存储。
+    """
+    def source(node):
+        return node.id if isinstance(node, ast.Name) else None
+
+    def allocated(node):
+        if isinstance(node, ast.Dict):
+            return 'dict'
+        return 'list' if allocates(node) or node in escaping else None
+
+    return sharing_groups(body, params, function, source, allocated, lambda name: name not in non_lists)
+
+def string_source(node):
+    """
+    与字符串表达式 node 的结果共用缓冲区的变量：字符串变量本身、它的切片和下标（指向原字符串内部），
+    以及对它们调用 str() 的结果；其他表达式返回 None。
+    """
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'str' and len(node.args) == 1:
+        node = node.args[0]
+    if isinstance(node, ast.Subscript):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+def owning_strings(body, strings, params=(), function=None):
+    """
+    与 owning_variables 相同，但针对字符串变量（strings）：拼接、str() 和 read_bytes() 的结果在堆上分配或映射
+    （str() 格式化 bool 时得到的是常量，运行时栈槽中保存空指针），切片、下标和对字符串变量调用 str() 与原变量共用缓冲区。
+    返回变量名 ->（'str', 同组的变量名）。
+    """
+    def allocated(node):
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            return 'str'
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in ('str', 'read_bytes'):
+            return 'str'
+        return None
+
+    return sharing_groups(body, params, function, string_source, allocated, lambda name: name in strings)
+
+def sharing_groups(body, params, function, source, allocated, tracked):
+    """
+    owning_variables 和 owning_strings 共用的分组：source(value) 是与 value 共用存储的变量名（没有时为 None），
+    allocated(value) 是 value 新分配的存储的种类（不分配时为 None），只有 tracked(name) 为真的变量参与分组。
+    """
+    owners = {}
+    group = {}  # 并查集：变量名 -> 同组的另一个变量名
+
+    def find(name):
+        while group.setdefault(name, name) != name:
+            group[name] = group[group[name]]
+            name = group[name]
+        return name
+
+    for node in body_nodes(body):
+        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+            target = node.targets[0].id
+            if source(node.value) is not None:
+                group[find(target)] = find(source(node.value))
+            elif allocated(node.value):
+                owners[target] = allocated(node.value)
+        elif is_self_call(node, function):
+            for (name, kind), arg in zip(params, node.args):
+                if source(arg) is not None:
+                    group[find(name)] = find(source(arg))
+                elif allocated(arg) == kind:
+                    owners[name] = kind
+    kinds = {find(name): kind for name, kind in owners.items() if tracked(name)}
+    members = {}
+    for name in list(group):
+        if tracked(name) and find(name) in kinds:
+            members.setdefault(find(name), []).append(name)
+    return {name: (kinds[root], tuple(sorted(names))) for root, names in members.items() for name in names}
+
+def constant_elements(node):
+    """
+    元素全是 32 位整数常量（含负数和 bool）的非空列表字面量返回元素值的列表，否则返回 None。
+    超出 32 位的常量不回绕，这样的列表按普通列表逐个求值，由代码生成报告错误。
+    """
+    values = []
+    for elt in node.elts:
+        sign = 1
+        if isinstance(elt, ast.UnaryOp) and isinstance(elt.op, (ast.USub, ast.UAdd)):
+            sign = -1 if isinstance(elt.op, ast.USub) else 1
+            elt = elt.operand
+        if not (isinstance(elt, ast.Constant) and isinstance(elt.value, int)):
+            return None
+        value = sign * int(elt.value)
+        if not INT32_MIN <= value <= INT32_MAX:
+            return None
+        values.append(value)
+    return values or None
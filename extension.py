@@ -0,0 +1,298 @@
+"""
+扩展模式：把 .pyll 文件中的函数经 JIT 编译为本机代码，在 Python 中像普通函数一样调用。
+
+    import extension
+    kernels = extension.load('kernels.pyll')
+    kernels.total(array('i', [1, 2, 3]))
+
+参数的传递方式：
+    int / bool / float  转换为对应的 C 类型，int 超出 32 位时抛出 OverflowError
+    str                 str 以 UTF-8 编码后传递；bytes、bytearray、mmap 等字节缓冲区直接传递数据指针
+    list                C 连续缓冲区直接传递数据指针：元素为 32 位整数的缓冲区（array('i')、NumPy 的 int32 数组等），
+                        或长度是 4 的倍数的字节缓冲区（bytearray、mmap 等，按本机字节序的 i32 解释）；
+                        被调函数的修改直接作用于原数据，只读的缓冲区先复制一份；
+                        Python 列表和元组复制为 i32 数组，列表在调用后写回修改
+有 dict 参数的函数不导出。运行时（comp.c）用 C 编译器（环境变量 CC，缺省为 cc）编译为共享库，按源码的散列缓存。
+运行时错误（如 --checked 模式下的溢出）抛出同名的 Python 异常（OverflowError、KeyError 等，其他为 RuntimeError），
+出错的调用中分配的内存不再释放；prange 循环体中的错误仍会像独立程序一样结束整个进程。
+"""
+import builtins
+import ctypes
+import functools
+import hashlib
+import operator
+import os
+import subprocess
+import sys
+import tempfile
+
+import llvmlite.binding as binding
+from llvmlite import ir
+
+import codegen
+from codegen import MEMO_CAP, PARAM_TYPES, compile_module
+from optimize import target_machine
+
+RUNTIME_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'comp.c')
+
+INT32_MAX = 2 ** 31 - 1
+
+# LLVM 类型对应的 ctypes 类型，指针（列表、字符串的数据）统一按 void* 传递
+C_TYPES = {
+    'void': None,
+    'i1': ctypes.c_bool,
+    'i32': ctypes.c_int32,
+    'i64': ctypes.c_int64,
+    'double': ctypes.c_double,
+}
+
+_runtime_loaded = False
+
+def load_runtime():
+    """
+    编译（或从缓存中取出）运行时共享库并加载到进程中，JIT 编译的代码通过符号名调用其中的函数。
+    """
+    global _runtime_loaded
+    if _runtime_loaded:
+        return
+    with open(RUNTIME_SOURCE, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    cache = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'pyll')
+    path = os.path.join(cache, f'libcomp-{digest}.so')
+    if not os.path.exists(path):
+        os.makedirs(cache, exist_ok=True)
+        # 先编译到临时文件再改名，多个进程同时编译时不会读到不完整的文件
+        fd, tmp = tempfile.mkstemp(suffix='.so', dir=cache)
+        os.close(fd)
+        try:
+            subprocess.run([os.environ.get('CC', 'cc'), '-O2', '-shared', '-fPIC', '-pthread', RUNTIME_SOURCE, '-o', tmp],
+                           check=True)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+    binding.load_library_permanently(path)
+    _runtime_loaded = True
+
+def c_type(typ):
+    if isinstance(typ, ir.PointerType):
+        return ctypes.c_void_p
+    return C_TYPES[str(typ)]
+
+class Py_buffer(ctypes.Structure):
+    # CPython 的缓冲区协议结构体（Include/pybuffer.h）
+    _fields_ = [
+        ('buf', ctypes.c_void_p),
+        ('obj', ctypes.c_void_p),
+        ('len', ctypes.c_ssize_t),
+        ('itemsize', ctypes.c_ssize_t),
+        ('readonly', ctypes.c_int),
+        ('ndim', ctypes.c_int),
+        ('format', ctypes.c_char_p),
+        ('shape', ctypes.c_void_p),
+        ('strides', ctypes.c_void_p),
+        ('suboffsets', ctypes.c_void_p),
+        ('internal', ctypes.c_void_p),
+    ]
+
+PyBUF_FORMAT = 0x0004
+PyBUF_C_CONTIGUOUS = 0x0038
+
+_get_buffer = ctypes.pythonapi.PyObject_GetBuffer
+_get_buffer.argtypes = [ctypes.py_object, ctypes.POINTER(Py_buffer), ctypes.c_int]
+_get_buffer.restype = ctypes.c_int
+_release_buffer = ctypes.pythonapi.PyBuffer_Release
+_release_buffer.argtypes = [ctypes.POINTER(Py_buffer)]
+_release_buffer.restype = None
+
+# 缓冲区的元素格式（struct 模块的写法，去掉本机字节序前缀）-> 元素大小
+# 只接受 'i'：'l'（C 的 long）在 LP64 的 Linux / macOS 上是 8 字节，不是 32 位整数
+INT32_FORMATS = {'i': 4}
+BYTE_FORMATS = {'B': 1, 'b': 1, 'c': 1}
+
+def buffer_argument(value, itemsize, formats, what, after):
+    """
+    通过缓冲区协议取得 C 连续缓冲区的（数据指针, 元素个数, 是否只读），不复制数据。
+    formats 是可以接受的元素格式，字节格式的缓冲区按 itemsize 大小的元素解释。
+    缓冲区一直持有到调用结束（由 after 释放），调用期间 bytearray 等对象不能改变大小。
+    """
+    view = Py_buffer()
+    try:
+        _get_buffer(value, ctypes.byref(view), PyBUF_C_CONTIGUOUS | PyBUF_FORMAT)
+    except BufferError as e:
+        raise TypeError(f"expected a C-contiguous buffer of {what}: {e}") from None
+    after.append(lambda: _release_buffer(ctypes.byref(view)))
+    fmt = (view.format or b'B').decode()
+    if fmt[:1] in '@=' or fmt[:1] == {'little': '<', 'big': '>'}[sys.byteorder]:
+        fmt = fmt[1:]
+    if formats.get(fmt) != view.itemsize:
+        raise TypeError(f"expected a buffer of {what}, got format '{fmt}' with item size {view.itemsize}")
+    if view.len % itemsize:
+        raise TypeError(f"expected a buffer of {what}, got {view.len} bytes")
+    count = view.len // itemsize
+    if count > INT32_MAX:
+        raise OverflowError(f"buffer of {count} items is too large")
+    return view.buf, count, bool(view.readonly)
+
+def int_argument(value, after, bits=32):
+    # bits 是签名中参数的位数，超出范围的值不截断
+    value = operator.index(value)
+    if not -2 ** (bits - 1) <= value < 2 ** (bits - 1):
+        raise OverflowError(f"{value} does not fit in a {bits}-bit int parameter")
+    return [value]
+
+def float_argument(value, after):
+    return [float(value)]
+
+def bool_argument(value, after):
+    return [bool(value)]
+
+def str_argument(value, after):
+    if isinstance(value, str):
+        data = value.encode('utf-8')
+        # c_char_p 对象持有 data 的引用，调用期间不会被释放
+        return [ctypes.c_char_p(data), len(data)]
+    # 字符串不可变，被调函数不会写入，只读的缓冲区也可以直接传递
+    address, length, readonly = buffer_argument(value, 1, BYTE_FORMATS, 'bytes', after)
+    return [address, length]
+
+def list_argument(value, after):
+    if isinstance(value, (list, tuple)):
+        items = (ctypes.c_int32 * len(value))(*value)
+        if isinstance(value, list):
+            # 被调函数可以修改列表元素，调用结束后写回
+            after.append(lambda: value.__setitem__(slice(None), items))
+        return [items, len(value)]
+    address, length, readonly = buffer_argument(value, 4, {**INT32_FORMATS, **BYTE_FORMATS}, '32-bit ints', after)
+    if readonly:
+        # 被调函数可能给元素赋值，只读的缓冲区（bytes、只读的 NumPy 数组等）传递副本
+        items = (ctypes.c_int32 * length)()
+        ctypes.memmove(items, address, length * 4)
+        return [items, length]
+    return [address, length]
+
+# 参数类型注解 -> 把 Python 值转换为 C 实参的函数；after 收集调用结束后要执行的操作
+ARGUMENTS = {
+    'int': int_argument,
+    'float': float_argument,
+    'bool': bool_argument,
+    'str': str_argument,
+    'list': list_argument,
+}
+
+def catching_module(exported):
+    """
+    为每个导出的函数生成入口 <name>.catch(参数..., 返回值指针)：先用 setjmp 登记跳转点（见 comp.c 的 runtime_catch）
+    再调用函数，正常返回时写入返回值并返回 0；运行时错误跳回这里，返回 1。setjmp 必须在不返回的栈帧中调用，
+    因此入口用 LLVM IR 生成，而不是在 Python 中。
+    """
+    module = ir.Module(name='catch')
+    module.triple = binding.get_process_triple()
+    i32 = ir.IntType(32)
+    void_p = ir.IntType(8).as_pointer()
+    catch = ir.Function(module, ir.FunctionType(void_p, []), name='runtime_catch')
+    uncatch = ir.Function(module, ir.FunctionType(ir.VoidType(), []), name='runtime_uncatch')
+    setjmp = ir.Function(module, ir.FunctionType(i32, [void_p]), name='_setjmp')
+    setjmp.attributes.add('returns_twice')
+    for name, (kinds, func_type) in exported.items():
+        target = ir.Function(module, func_type, name=name)
+        returns = not isinstance(func_type.return_type, ir.VoidType)
+        args = list(func_type.args) + ([func_type.return_type.as_pointer()] if returns else [])
+        entry = ir.Function(module, ir.FunctionType(i32, args), name=f'{name}.catch')
+        b = ir.IRBuilder(entry.append_basic_block('entry'))
+        call_block = entry.append_basic_block('call')
+        error_block = entry.append_basic_block('error')
+        jumped = b.call(setjmp, [b.call(catch, [])])
+        b.cbranch(b.icmp_signed('==', jumped, ir.Constant(i32, 0)), call_block, error_block)
+        b.position_at_end(call_block)
+        result = b.call(target, entry.args[:len(func_type.args)])
+        if returns:
+            b.store(result, entry.args[-1])
+        b.call(uncatch, [])
+        b.ret(ir.Constant(i32, 0))
+        b.position_at_end(error_block)
+        b.ret(ir.Constant(i32, 1))
+    return binding.parse_assembly(str(module))
+
+def runtime_exception():
+    # 运行时错误消息形如 "line 3: OverflowError: ..."，按其中的异常名构造同名的 Python 异常
+    error_message = ctypes.CFUNCTYPE(ctypes.c_char_p)(binding.address_of_symbol('runtime_error_message'))
+    message = error_message().decode('utf-8', 'replace')
+    name = message.split(': ')[1] if ': ' in message else ''
+    cls = getattr(builtins, name, None)
+    if not (isinstance(cls, type) and issubclass(cls, Exception)):
+        cls = RuntimeError
+    return cls(message)
+
+class NativeFunction:
+    """
+    JIT 编译出的一个用户函数，按参数的类型注解转换实参后经 catching_module 生成的入口通过 ctypes 调用。
+    """
+    def __init__(self, name, address, kinds, func_type):
+        self.__name__ = name
+        self.kinds = kinds
+        self.converters = []
+        index = 0
+        for kind in kinds:
+            converter = ARGUMENTS[kind]
+            if kind == 'int':
+                # int 参数按签名中的 C 类型检查范围
+                converter = functools.partial(int_argument, bits=func_type.args[index].width)
+            self.converters.append(converter)
+            index += len(PARAM_TYPES[kind])
+        self._restype = c_type(func_type.return_type)
+        args = [c_type(arg) for arg in func_type.args]
+        if self._restype is not None:
+            args.append(ctypes.POINTER(self._restype))
+        self._cfunc = ctypes.CFUNCTYPE(ctypes.c_int32, *args)(address)
+
+    def __call__(self, *args):
+        if len(args) != len(self.kinds):
+            raise TypeError(f"{self.__name__}() takes {len(self.kinds)} argument(s) but {len(args)} were given")
+        c_args = []
+        after = []
+        try:
+            for value, converter in zip(args, self.converters):
+                c_args.extend(converter(value, after))
+            result = self._restype() if self._restype is not None else None
+            if result is not None:
+                c_args.append(ctypes.byref(result))
+            if self._cfunc(*c_args):
+                raise runtime_exception()
+            return result.value if result is not None else None
+        finally:
+            for finish in after:
+                finish()
+
+    def __repr__(self):
+        return f"<native function {self.__name__}({', '.join(self.kinds)})>"
+
+class Library:
+    """
+    一个编译好的 .pyll 文件，每个导出的函数是一个同名属性。执行引擎持有生成的机器码，必须与函数对象一起保持存活。
+    """
+    def __init__(self, code, filename='<input>', opt_level=2, memo_cap=MEMO_CAP, checked=False):
+        load_runtime()
+        module = compile_module(code, filename, opt_level, memo_cap, checked, export=True)
+        exported = codegen.exported_functions()
+        exported = {name: (kinds, func_type) for name, (kinds, func_type) in exported.items()
+                    if all(kind in ARGUMENTS for kind in kinds)}
+        self._engine = binding.create_mcjit_compiler(module, target_machine())
+        self._engine.add_module(catching_module(exported))
+        self._engine.finalize_object()
+        self.functions = {}
+        for name, (kinds, func_type) in exported.items():
+            function = NativeFunction(name, self._engine.get_function_address(f'{name}.catch'), kinds, func_type)
+            self.functions[name] = function
+            setattr(self, name, function)
+
+    def __repr__(self):
+        return f"<pyll library with {', '.join(self.functions) or 'no functions'}>"
+
+def load(path, **options):
+    """
+    编译 path 指向的 .pyll 文件并返回 Library，options 与 compile_module 的同名参数相同（opt_level、memo_cap、checked）。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        code = f.read()
+    return Library(code, path, **options)
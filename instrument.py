@@ -0,0 +1,60 @@
+"""
+插桩构建（--instrument）：在每个函数的入口、每条语句、条件语句的每个分支和循环体的开头给一个 64 位计数器加一，
+main 开始时把计数器登记到运行时（comp.c 的 profile_register），程序退出时写出执行剖面（格式见 profiledata.py）。
+计数器用 monotonic 的原子加法更新，prange 的多个线程执行同一段代码时计数也是准确的。
+"""
+from llvmlite import ir
+
+from llvm import Int, Long, Char, PChar, Void
+from profiledata import Site, default_path, header, site_line
+
+class Instrumentation:
+    def __init__(self, module, filename, digest):
+        self.module = module
+        self.filename = filename
+        self.digest = digest
+        self.sites = []
+        self.counters = []
+
+    def count(self, func, kind, node):
+        """
+        在 func 的当前插入位置给计数点（kind, 函数名, node 的位置）的计数器加一。
+        """
+        counter = ir.GlobalVariable(self.module, Long, name=self.module.get_unique_name('prof.counter'))
+        counter.linkage = 'internal'
+        counter.initializer = ir.Constant(Long, 0)
+        func.builder.atomic_rmw('add', counter, ir.Constant(Long, 1), 'monotonic')
+        self.sites.append(Site(kind, func.func.name, node.lineno, node.col_offset))
+        self.counters.append(counter)
+
+    def string(self, name, text):
+        data = bytearray(text.encode('utf-8') + b'\0')
+        typ = ir.ArrayType(Char, len(data))
+        value = ir.GlobalVariable(self.module, typ, name=self.module.get_unique_name(name))
+        value.global_constant = True
+        value.linkage = 'private'
+        value.initializer = ir.Constant(typ, data)
+        return value
+
+    def register(self, main, runtime):
+        """
+        在 main 的入口登记所有计数器。runtime 是 LLVM.runtime，用来声明 profile_register。
+        """
+        pointer = Long.as_pointer()
+        table_type = ir.ArrayType(pointer, len(self.counters))
+        table = ir.GlobalVariable(self.module, table_type, name='prof.counters')
+        table.global_constant = True
+        table.linkage = 'private'
+        table.initializer = ir.Constant(table_type, self.counters)
+        register = runtime('profile_register', (Void, [pointer.as_pointer(), Int, PChar, PChar, PChar]))
+        strings = [
+            self.string('prof.header', header(self.digest, self.filename)),
+            self.string('prof.sites', ''.join(site_line(site) for site in self.sites)),
+            self.string('prof.path', default_path(self.filename)),
+        ]
+
+        def emit(builder):
+            first = [ir.Constant(Int, 0), ir.Constant(Int, 0)]
+            counters, header_ptr, sites_ptr, path_ptr = (builder.gep(value, first, inbounds=True) for value in [table] + strings)
+            builder.call(register, [counters, ir.Constant(Int, len(self.counters)), header_ptr, sites_ptr, path_ptr])
+        main.at_entry(emit)
@@ -1,8 +1,12 @@
+import sys
 from Token import Token
+from errors import CompilerError
 
 class Lexer:
-    def __init__(self, text):
+    def __init__(self, text, filename='<input>'):
         self.text = text
+        self.filename = filename
+        self.errors = []    # 收集到的词法错误，出错后继续分析
         self.pos = 0
         self.current_line = 1
         self.current_column = 1
@@ -23,17 +27,16 @@ class Lexer:
                 self.current_column += 1
             elif self.text[self.pos].isalpha() or self.text[self.pos] == '_':
                 self.identifier()
-            elif self.text[self.pos].isdigit() or (self.text[self.pos] == '-' and self.pos + 1 < len(self.text) and self.text[self.pos + 1].isdigit()):
+            elif self.text[self.pos].isdigit():
                 self.tokens.append(self.number())
             elif self.text[self.pos] == '"' or self.text[self.pos] == '\'':
                 self.tokens.append(self.string(self.text[self.pos]))
             else:
                 self.tokens.append(self.operator())
             if self.tokens and self.tokens[-1].type == 'UNKNOWN':
-                RED = '\033[31m'
-                RESET = '\033[0m'
-                print(f"{RED}Error: Unknown token at line {self.current_line}, column {self.current_column}, character '{self.tokens[-1].value}'{RESET}")
-                exit(1)
+                # 记录错误并丢弃该字符，继续向后分析
+                token = self.tokens.pop()
+                self.errors.append(CompilerError(f"Unknown token '{token.value}'.", self.filename, token.line, token.column - len(token.value)))
 
         self.tokens.append(Token(self.pos, 'EOF', None, self.current_line, self.current_column))
         return self.tokens
@@ -52,7 +55,8 @@ class Lexer:
         while self.pos < len(self.text) and (self.text[self.pos].isalnum() or self.text[self.pos] == '_'):
             self.pos += 1
             self.current_column += 1
-        value = self.text[start:self.pos]
+        # 标识符驻留（intern），符号表中的字典查找可以直接比较对象身份
+        value = sys.intern(self.text[start:self.pos])
         keywords = {
             'if': 'IF', 'elif': 'ELIF', 'else': 'ELSE', 'while': 'WHILE', 
             'for': 'FOR', 'in': 'IN', 'def': 'DEF', 'return': 'RETURN', 
@@ -63,22 +67,28 @@ class Lexer:
         # Check if it's a function call
         if token_type == 'IDENTIFIER' and self.pos < len(self.text) and self.text[self.pos] == '(':
             # Check if the previous token is 'DEF'
-            if self.tokens and self.tokens[-1].type != 'DEF':
+            if not self.tokens or self.tokens[-1].type != 'DEF':
                 token_type = 'FUNC_CALL'
         elif token_type == 'IDENTIFIER' and self.pos < len(self.text) and self.text[self.pos] == '[':
-            if self.tokens and self.tokens[-1].type != 'DEF':
+            if not self.tokens or self.tokens[-1].type != 'DEF':
                 token_type = 'ARRAY_MEMBER'
         
         self.tokens.append(Token(self.pos, token_type, value, self.current_line, self.current_column))
 
     def number(self):
+        # 负号总是作为 MINUS 记号，由语法分析器处理一元负号
         start = self.pos
-        if self.text[self.pos] == '-':
-            self.pos += 1
-            self.current_column += 1
         while self.pos < len(self.text) and (self.text[self.pos].isdigit() or self.text[self.pos] == '.'):
             self.pos += 1
             self.current_column += 1
+        # 浮点数的指数部分：1e10、2.5E-3
+        exponent = self.text[self.pos:self.pos + 3]
+        if exponent[:1] in ('e', 'E') and (exponent[1:2].isdigit() or (exponent[1:2] in ('+', '-') and exponent[2:3].isdigit())):
+            self.pos += 2
+            self.current_column += 2
+            while self.pos < len(self.text) and self.text[self.pos].isdigit():
+                self.pos += 1
+                self.current_column += 1
         return Token(self.pos, 'NUMBER', self.text[start:self.pos], self.current_line, self.current_column)
 
     def string(self, quote):
@@ -100,15 +110,19 @@ class Lexer:
         operators = {
             '=': 'ASSIGN',
             ':': 'COLON',
+            '@': 'AT',
             ',': 'COMMA',
             '+': 'PLUS',
             '-': 'MINUS',
             '*': 'MULTIPLY',
             '//': 'DIVIDE',
+            '%': 'MOD',
             '(': 'LPAREN',
             ')': 'RPAREN',
             '[': 'LBRACKET',
             ']': 'RBRACKET',
+            '{': 'LBRACE',
+            '}': 'RBRACE',
             '<': 'LT',
             '>': 'GT',
             '<=': 'LTE',
@@ -133,8 +147,10 @@ def main():
     filename = sys.argv[1]
     with open(filename, 'r') as file:
         source_code = file.read()
-        lexer = Lexer(source_code)
+        lexer = Lexer(source_code, filename)
         tokens = lexer.tokenize()
+        for error in lexer.errors:
+            print(f"Error: {error}")
         with open(filename + '.tokens', 'w') as token_file:
             for token in tokens:
                 token_file.write(f"{token}\n")
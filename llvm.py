@@ -1,19 +1,40 @@
+import os
+import re
+
 from llvmlite import ir
 from llvmlite.ir import Type
 
 # Ͷ
 Int = ir.IntType(32)
+Long = ir.IntType(64)
+Double = ir.DoubleType()
 PInt = ir.PointerType(Int)
 Bool = ir.IntType(1)
 Void = ir.VoidType()
 Char = ir.IntType(8)
 PChar = ir.PointerType(Char)
+PDict = ir.PointerType(ir.global_context.get_identified_type('dict'))   # ʱĹϣԱ͸
+
+RUNTIME_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'comp.c')
+
+_runtime_names = None
+
+# ʱ⣨comp.cжɼ staticĺʱûͬһ LLVM ģУ
+# չģʽûҪʱһӣûʹЩ
+def runtime_names():
+    global _runtime_names
+    if _runtime_names is None:
+        with open(RUNTIME_SOURCE, 'rb') as f:
+            source = f.read().decode('gbk')
+        _runtime_names = frozenset(re.findall(r'^(?!static\b|typedef\b)[A-Za-z_][\w \t*]*?\b(\w+)\s*\(', source, re.M))
+    return _runtime_names
 
 class Function:
     def __init__(self, func, init):
         self.func = func
         self.builder = ir.IRBuilder(self.getBlock('entry')) if init else None
         self.var = {}
+        self.param_kinds = None    # û'int'/'bool'/'str'/'list'ʱݴ˴
 
     def getBlock(self, label_name):
         return self.func.append_basic_block(label_name)
@@ -22,9 +43,27 @@ class Function:
     def get(module, name, typ, init=False):
         return Function(ir.Function(module, ir.FunctionType(*typ), name), init)
 
+    def entry_alloca(self, typ, name=''):
+        # alloca ͳһڿ鿪ͷֻһջռ䣬ʹô֮ǰɱ mem2reg ΪĴ
+        return self.at_entry(lambda builder: builder.alloca(typ, name=name))
+
+    def entry_call(self, callee, args, name=''):
+        # ڿ鿪ͷúǳÿִֻһ
+        return self.at_entry(lambda builder: builder.call(callee, args, name=name))
+
+    def at_entry(self, emit):
+        entry = self.func.entry_basic_block
+        builder = ir.IRBuilder(entry)
+        builder.position_at_start(entry)
+        value = emit(builder)
+        if self.builder.block is entry:
+            # IRBuilder ±¼λãڿײҪѵǰ¶λĩβ
+            self.builder.position_at_end(entry)
+        return value
+
     def alloc(self, name, value, typ=Int):
         if name not in self.var:
-            mem = self.builder.alloca(typ, name=name+"_alloc")
+            mem = self.entry_alloca(typ, name+"_alloc")
             self.builder.store(value, mem)
             self.var[name] = Variable(self, mem, typ)
         else:
@@ -45,6 +84,9 @@ class LLVM:
         self.main = Function.get(self.module, 'main', (Int, []), True)
         self.functions = {
             'main': self.main,
+        }
+        # ʱеĺûֿǼǣûֻ functions в
+        self.runtime_functions = {
             'print_i32': Function.get(self.module, 'print_i32', (Void, [Int])),
             'print_str': Function.get(self.module, 'print_str', (Void, [PChar])),	
         }
@@ -56,8 +98,14 @@ class LLVM:
             func = self.functions[func_name]
         return func.getBlock(label_name)
 
+    def runtime(self, name, typ):
+        # ʱ⣨comp.cеĺڵһʹʱ
+        if name not in self.runtime_functions:
+            self.runtime_functions[name] = Function.get(self.module, name, typ)
+        return self.runtime_functions[name].func
+
     def getFunction(self, name):
-        return self.functions[name].func
+        return self.runtime_functions[name].func
 
     def getBuilder(self, name):
         return self.functions[name].builder
@@ -4,7 +4,7 @@ grammar minipy3;
 program: (statement NEWLINE | NEWLINE)* EOF;
 statement: simpleStmt | compoundStmt;
 simpleStmt: assignmentStmt | returnStmt;
-compoundStmt: ifStmt | whileStmt | forStmt | funcDef;
+compoundStmt: ifStmt | whileStmt | forStmt | funcDef | decorated;
 assignmentStmt: IDENTIFIER ASSIGN expression | arrayMember ASSIGN expression;
 returnStmt: RETURN expression?;
 ifStmt: IF condition COLON NEWLINE program (elifStmt | elseStmt)?;
@@ -14,21 +14,23 @@ whileStmt: WHILE condition COLON NEWLINE program;
 forStmt: FOR IDENTIFIER IN expression COLON NEWLINE program;
 funcDef: DEF IDENTIFIER LPAREN parameters? RPAREN COLON NEWLINE program;
 parameters: IDENTIFIER (COMMA IDENTIFIER)*;
+decorated: AT IDENTIFIER NEWLINE funcDef;
 
 condition: logicExpr;
 logicExpr: comparison (logicOp comparison)*;
 comparison: NOT comparison | algebraicExpr (conditionOp algebraicExpr)?;
 logicOp: AND | OR;
-expression: algebraicExpr | STRING_LITERAL | list | TRUE | FALSE;
+expression: algebraicExpr | STRING_LITERAL | list | dict | TRUE | FALSE;
 algebraicExpr: term termTail;
 termTail: (PLUS term termTail) | (MINUS term termTail) | ;
 term: factor factorTail;
-factorTail: (MULTIPLY factor factorTail) | (DIVIDE factor factorTail) | ;
-factor: IDENTIFIER | NUMBER | LPAREN algebraicExpr RPAREN | funcCall | arrayMember;
+factorTail: (MULTIPLY factor factorTail) | (DIVIDE factor factorTail) | (MOD factor factorTail) | ;
+factor: MINUS factor | IDENTIFIER | NUMBER | LPAREN algebraicExpr RPAREN | funcCall | arrayMember;
 
 funcCall: IDENTIFIER LPAREN (expression (COMMA expression)*)? RPAREN;
 list: LBRACKET (expression (COMMA expression)*)? RBRACKET;
-arrayMember: IDENTIFIER LBRACKET expression RBRACKET;
+dict: LBRACE (expression COLON expression (COMMA expression COLON expression)*)? RBRACE;
+arrayMember: IDENTIFIER LBRACKET (expression | expression? COLON expression?) RBRACKET;
 
 // 词法规则（Lexer Rules）
 RETURN: 'return';
@@ -44,14 +46,18 @@ OR: 'or';
 NOT: 'not';
 ASSIGN: '=';
 COLON: ':';
+AT: '@';
 COMMA: ',';
 PLUS: '+';
 MINUS: '-';
 MULTIPLY: '*';
 DIVIDE: '//';
+MOD: '%';
 LPAREN: '(';
 RPAREN: ')';
 LBRACKET: '[';
+LBRACE: '{';
+RBRACE: '}';
 RBRACKET: ']';
 TRUE: 'True';
 FALSE: 'False';
@@ -59,9 +65,9 @@ NEWLINE: '\r'? '\n' INDENT?;
 INDENT: ('\t')+;
 WS: [ \t]+ -> skip;
 
-conditionOp: '==' | '!=' | '>' | '<' | '>=' | '<=';
+conditionOp: '==' | '!=' | '>' | '<' | '>=' | '<=' | IN;
 IDENTIFIER: [a-zA-Z_][a-zA-Z0-9_]*;
-NUMBER: '-'? [0-9]+ ('.' [0-9]+)?;
+NUMBER: '-'? [0-9]+ ('.' [0-9]+)? ([eE] [+-]? [0-9]+)?;
 STRING_LITERAL: 
     ('"' (~["\r\n] | '""')* '"') 
     | 
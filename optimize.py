@@ -0,0 +1,32 @@
+"""
+使用 LLVM 的 pass 管线优化生成的模块。
+用户函数是 internal 的，因此 -O1 以上的管线可以完成内联、过程间常量传播（IPSCCP）和无用函数删除。
+"""
+import llvmlite.binding as binding
+
+_target_machine = None
+
+def target_machine():
+    # 延迟初始化本机目标，只有真正需要时才付出初始化的开销
+    global _target_machine
+    if _target_machine is None:
+        binding.initialize_native_target()
+        binding.initialize_native_asmprinter()
+        _target_machine = binding.Target.from_default_triple().create_target_machine()
+    return _target_machine
+
+def optimize(module_ir, level=2):
+    """
+    解析 IR 文本，校验后运行 -O<level> 优化管线，返回 llvmlite.binding 的模块对象。
+    level 为 0 时只做解析和校验。
+    """
+    module = binding.parse_assembly(module_ir)
+    module.verify()
+    if level > 0:
+        # 带上本机的 triple 和数据布局，向量化等依赖目标信息的优化才能生效
+        module.triple = target_machine().triple
+        module.data_layout = str(target_machine().target_data)
+        tuning = binding.create_pipeline_tuning_options(speed_level=level)
+        pass_builder = binding.create_pass_builder(target_machine(), tuning)
+        pass_builder.getModulePassManager().run(module, pass_builder)
+    return module
@@ -2,25 +2,117 @@ from Token import Token
 from lexer import Lexer
 import sys
 import ast
-import json
-from symbol_table import SymbolTable
+from symbol_table import SymbolTable, SymbolError
+from errors import CompilerError, CompilerErrors
+
+# 二元运算符表：记号类型 -> (优先级, AST 运算符类)，优先级越大结合越紧
+BINARY_OPERATORS = {
+    'OR': (1, ast.Or),
+    'AND': (2, ast.And),
+    'LT': (4, ast.Lt), 'GT': (4, ast.Gt), 'LTE': (4, ast.LtE), 'GTE': (4, ast.GtE),
+    'EQUALS': (4, ast.Eq), 'NOT_EQUALS': (4, ast.NotEq), 'IN': (4, ast.In),
+    'PLUS': (5, ast.Add), 'MINUS': (5, ast.Sub),
+    'MULTIPLY': (6, ast.Mult), 'DIVIDE': (6, ast.FloorDiv), 'MOD': (6, ast.Mod),
+}
+
+# 前缀运算符表：not 的优先级低于比较运算符，负号高于所有二元运算符
+UNARY_OPERATORS = {
+    'NOT': (3, ast.Not),
+    'MINUS': (7, ast.USub),
+}
+
+# 运算符栈中左括号的占位符
+PAREN = None
+
+# 函数参数可以使用的类型注解
+PARAM_TYPES = ['int', 'bool', 'float', 'str', 'list', 'dict']
+
+# 数值类型：相互运算或赋值时自动放宽，不视为类型冲突
+NUMERIC_TYPES = ['bool', 'int', 'float']
+
+# 支持的函数装饰器
+DECORATORS = ['memo']
+
+# 内置函数，可以在函数内被同名的局部变量遮蔽
+BUILTIN_FUNCTIONS = ['print', 'range', 'prange', 'len', 'sum', 'min', 'max', 'int', 'float', 'str', 'read_ints', 'read_bytes']
 
 class Parser:
-    def __init__(self, tokens):
+    def __init__(self, tokens, filename='<input>', errors=None):
         self.tokens = tokens
+        self.filename = filename
+        self.errors = errors if errors is not None else []  # 收集到的全部错误
+        self.error_lines = {e.lineno for e in self.errors}  # 每行只报告第一个错误，避免连锁错误
         self.current_token_index = 0
         self.current_token = self.tokens[self.current_token_index]
         self.indent_level = 0
+        self.return_types = []  # 正在解析的各层函数中 return 语句的类型
         self.symbol_table = SymbolTable()  # 全局符号表
-        self.symbol_table.define('print', 'function')
-        self.symbol_table.define('range', 'function')
-        self.symbol_table.define('len', 'function')
+        for name in BUILTIN_FUNCTIONS:
+            self.symbol_table.define(name, 'function')
         
     def error(self, message="Parsing error"):
-        RED = '\033[31m'
-        RESET = '\033[0m'
-        print(f"{RED}Error at token {self.current_token}: {message} {RESET}")
-        sys.exit(1)
+        # 记录错误后抛出，由语句级的错误恢复捕获
+        error = CompilerError(message, self.filename, self.current_token.line, self.current_token.column)
+        if error.lineno not in self.error_lines:
+            self.errors.append(error)
+            self.error_lines.add(error.lineno)
+        raise error
+
+    def define(self, name, symbol_type, **attributes):
+        # 在当前作用域定义符号，重复定义（如重名的参数）作为普通的语法错误报告
+        try:
+            return self.symbol_table.define(name, symbol_type, **attributes)
+        except SymbolError as e:
+            self.error(str(e))
+
+    def synchronize(self, start):
+        """
+        错误恢复（panic mode）：丢弃记号直到行尾，从下一行（NEWLINE / INDENT 边界）重新开始解析。
+        start 是出错语句开始时的记号下标，用于保证每次恢复至少前进一个记号。
+        """
+        if self.current_token_index > start and (
+                self.current_token.type == 'INDENT' or self.tokens[self.current_token_index - 1].type == 'NEWLINE'):
+            # 出错位置已经在新一行的开头，这一行本身可能是正确的，不必丢弃
+            return
+        while self.current_token.type not in ['NEWLINE', 'EOF']:
+            self.consume(self.current_token.type)
+        if self.current_token.type == 'NEWLINE':
+            self.consume('NEWLINE')
+
+    def skip_nested_lines(self):
+        """
+        跳过出错语句之后仍属于它的行：缩进更深的代码块，以及同一层的 elif / else 分支，
+        避免一个错误引出一连串缩进错误。
+        """
+        while self.current_token.type != 'EOF':
+            if self.current_token.type == 'INDENT':
+                level = self.tab2indent_level(self.current_token)
+                first = self.lookahead(1).type
+            else:
+                level = 0
+                first = self.current_token.type
+            if level > self.indent_level or (level == self.indent_level and first in ['ELIF', 'ELSE']):
+                self.synchronize(self.current_token_index)
+            else:
+                break
+
+    def guarded_statement(self):
+        """
+        解析一条语句。出错时恢复符号表和缩进状态、同步到下一行，并返回 None。
+        """
+        start = self.current_token_index
+        scope_depth = self.symbol_table.depth
+        indent_level = self.indent_level
+        function_depth = len(self.return_types)
+        try:
+            return self.statement()
+        except CompilerError:
+            self.symbol_table.restore(scope_depth)
+            del self.return_types[function_depth:]
+            self.indent_level = indent_level
+            self.synchronize(start)
+            self.skip_nested_lines()
+            return None
 
     def consume(self, token_type):
         if self.current_token.type == token_type:
@@ -48,12 +140,41 @@ class Parser:
         """
         根据 AST 节点推断类型和长度。
         返回一个元组 (type, length)，其中 length 可以是 None。
+        深层嵌套的表达式不能递归推断，用显式的栈按后序先推断子表达式，再由 node_type 合并。
+        """
+        types = {}
+        stack = [(node, False)]
+        while stack:
+            current, ready = stack.pop()
+            operands = self.type_operands(current)
+            if operands and not ready:
+                stack.append((current, True))
+                stack.extend((operand, False) for operand in operands)
+            else:
+                types[id(current)] = self.node_type(current, [types[id(operand)] for operand in operands])
+        return types[id(node)]
+
+    def type_operands(self, node):
+        # 类型取决于哪些子表达式的类型
+        if isinstance(node, ast.BinOp):
+            return [node.left, node.right]
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.USub, ast.UAdd)):
+            return [node.operand]
+        elif isinstance(node, ast.Subscript):
+            return [node.value]
+        return []
+
+    def node_type(self, node, operands):
+        """
+        由子表达式的类型（operands，顺序与 type_operands 相同）推断 node 的 (type, length)。
         """
         if isinstance(node, ast.Constant):
-            if isinstance(node.value, int):
-                return ('int', None)
-            elif isinstance(node.value, bool):
+            if isinstance(node.value, bool):
                 return ('bool', None)
+            elif isinstance(node.value, int):
+                return ('int', None)
+            elif isinstance(node.value, float):
+                return ('float', None)
             elif isinstance(node.value, str):
                 return ('str', len(node.value))
             else:
@@ -61,11 +182,22 @@ class Parser:
         elif isinstance(node, ast.List):
             # 假设列表中的元素类型为 int，长度为 len(node.elts)
             return ('list', len(node.elts))
+        elif isinstance(node, ast.Dict):
+            # 字典的值为 int，键为 int 或 str
+            return ('dict', None)
         elif isinstance(node, ast.BinOp):
-            left_type, left_length = self.infer_type(node.left)
-            right_type, right_length = self.infer_type(node.right)
+            (left_type, left_length), (right_type, right_length) = operands
             if left_type == right_type and left_type in ['int', 'bool']:
                 return (left_type, None)
+            elif left_type in NUMERIC_TYPES and right_type in NUMERIC_TYPES:
+                return ('float' if 'float' in (left_type, right_type) else 'int', None)
+            elif left_type == right_type == 'list' and isinstance(node.op, ast.Add):
+                # 列表拼接，结果长度在运行时确定
+                return ('list', None)
+            elif isinstance(node.op, ast.Add) and 'str' in (left_type, right_type) \
+                    and {left_type, right_type} <= {'str', 'char'}:
+                # 字符串拼接（字符串的下标是单个字符，也可以参与拼接）
+                return ('str', None)
             else:
                 return ('unknown', None)
         elif isinstance(node, ast.Call):
@@ -73,16 +205,27 @@ class Parser:
             # 假设内置函数返回类型如下
             built_in_return_types = {
                 'len': 'int',
+                'sum': 'int',
+                'min': 'int',
+                'max': 'int',
+                'int': 'int',
+                'float': 'float',
+                'str': 'str',
+                'read_ints': 'list',
+                'read_bytes': 'str',
                 'print': 'unknown',
                 'range': 'unknown',  # 这里只是示例，具体类型根据需要定义
+                'prange': 'unknown',
             }
-            return (built_in_return_types.get(func_name, 'unknown'), None)
+            if func_name in built_in_return_types:
+                return (built_in_return_types[func_name], None)
+            # 用户函数的返回类型在解析完函数体后记录在符号表中
+            symbol = self.symbol_table.lookup(func_name)
+            return ((symbol and symbol.data_type) or 'unknown', None)
         elif isinstance(node, ast.Name):
             symbol = self.symbol_table.lookup(node.id)
             if symbol:
-                if 'length' in symbol.attributes:
-                    return (symbol.attributes['data_type'], symbol.attributes['length'])
-                return (symbol.attributes['data_type'], None)
+                return (symbol.data_type or 'unknown', symbol.length)
             else:
                 return ('unknown', None)
         elif isinstance(node, ast.BoolOp):
@@ -94,14 +237,17 @@ class Parser:
         elif isinstance(node, ast.UnaryOp):
             # 一元操作符，根据操作符类型推断
             if isinstance(node.op, (ast.Not, ast.USub, ast.UAdd)):
-                return self.infer_type(node.operand)
+                return operands[0]
             else:
                 return ('unknown', None)
         elif isinstance(node, ast.Subscript):
             # 获取子元素的类型，基于容器类型
-            container_type, _ = self.infer_type(node.value)
-            if container_type == 'list':
-                return ('int', None)  # 假设列表元素为 int
+            container_type, _ = operands[0]
+            if isinstance(node.slice, ast.Slice):
+                # 切片的类型与原容器相同
+                return (container_type, None)
+            elif container_type in ('list', 'dict'):
+                return ('int', None)  # 假设列表元素和字典的值为 int
             elif container_type == 'str':
                 return ('char', None)  # 假设字符串元素为 char (i8)
             else:
@@ -110,12 +256,15 @@ class Parser:
             return ('unknown', None)
 
     def parse(self):
-        return self.program()
+        program = self.program()
+        if self.errors:
+            raise CompilerErrors(sorted(self.errors, key=lambda e: (e.lineno, e.col_offset)))
+        return program
 
     def program(self):
         statements = []
         while self.current_token.type != 'EOF':
-            statements.append(self.statement())
+            statements.append(self.guarded_statement())
         statements = list(filter(lambda x: x is not None, statements))
         return ast.Module(body=statements, type_ignores=[])
 
@@ -124,6 +273,8 @@ class Parser:
             return self.assignment_statement()
         elif self.current_token.type == 'DEF':
             return self.function_definition()
+        elif self.current_token.type == 'AT':
+            return self.decorated_definition()
         elif self.current_token.type == 'IF':
             return self.if_statement()
         elif self.current_token.type == 'FOR':
@@ -141,6 +292,7 @@ class Parser:
             self.error(f'Unexpected token: {self.current_token.type}')
 
     def assignment_statement(self):
+        start = self.current_token
         if self.current_token.type == 'ARRAY_MEMBER':
             var_name = self.array_member(ctx=ast.Store())
             targets = [ast.Subscript(value=var_name.value, slice=var_name.slice, ctx=ast.Store(), lineno=var_name.lineno, col_offset=var_name.col_offset)]
@@ -148,13 +300,15 @@ class Parser:
         else:
             var_name = self.current_token.value
             symbol = self.symbol_table.lookup(var_name)
-            if symbol:
+            if symbol and symbol.type == 'function' and var_name in BUILTIN_FUNCTIONS \
+                    and symbol.depth != self.symbol_table.depth:
+                symbol = self.define(var_name, 'variable')
+            elif symbol:
                 if symbol.type != 'variable' and symbol.type != 'parameter':
                     self.error(f"'{var_name}' is not a variable. Please use array_member to assign to array elements.")
             else:
                 # 变量未定义，添加到符号表，暂时我们还不知道类型
-                self.symbol_table.define(var_name, 'variable')
-                symbol = self.symbol_table.lookup(var_name)
+                symbol = self.define(var_name, 'variable')
             targets = [ast.Name(id=var_name, ctx=ast.Store(), lineno=self.current_token.line, col_offset=self.current_token.column)]
             self.consume('IDENTIFIER')
         
@@ -170,15 +324,18 @@ class Parser:
         inferred_type, _ = self.infer_type(value)
 
         if symbol:
-            existing_type = symbol.attributes.get('data_type')
+            existing_type = symbol.data_type
             if existing_type:
-                if existing_type != inferred_type:
+                if existing_type in NUMERIC_TYPES and inferred_type in NUMERIC_TYPES:
+                    # 数值变量取较宽的类型，实际的机器类型在代码生成前另行推断
+                    symbol.data_type = max(existing_type, inferred_type, key=NUMERIC_TYPES.index)
+                elif existing_type != inferred_type:
                     # 类型冲突，设为 'unknown' 并报错
-                    symbol.attributes['data_type'] = 'unknown'
+                    symbol.data_type = 'unknown'
                     self.error(f"Type conflict for variable '{var_name}': {existing_type} vs {inferred_type}")
             else:
-                symbol.attributes['data_type'] = inferred_type
-                symbol.attributes['length'] = length
+                symbol.data_type = inferred_type
+                symbol.length = length
         else:
             # 这个情况下是数组member，类型应该是 'int'，但是我们也不知道后面会赋值什么，所以unknown也可以
             if inferred_type not in ['int', 'unknown']:
@@ -187,11 +344,12 @@ class Parser:
         return ast.Assign(
             targets=targets,
             value=value,
-            lineno=self.current_token.line,
-            col_offset=self.current_token.column
+            lineno=start.line,
+            col_offset=start.column
         )
 
     def function_definition(self):
+        start = self.current_token
         self.consume('DEF')
         func_name = self.current_token.value
         self.consume('IDENTIFIER')
@@ -200,7 +358,10 @@ class Parser:
         # 将函数名添加到当前符号表
         if self.symbol_table.lookup(func_name):
             self.error(f"Function '{func_name}' already defined. Please choose another name.")
-        self.symbol_table.define(func_name, 'function')
+        func_symbol = self.define(func_name, 'function')
+
+        # 创建新的符号表作用域，参数只在函数体内可见
+        self.symbol_table.push_scope()
 
         # Collect parameters
         params = []
@@ -213,13 +374,15 @@ class Parser:
                 if self.current_token.type != 'IDENTIFIER':
                     self.error("Expected type name after colon.")
                 param_type = self.current_token.value
+                if param_type not in PARAM_TYPES:
+                    self.error(f"Unsupported parameter type '{param_type}', expected one of {', '.join(PARAM_TYPES)}.")
                 param_annotations.append(ast.Name(id=param_type, ctx=ast.Load(), lineno=self.current_token.line, col_offset=self.current_token.column))
                 self.consume('IDENTIFIER')
                 # 定义参数符号表项
-                self.symbol_table.define(param_name, 'parameter', data_type=param_type)
+                self.define(param_name, 'parameter', data_type=param_type)
             else:
                 param_annotations.append(ast.Name(id='int', ctx=ast.Load(), lineno=self.current_token.line, col_offset=self.current_token.column))
-                self.symbol_table.define(param_name, 'parameter', data_type='int')
+                self.define(param_name, 'parameter', data_type='int')
             params.append(param_name)
             while self.current_token.type == 'COMMA':
                 self.consume('COMMA')
@@ -232,26 +395,27 @@ class Parser:
                     if self.current_token.type != 'IDENTIFIER':
                         self.error("Expected type name after colon.")
                     param_type = self.current_token.value
+                    if param_type not in PARAM_TYPES:
+                        self.error(f"Unsupported parameter type '{param_type}', expected one of {', '.join(PARAM_TYPES)}.")
                     param_annotations.append(ast.Name(id=param_type, ctx=ast.Load(), lineno=self.current_token.line, col_offset=self.current_token.column))
                     self.consume('IDENTIFIER')
-                    self.symbol_table.define(param_name, 'parameter', data_type=param_type)
+                    self.define(param_name, 'parameter', data_type=param_type)
                 else:
                     param_annotations.append(ast.Name(id='int', ctx=ast.Load(), lineno=self.current_token.line, col_offset=self.current_token.column))
-                    self.symbol_table.define(param_name, 'parameter', data_type='int')
+                    self.define(param_name, 'parameter', data_type='int')
                 params.append(param_name)
 
         self.consume('RPAREN')
         self.consume('COLON')
         self.consume('NEWLINE')
 
-        # 创建新的符号表作用域
-        previous_symbol_table = self.symbol_table
-        self.symbol_table = SymbolTable(parent=previous_symbol_table)
-
+        self.return_types.append([])
         body = self.statement_block()
+        returns = self.infer_return_type(self.return_types.pop())
+        func_symbol.data_type = returns
 
         # 恢复之前的符号表
-        self.symbol_table = previous_symbol_table
+        self.symbol_table.pop_scope()
         
         ast_args = []
         for param, annotation in zip(params, param_annotations):
@@ -270,26 +434,45 @@ class Parser:
             ),
             body=body,
             decorator_list=[],
-            returns=None,
-            lineno=self.current_token.line,
-            col_offset=self.current_token.column
+            returns=ast.Name(id=returns, ctx=ast.Load()) if returns else None,
+            lineno=start.line,
+            col_offset=start.column
         )
 
+    def decorated_definition(self):
+        # @memo 等装饰器单独占一行，紧跟函数定义
+        self.consume('AT')
+        name = self.current_token.value
+        decorator = ast.Name(id=name, ctx=ast.Load(), lineno=self.current_token.line, col_offset=self.current_token.column)
+        self.consume('IDENTIFIER')
+        if name not in DECORATORS:
+            self.error(f"Unsupported decorator '@{name}', expected one of {', '.join('@' + d for d in DECORATORS)}.")
+        self.consume('NEWLINE')
+        if self.current_token.type == 'INDENT':
+            if self.tab2indent_level(self.current_token) != self.indent_level:
+                self.error("Wrong indent level.")
+            self.consume('INDENT')
+        if self.current_token.type != 'DEF':
+            self.error("Expected a function definition after decorator.")
+        func = self.function_definition()
+        func.decorator_list.append(decorator)
+        return func
+
     def if_statement(self):
         current_indent_level = self.indent_level
+        start = self.current_token
         self.consume('IF')
         condition = self.condition()
         self.consume('COLON')
         self.consume('NEWLINE')
         
         # 创建新的符号表作用域
-        previous_symbol_table = self.symbol_table
-        self.symbol_table = SymbolTable(parent=previous_symbol_table)
+        self.symbol_table.push_scope()
 
         true_branch = self.statement_block()
 
         # 恢复之前的符号表
-        self.symbol_table = previous_symbol_table
+        self.symbol_table.pop_scope()
 
         false_branches = []
         
@@ -303,10 +486,9 @@ class Parser:
             elif_condition = self.condition()
             self.consume('COLON')
             self.consume('NEWLINE')
-            previous_symbol_table = self.symbol_table
-            self.symbol_table = SymbolTable(parent=previous_symbol_table)
+            self.symbol_table.push_scope()
             elif_branch = self.statement_block()
-            self.symbol_table = previous_symbol_table
+            self.symbol_table.pop_scope()
             false_branches.append(ast.If(
                 test=elif_condition,
                 body=elif_branch,
@@ -325,11 +507,10 @@ class Parser:
             self.consume('ELSE')
             self.consume('COLON')
             self.consume('NEWLINE')
-            previous_symbol_table = self.symbol_table
-            self.symbol_table = SymbolTable(parent=previous_symbol_table)
+            self.symbol_table.push_scope()
             false_branches.append(self.statement_block())
             orelse = false_branches.pop()
-            self.symbol_table = previous_symbol_table
+            self.symbol_table.pop_scope()
 
         while false_branches:
             false_branch = false_branches.pop()
@@ -345,58 +526,83 @@ class Parser:
             test=condition,
             body=true_branch,
             orelse=orelse,
-            lineno=self.current_token.line,
-            col_offset=self.current_token.column
+            lineno=start.line,
+            col_offset=start.column
         )
 
     def for_statement(self):
+        start = self.current_token
         self.consume('FOR')
-        previous_symbol_table = self.symbol_table
-        self.symbol_table = SymbolTable(parent=previous_symbol_table)
-        loop_var = self.current_token.value
+        self.symbol_table.push_scope()
+        target = self.current_token
+        loop_var = target.value
         if self.symbol_table.lookup(loop_var):
             self.error(f"Loop variable '{loop_var}' already defined. Please choose another name.")
-        self.symbol_table.define(loop_var, 'variable', data_type='int')
+        self.define(loop_var, 'variable', data_type='int')
         self.consume('IDENTIFIER')
         self.consume('IN')
         iterable = self.expression()
         self.consume('COLON')
         self.consume('NEWLINE')
         body = self.statement_block()
-        self.symbol_table = previous_symbol_table
+        self.symbol_table.pop_scope()
         return ast.For(
-            target=ast.Name(id=loop_var, ctx=ast.Store(), lineno=self.current_token.line, col_offset=self.current_token.column),
+            target=ast.Name(id=loop_var, ctx=ast.Store(), lineno=target.line, col_offset=target.column),
             iter=iterable,
             body=body,
             orelse=[],
-            lineno=self.current_token.line,
-            col_offset=self.current_token.column
+            lineno=start.line,
+            col_offset=start.column
         )
 
     def while_statement(self):
+        start = self.current_token
         self.consume('WHILE')
         condition = self.condition()
         self.consume('COLON')
         self.consume('NEWLINE')
-        previous_symbol_table = self.symbol_table
-        self.symbol_table = SymbolTable(parent=previous_symbol_table)
+        self.symbol_table.push_scope()
         body = self.statement_block()
-        self.symbol_table = previous_symbol_table
+        self.symbol_table.pop_scope()
         return ast.While(
             test=condition,
             body=body,
             orelse=[],
-            lineno=self.current_token.line,
-            col_offset=self.current_token.column
+            lineno=start.line,
+            col_offset=start.column
         )
 
     def return_statement(self):
+        start = self.current_token
         self.consume('RETURN')
-        value = self.expression()
-        return ast.Return(value=value, lineno=self.current_token.line, col_offset=self.current_token.column)
+        if self.current_token.type in ['NEWLINE', 'EOF']:
+            value = None
+        else:
+            value = self.expression()
+        if self.return_types:
+            self.return_types[-1].append(self.infer_type(value)[0] if value else None)
+        return ast.Return(value=value, lineno=start.line, col_offset=start.column)
+
+    def infer_return_type(self, types):
+        """
+        根据函数体中所有 return 语句的类型推断函数的返回类型。
+        没有带值的 return 时为 None（void）；全部返回 bool 时为 'bool'；返回过 float 时为 'float'；否则按 'int' 处理。
+        """
+        types = [t for t in types if t is not None]
+        if not types:
+            return None
+        for t in types:
+            if t in ['str', 'list', 'dict']:
+                self.error(f"Returning a {t} value from a function is not supported.")
+        if all(t == 'bool' for t in types):
+            return 'bool'
+        if 'float' in types:
+            return 'float'
+        return 'int'
 
     def function_call(self):
         func_name = self.current_token.value
+        start = self.current_token  # 调用节点的位置取函数名所在的位置，运行时错误据此报告行号
         if not self.symbol_table.lookup(func_name):
             self.error(f"Undefined function '{func_name}', please define it first.")
         self.consume('FUNC_CALL')
@@ -408,11 +614,11 @@ class Parser:
                 self.consume('COMMA')
         self.consume('RPAREN')
         return ast.Call(
-            func=ast.Name(id=func_name, ctx=ast.Load(), lineno=self.current_token.line, col_offset=self.current_token.column),
+            func=ast.Name(id=func_name, ctx=ast.Load(), lineno=start.line, col_offset=start.column),
             args=args,
             keywords=[],
-            lineno=self.current_token.line,
-            col_offset=self.current_token.column
+            lineno=start.line,
+            col_offset=start.column
         )
     
     def array_member(self, ctx=ast.Load()):
@@ -423,18 +629,27 @@ class Parser:
         elif symbol.type not in ['variable', 'parameter']:
             self.error(f"'{array_name}' is not a variable or parameter.")
         
-        data_type = symbol.attributes.get('data_type')
-        if data_type not in ['list', 'str']:
-            self.error(f"'{array_name}' is neither a list nor a str.")
+        data_type = symbol.data_type
+        if data_type not in ['list', 'str', 'dict']:
+            self.error(f"'{array_name}' is not a list, str or dict.")
         
         self.consume('ARRAY_MEMBER')
         self.consume('LBRACKET')
-        index = self.expression()
+        # a[i]，或切片 a[i:j]（两端都可以省略）
+        index = self.expression() if self.current_token.type != 'COLON' else None
+        if self.current_token.type == 'COLON':
+            if data_type == 'dict':
+                self.error(f"Cannot slice dict '{array_name}'.")
+            if not isinstance(ctx, ast.Load):
+                self.error("Assignment to a slice is not supported.")
+            self.consume('COLON')
+            upper = self.expression() if self.current_token.type != 'RBRACKET' else None
+            index = ast.Slice(lower=index, upper=upper, step=None)
         self.consume('RBRACKET')
         
         return ast.Subscript(
             value=ast.Name(id=array_name, ctx=ast.Load()),
-            slice=ast.Index(value=index),
+            slice=index,
             ctx=ctx,
             lineno=self.current_token.line,
             col_offset=self.current_token.column
@@ -450,13 +665,20 @@ class Parser:
         statements = []
         while self.current_token.type == 'INDENT':
             if self.tab2indent_level(self.current_token) > self.indent_level:
-                self.error("Wrong indent level.")
+                # 缩进过深：报告一次错误并跳过整个代码块
+                try:
+                    self.error("Wrong indent level.")
+                except CompilerError:
+                    self.skip_nested_lines()
+                continue
             elif self.tab2indent_level(self.current_token) < self.indent_level:
                 self.indent_level -= 1
                 return statements
             self.consume('INDENT')
             ## 可能需要新增作用域
-            statements.append(self.statement())
+            statement = self.guarded_statement()
+            if statement is not None:
+                statements.append(statement)
             if self.current_token.type == 'NEWLINE':
                 self.consume('NEWLINE')
         self.indent_level -= 1
@@ -464,72 +686,126 @@ class Parser:
 
     def condition(self):
         """
-        解析条件表达式 (LOGIC_EXPR)，即可能包含逻辑操作符的比较表达式。
+        解析条件表达式 (LOGIC_EXPR)。条件与普通表达式共用同一张运算符优先级表。
         """
-        left = self.comparison()  # 初始的比较表达式
-        while self.current_token.type in ['AND', 'OR']:  # 处理逻辑操作符
-            op = self.current_token.value  # 记录逻辑操作符
-            self.consume(self.current_token.type)  # 消耗逻辑操作符
-            right = self.comparison()  # 继续解析后面的比较表达式
-            left = ast.BoolOp(op=ast.And() if op == 'and' else ast.Or(), values=[left, right], lineno=left.lineno,col_offset=left.col_offset)  # 构建逻辑操作的AST节点
-        return left
-
-    def comparison(self):
+        return self.expression()
+
+    def expression(self):
         """
-        解析比较表达式 (COMPARISON)，可能包含条件操作符（如 `==`, `!=`）。
+        解析一个表达式 (EXPRESSION)：基于运算符表的优先级爬升（precedence climbing）。
+        使用显式的操作数栈和运算符栈代替逐层递归，括号嵌套深度不受 Python 递归深度限制。
         """
-        left = self.expression()  # 首先解析一个常规表达式
-        if self.current_token.type in ['LT', 'GT', 'LTE', 'GTE', 'EQUALS', 'NOT_EQUALS']:  # 如果是比较操作符
-            op = self.current_token.value  # 获取操作符
-            self.consume(self.current_token.type)  # 消耗操作符
-            right = self.expression()  # 解析右侧表达式
-            # 根据操作符构建比较操作AST节点
-            if op == '==':
-                return ast.Compare(left=left, ops=[ast.Eq()], comparators=[right],lineno=left.lineno,col_offset=left.col_offset)
-            elif op == '!=':
-                return ast.Compare(left=left, ops=[ast.NotEq()], comparators=[right], lineno=left.lineno,col_offset=left.col_offset)
-            elif op == '>':
-                return ast.Compare(left=left, ops=[ast.Gt()], comparators=[right], lineno=left.lineno,col_offset=left.col_offset)
-            elif op == '<':
-                return ast.Compare(left=left, ops=[ast.Lt()], comparators=[right], lineno=left.lineno,col_offset=left.col_offset)
-            elif op == '>=':
-                return ast.Compare(left=left, ops=[ast.GtE()], comparators=[right], lineno=left.lineno,col_offset=left.col_offset)
-            elif op == '<=':
-                return ast.Compare(left=left, ops=[ast.LtE()], comparators=[right], lineno=left.lineno,col_offset=left.col_offset)
-        return left  # 如果没有比较操作符，返回当前的表达式
+        operands = []
+        operators = []      # 元素为 (优先级, 运算符类, 元数, 记号)，左括号以 PAREN 占位
+        paren_depth = 0
+        chainable = set()   # 未加括号的比较表达式，可以和后面的比较运算符连成比较链
+        while True:
+            # 期待操作数：先收集前缀运算符和左括号
+            while True:
+                token = self.current_token
+                if token.type in UNARY_OPERATORS:
+                    precedence, op = UNARY_OPERATORS[token.type]
+                    operators.append((precedence, op, 1, token))
+                elif token.type == 'LPAREN':
+                    operators.append(PAREN)
+                    paren_depth += 1
+                else:
+                    break
+                self.consume(token.type)
+            operands.append(self.primary())
+
+            # 期待运算符：先闭合括号，再处理二元运算符
+            while self.current_token.type == 'RPAREN' and paren_depth:
+                while operators[-1] is not PAREN:
+                    self.reduce(operands, operators.pop(), chainable)
+                operators.pop()
+                paren_depth -= 1
+                chainable.discard(id(operands[-1]))
+                self.consume('RPAREN')
+            token = self.current_token
+            if token.type not in BINARY_OPERATORS:
+                break
+            precedence, op = BINARY_OPERATORS[token.type]
+            # 所有二元运算符都是左结合的
+            while operators and operators[-1] is not PAREN and operators[-1][0] >= precedence:
+                self.reduce(operands, operators.pop(), chainable)
+            operators.append((precedence, op, 2, token))
+            self.consume(token.type)
+
+        if paren_depth:
+            self.error(f"Expected token type RPAREN, but got {self.current_token.type}.")
+        while operators:
+            self.reduce(operands, operators.pop(), chainable)
+        return operands[0]
+
+    def reduce(self, operands, operator, chainable):
+        """
+        用运算符栈顶的运算符归约操作数栈，构建对应的 AST 节点。
+        """
+        _, op, arity, token = operator
+        if arity == 1:
+            operand = operands.pop()
+            if op is ast.USub and isinstance(operand, ast.Constant) and type(operand.value) is int:
+                # 负数字面量直接折叠为常量
+                node = ast.Constant(value=-operand.value, lineno=token.line, col_offset=token.column)
+            else:
+                node = ast.UnaryOp(op=op(), operand=operand, lineno=token.line, col_offset=token.column)
+            operands.append(node)
+            return
+        right = operands.pop()
+        left = operands.pop()
+        lineno = getattr(left, 'lineno', token.line)
+        col_offset = getattr(left, 'col_offset', token.column)
+        if op in (ast.And, ast.Or):
+            node = ast.BoolOp(op=op(), values=[left, right], lineno=lineno, col_offset=col_offset)
+        elif issubclass(op, ast.cmpop):
+            if id(left) in chainable:
+                # a < b < c 与 Python 一致，构成一个比较链
+                chainable.discard(id(left))
+                left.ops.append(op())
+                left.comparators.append(right)
+                node = left
+            else:
+                node = ast.Compare(left=left, ops=[op()], comparators=[right], lineno=lineno, col_offset=col_offset)
+            chainable.add(id(node))
+        else:
+            node = ast.BinOp(left=left, op=op(), right=right, lineno=lineno, col_offset=col_offset)
+        operands.append(node)
 
-    def expression(self):
+    def primary(self):
         """
-        解析一个常规表达式 (EXPRESSION)，可能是加法、减法、乘法、除法等。
+        解析基本表达式（PRIMARY），即变量、常量、字符串、列表、函数调用或数组成员。
         """
-        if self.current_token.type == 'STRING_LITERAL':
-            node = ast.Constant(value=self.current_token.value.strip(self.current_token.value[0]))
+        token = self.current_token
+        if token.type == 'NUMBER':  # 如果是数字
+            self.consume('NUMBER')
+            try:
+                value = float(token.value) if any(c in token.value for c in '.eE') else int(token.value)
+            except ValueError:
+                self.error(f"Invalid number literal '{token.value}'.")
+            return ast.Constant(value=value, lineno=token.line, col_offset=token.column)
+        elif token.type == 'STRING_LITERAL':
             self.consume('STRING_LITERAL')
-            return node
-        
-        if self.current_token.type == 'LBRACKET':
+            return ast.Constant(value=token.value.strip(token.value[0]), lineno=token.line, col_offset=token.column)
+        elif token.type == 'TRUE' or token.type == 'FALSE':
+            self.consume(token.type)
+            return ast.Constant(value=token.type == 'TRUE', lineno=token.line, col_offset=token.column)
+        elif token.type == 'IDENTIFIER':  # 如果是标识符
+            symbol = self.symbol_table.lookup(token.value)
+            if not symbol:
+                self.error(f"Undefined variable '{token.value}', please define it first.")
+            self.consume('IDENTIFIER')
+            return ast.Name(id=token.value, ctx=ast.Load(), lineno=token.line, col_offset=token.column)
+        elif token.type == 'LBRACKET':
             return self.list_expr()
-        
-        if self.current_token.type == 'TRUE' or self.current_token.type == 'FALSE':
-            node = ast.Constant(value=True if self.current_token.type == 'TRUE' else False, lineno=self.current_token.line, col_offset=self.current_token.column)
-            self.consume(self.current_token.type)
-            return node
-        
-        if (self.current_token.type == 'IDENTIFIER' or self.current_token.type == 'NUMBER' or 
-            self.current_token.type == 'LPAREN' or self.current_token.type == 'FUNC_CALL' or self.current_token.type == 'ARRAY_MEMBER'):
-            left = self.term()  # 解析一个基本的TERM
-            while self.current_token.type in ['PLUS', 'MINUS']:  # 处理加法和减法
-                op = self.current_token.value
-                self.consume(self.current_token.type)  # 消耗加号或减号
-                right = self.term()  # 解析下一个TERM
-                # 构建加法或减法的AST节点
-                if op == '+':
-                    left = ast.BinOp(left=left, op=ast.Add(), right=right, lineno=left.lineno,col_offset=left.col_offset)
-                elif op == '-':
-                    left = ast.BinOp(left=left, op=ast.Sub(), right=right, lineno=left.lineno,col_offset=left.col_offset)
-            return left
-
-        self.error(f'Unexpected token: {self.current_token.type}')
+        elif token.type == 'LBRACE':
+            return self.dict_expr()
+        elif token.type == 'FUNC_CALL':
+            return self.function_call()
+        elif token.type == 'ARRAY_MEMBER':
+            return self.array_member()
+        else:
+            self.error(f'Unexpected token: {token.type}')
 
     def list_expr(self):
         """
@@ -544,49 +820,33 @@ class Parser:
         self.consume('RBRACKET')
         return ast.List(elts=elements, ctx=ast.Load(), lineno=self.current_token.line, col_offset=self.current_token.column)
 
-    def term(self):
+    def dict_expr(self):
         """
-        解析一个基础的术语（TERM），可能是乘法、除法等。
+        解析字典字面量（DICT），即`{key1: value1, key2: value2, ...}`。
         """
-        left = self.factor()  # 解析基本的因子
-        while self.current_token.type in ['MULTIPLY', 'DIVIDE']:  # 处理乘法和除法
-            op = self.current_token.value
-            self.consume(self.current_token.type)  # 消耗乘号或除号
-            right = self.factor()  # 解析下一个因子
-            # 构建乘法或除法的AST节点
-            if op == '*':
-                left = ast.BinOp(left=left, op=ast.Mult(), right=right, lineno=left.lineno,col_offset=left.col_offset)
-            elif op == '//':
-                left = ast.BinOp(left=left, op=ast.FloorDiv(), right=right, lineno=left.lineno,col_offset=left.col_offset)
-        return left
-
-    def factor(self):
-        """
-        解析因子（FACTOR），即变量、常量、括号内的表达式或函数调用。
-        """
-        if self.current_token.type == 'NUMBER':  # 如果是数字
-            value = int(self.current_token.value)  # 转换为整数
-            self.consume('NUMBER')
-            return ast.Constant(value=value, lineno=self.current_token.line, col_offset=self.current_token.column)
-        elif self.current_token.type == 'IDENTIFIER':  # 如果是标识符
-            value = self.current_token.value  # 获取标识符值
-            symbol = self.symbol_table.lookup(value)
-            if not symbol:
-                self.error(f"Undefined variable '{value}', please define it first.")
-            self.consume('IDENTIFIER')
-            return ast.Name(id=value, ctx=ast.Load(), lineno=self.current_token.line, col_offset=self.current_token.column)
-        elif self.current_token.type == 'LPAREN':  # 如果是括号，递归解析表达式
-            self.consume('LPAREN')
-            expr = self.expression()
-            self.consume('RPAREN')
-            return expr
-        elif self.current_token.type == 'FUNC_CALL':
-            return self.function_call()
-        elif self.current_token.type == 'ARRAY_MEMBER':
-            return self.array_member()
-        else:
-            self.error(f'Unexpected token: {self.current_token.type}')
-    
+        start = self.current_token
+        self.consume('LBRACE')
+        keys = []
+        values = []
+        while self.current_token.type != 'RBRACE':
+            keys.append(self.expression())
+            self.consume('COLON')
+            values.append(self.expression())
+            if self.current_token.type != 'COMMA':
+                break
+            self.consume('COMMA')
+        self.consume('RBRACE')
+        return ast.Dict(keys=keys, values=values, lineno=start.line, col_offset=start.column)
+
+def parse_source(code, filename='<input>'):
+    """
+    对一段 .pyll 源代码做词法分析和语法分析，返回 ast.Module。
+    词法错误和语法错误共用一个列表，解析结束后统一以 CompilerErrors 抛出。
+    """
+    lexer = Lexer(code, filename)
+    tokens = lexer.tokenize()
+    return Parser(tokens, filename, lexer.errors).parse()
+
 def ast_to_dict(node):
     if isinstance(node, list):  # 处理节点列表
         return [ast_to_dict(elem) for elem in node]
@@ -609,32 +869,27 @@ def ast_to_dict(node):
     return node  # 返回常规值（如数字、字符串等）
 
 if __name__ == "__main__":
+    # python parser.py <file> [--compare] [--json]
+    # 语法树写入 output1.txt；--compare 同时把 Python 自带的 ast.parse 的结果写入 output2.txt 以便对照，
+    # --json 把语法树写成 ast-<file>.json
     filename = sys.argv[1]
-    with open(filename, 'r') as file:
+    with open(filename, 'r', encoding='utf-8') as file:
         source_code = file.read()
-        lexer = Lexer(source_code)
-        tokens = lexer.tokenize()
-        print(tokens)
-
-        sys.stdout = open('output1.txt', 'w')
-
-        parser = Parser(tokens)
-        parsed_program = parser.parse()
-        print(ast.dump(parsed_program, indent=4))
-
-        sys.stdout.close()
-        sys.stdout = open('output2.txt', 'w')
-
-        # Generate official AST
-        official_ast = ast.parse(source_code)
-        print(ast.dump(official_ast, indent=4))
+    lexer = Lexer(source_code, filename)
+    tokens = lexer.tokenize()
+    for token in tokens:
+        print(token)
 
-        sys.stdout.close()
+    parsed_program = Parser(tokens, filename, lexer.errors).parse()
+    with open('output1.txt', 'w') as output:
+        print(ast.dump(parsed_program, indent=4), file=output)
 
-        parser = Parser(tokens)
-        parsed_program = parser.parse()
-        ast_dict = ast_to_dict(parsed_program)
+    if '--compare' in sys.argv[2:]:
+        with open('output2.txt', 'w') as output:
+            print(ast.dump(ast.parse(source_code), indent=4), file=output)
 
+    if '--json' in sys.argv[2:]:
         import os
+        import json
         with open(f'ast-{os.path.basename(filename)}.json', 'w') as json_file:
-            json.dump(ast_dict, json_file, indent=4)
+            json.dump(ast_to_dict(parsed_program), json_file, indent=4)
@@ -0,0 +1,183 @@
+"""
+按执行剖面优化（PGO）：用 --instrument 构建记录的执行次数（见 profiledata.py）重新生成代码。
+
+    python PyLL.py <file> --profile-use <file.prof>    用已有的剖面编译
+    python PyLL.py pgo <file> [选项]                    插桩编译，用 JIT 运行一次得到剖面，再按剖面编译
+
+剖面的用法：
+    条件语句和循环的条件跳转带上 branch_weights，LLVM 据此安排基本块的顺序、决定是否改写为 select、如何展开循环；
+    每个函数带上 function_entry_count，模块带上 ProfileSummary，LLVM 的内联器由此得到各调用点的执行次数，
+    热点调用点使用高得多的内联阈值，冷的调用点几乎不内联；
+    内联按调用次数决定：训练运行中从未调用的函数标记为 cold 和 noinline；很少调用的函数即使只有一个调用点
+        也不再强制内联（只有小函数仍然强制内联），由 LLVM 按调用点的次数决定，热点代码因此保持紧凑；
+        频繁调用的函数按调用图的判断强制内联，其余的小函数标记为 inlinehint。
+剖面必须与源代码对应（语法树的散列相同），否则忽略并给出警告。
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+from callgraph import INLINE_SIZE
+from profiledata import Site, default_path, read_profile
+
+# branch_weights 是 i32，次数更大时等比缩小
+BRANCH_WEIGHT_MAX = 2 ** 31 - 1
+
+# 平均每执行这么多条语句就调用一次的函数是频繁调用的，调用本身的开销不可忽略
+CALL_INTERVAL = 100
+
+# ProfileSummary 的 DetailedSummary 使用的百分位（百万分之一），与 LLVM 的 ProfileSummaryBuilder 相同
+CUTOFFS = (10000, 100000, 200000, 300000, 400000, 500000, 600000, 700000, 800000, 900000,
+           950000, 990000, 999000, 999900, 999990, 999999)
+
+class ProfileUse:
+    """
+    代码生成时查询剖面：Visitor 在生成条件跳转和函数时调用。
+    """
+    def __init__(self, profile):
+        self.profile = profile
+        self.entries = {}
+        self.statements = {}
+        self.sizes = {}
+        for site, count in profile.counts.items():
+            if site.kind == 'entry':
+                self.entries[site.function] = count
+            elif site.kind == 'line':
+                self.statements[site.function] = self.statements.get(site.function, 0) + count
+                self.sizes[site.function] = self.sizes.get(site.function, 0) + 1
+        self.total = sum(self.statements.values())
+
+    def count(self, kind, function, node):
+        return self.profile[Site(kind, function, node.lineno, node.col_offset)]
+
+    def weigh(self, branch, taken, not_taken):
+        # 两个方向都没有执行过时没有信息，不加权重；否则与 clang 一样各加一，执行零次的方向也不算绝不可能
+        if not taken and not not_taken:
+            return
+        scale = max(1, -(-max(taken, not_taken) // BRANCH_WEIGHT_MAX))
+        branch.set_weights([taken // scale + 1, not_taken // scale + 1])
+
+    def weigh_if(self, branch, function, node):
+        then = self.count('then', function, node)
+        if node.orelse:
+            other = self.count('else', function, node)
+        else:
+            other = max(self.count('line', function, node) - then, 0)
+        self.weigh(branch, then, other)
+
+    def weigh_loop(self, branch, function, node):
+        # 每次进入循环最终都从条件处退出一次（循环体中 return 的情况忽略）
+        self.weigh(branch, self.count('loop', function, node), self.count('line', function, node))
+
+    def annotate_function(self, llvm_func, inline):
+        """
+        给用户函数加上入口次数和内联属性，inline 是调用图（CallGraph.should_inline）不看剖面时的判断。
+        剖面中没有的函数（插桩构建之后新增的）按 inline 处理。
+        """
+        name = llvm_func.name
+        if name not in self.entries:
+            if inline:
+                llvm_func.attributes.add('alwaysinline')
+            return
+        calls = self.entries[name]
+        small = self.sizes.get(name, 0) <= INLINE_SIZE
+        set_entry_count(llvm_func, calls)
+        if calls == 0:
+            llvm_func.attributes.add('cold')
+            llvm_func.attributes.add('noinline')
+        elif calls * CALL_INTERVAL >= self.total:
+            if inline:
+                llvm_func.attributes.add('alwaysinline')
+            elif small:
+                llvm_func.attributes.add('inlinehint')
+        elif inline and small:
+            llvm_func.attributes.add('alwaysinline')
+
+    def annotate_module(self, module, main):
+        # main 只执行一次；其余函数的调用次数由 annotate_function 给出
+        from llvmlite import ir
+        set_entry_count(main, 1)
+        counts = sorted(self.profile.counts.values(), reverse=True)
+        total = sum(counts)
+        entries = list(self.entries.values()) + [1]
+        internal = [count for site, count in self.profile.counts.items() if site.kind != 'entry']
+
+        def field(name, value):
+            return module.add_metadata([ir.MetaDataString(module, name), ir.Constant(ir.IntType(64), value)])
+
+        detailed = []
+        index = covered = 0
+        for cutoff in CUTOFFS:
+            # 次数从大到小累加，达到总数的 cutoff / 10^6 时的最小次数和计数点数
+            while index < len(counts) and covered * 1000000 < cutoff * total:
+                covered += counts[index]
+                index += 1
+            minimum = counts[index - 1] if index else 0
+            detailed.append(module.add_metadata([ir.Constant(ir.IntType(32), cutoff), ir.Constant(ir.IntType(64), minimum),
+                                                 ir.Constant(ir.IntType(32), index)]))
+        summary = module.add_metadata([
+            module.add_metadata([ir.MetaDataString(module, 'ProfileFormat'), ir.MetaDataString(module, 'InstrProf')]),
+            field('TotalCount', total),
+            field('MaxCount', counts[0] if counts else 0),
+            field('MaxInternalCount', max(internal, default=0)),
+            field('MaxFunctionCount', max(entries)),
+            field('NumCounts', len(counts)),
+            field('NumFunctions', len(entries)),
+            module.add_metadata([ir.MetaDataString(module, 'DetailedSummary'), module.add_metadata(detailed)]),
+        ])
+        module.add_named_metadata('llvm.module.flags', module.add_metadata([
+            ir.Constant(ir.IntType(32), 1), ir.MetaDataString(module, 'ProfileSummary'), summary]))
+
+def set_entry_count(llvm_func, count):
+    from llvmlite import ir
+    module = llvm_func.module
+    llvm_func.set_metadata('prof', module.add_metadata([ir.MetaDataString(module, 'function_entry_count'),
+                                                        ir.Constant(ir.IntType(64), count)]))
+
+def train(parsed_ast, filename, opt_level, memo_cap, checked):
+    """
+    插桩编译并用 JIT 运行一次，返回得到的剖面。程序的输出被丢弃；程序因运行时错误退出时剖面照样写出，
+    只给出警告。剖面写在 PYLL_PROFILE 或源文件旁的 <name>.prof，之后可以用 PyLL.py report 查看。
+    """
+    from codegen import compile_tree
+    module = compile_tree(parsed_ast, filename, opt_level, memo_cap, checked, instrument=True)
+    path = os.environ.get('PYLL_PROFILE') or default_path(filename)
+    fd, bitcode = tempfile.mkstemp(suffix='.bc')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(module.as_bitcode())
+        if os.path.exists(path):
+            os.unlink(path)
+        status = subprocess.run([sys.executable, os.path.abspath(__file__), bitcode],
+                                env={**os.environ, 'PYLL_PROFILE': path}, stdout=subprocess.DEVNULL).returncode
+    finally:
+        os.unlink(bitcode)
+    if not os.path.exists(path):
+        raise RuntimeError(f"training run exited with status {status} without writing a profile")
+    if status != 0:
+        print(f"warning: training run exited with status {status}", file=sys.stderr)
+    profile = read_profile(path)
+    executed = sum(count for site, count in profile.counts.items() if site.kind == 'line')
+    print(f"training run: {executed} statements executed, profile written to {path}", file=sys.stderr)
+    return profile
+
+def run(bitcode):
+    """
+    在子进程中 JIT 运行插桩编译的程序。通过 C 的 exit 结束进程，atexit 中写出剖面时 JIT 的代码和计数器仍然有效。
+    """
+    import ctypes
+    import llvmlite.binding as binding
+    from extension import load_runtime
+    from optimize import target_machine
+    load_runtime()
+    with open(bitcode, 'rb') as f:
+        module = binding.parse_bitcode(f.read())
+    engine = binding.create_mcjit_compiler(module, target_machine())
+    engine.finalize_object()
+    main = ctypes.CFUNCTYPE(ctypes.c_int)(engine.get_function_address('main'))
+    status = main()
+    ctypes.CDLL(None).exit(status)
+
+if __name__ == '__main__':
+    run(sys.argv[1])
@@ -0,0 +1,150 @@
+"""
+执行剖面：--instrument 编译出的程序退出时写出的各计数点的执行次数。缺省写到源文件旁的 <name>.prof，
+运行时可以用环境变量 PYLL_PROFILE 指定其他路径。文本格式，开头是以 # 开始的文件头，之后每行一个计数点：
+
+    # pyll profile 1
+    # tree <语法树的 SHA-256>
+    # source <源文件>
+    <执行次数>\t<种类>\t<LLVM 函数名>\t<行号>\t<列号>
+
+种类：entry 是函数入口，line 是一条语句，then / else 是条件语句的两个分支，loop 是循环体的一次迭代。
+语法树的散列（含行号和列号）用来判断剖面是否仍然对应当前的源代码。
+
+    python PyLL.py report <file.prof> [--top N]    按源代码行标注执行次数，并列出最热的行
+"""
+import hashlib
+import os
+import sys
+from collections import namedtuple
+
+FORMAT_VERSION = 1
+
+# 计数点：同一份语法树每次编译得到的计数点相同，可以用来把剖面对应回源代码和生成的代码
+Site = namedtuple('Site', 'kind function line col')
+
+KINDS = ('entry', 'line', 'then', 'else', 'loop')
+
+def tree_digest(tree):
+    import ast
+    return hashlib.sha256(ast.dump(tree, include_attributes=True).encode('utf-8')).hexdigest()
+
+def default_path(filename):
+    # 剖面写在源文件旁边；源代码不是来自文件时写到当前目录
+    if filename.startswith('<'):
+        return 'pyll.prof'
+    return os.path.splitext(os.path.abspath(filename))[0] + '.prof'
+
+def header(digest, filename):
+    source = filename if filename.startswith('<') else os.path.abspath(filename)
+    return f"# pyll profile {FORMAT_VERSION}\n# tree {digest}\n# source {source}\n"
+
+def site_line(site):
+    return f"{site.kind}\t{site.function}\t{site.line}\t{site.col}\n"
+
+class Profile:
+    """
+    一份剖面：counts 是计数点 -> 执行次数，digest 和 source 取自文件头。
+    同一计数点出现多次（多次运行的剖面拼接在一起）时次数相加。
+    """
+    def __init__(self, counts, digest, source):
+        self.counts = counts
+        self.digest = digest
+        self.source = source
+
+    def __getitem__(self, site):
+        return self.counts.get(site, 0)
+
+    def line_counts(self):
+        # 源代码行 -> 该行语句的执行次数；def 所在的行取函数的调用次数
+        lines = {}
+        for site, count in self.counts.items():
+            if site.kind in ('line', 'entry'):
+                lines[site.line] = lines.get(site.line, 0) + count
+        return lines
+
+def read_profile(path):
+    """
+    读取剖面文件，格式不对时抛出 ValueError。
+    """
+    counts = {}
+    meta = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.rstrip('\n')
+            if line.startswith('#'):
+                key, _, value = line[1:].strip().partition(' ')
+                meta.setdefault(key, value)
+                continue
+            fields = line.split('\t')
+            if len(fields) != 5 or fields[1] not in KINDS:
+                raise ValueError(f"{path}:{number}: malformed profile line")
+            try:
+                site = Site(fields[1], fields[2], int(fields[3]), int(fields[4]))
+                counts[site] = counts.get(site, 0) + int(fields[0])
+            except ValueError:
+                raise ValueError(f"{path}:{number}: malformed profile line") from None
+    if meta.get('pyll') != f'profile {FORMAT_VERSION}':
+        raise ValueError(f"{path}: not a PyLL profile (version {FORMAT_VERSION})")
+    return Profile(counts, meta.get('tree'), meta.get('source'))
+
+def is_current(profile, tree):
+    return profile.digest == tree_digest(tree)
+
+def report(profile, code=None, tree=None, top=10, out=sys.stdout):
+    """
+    按源代码行输出执行次数（格式与 gcov 类似：没有计数点的行显示 -，从未执行的语句显示 #####），
+    最后列出执行次数最多的 top 行。code 为 None 时只列出计数。
+    """
+    lines = profile.line_counts()
+    if tree is not None and not is_current(profile, tree):
+        out.write("warning: the source code has changed since the profile was recorded, line numbers may be wrong\n")
+    if code is not None:
+        width = max(len(str(max(lines.values(), default=0))), 5)
+        for number, text in enumerate(code.splitlines(), 1):
+            count = lines.get(number)
+            mark = '-' if count is None else '#####' if count == 0 else str(count)
+            out.write(f"{mark:>{width}}:{number:>5}:{text.expandtabs(4)}\n")
+        out.write('\n')
+
+    total = sum(count for site, count in profile.counts.items() if site.kind == 'line')
+    hottest = sorted(((count, line) for line, count in lines.items() if count), reverse=True)[:top]
+    if hottest:
+        out.write(f"hottest lines ({total} statements executed):\n")
+        for count, line in hottest:
+            share = count * 100 / total if total else 0
+            out.write(f"  line {line:>5}: {count:>12} {share:6.2f}%\n")
+    calls = sorted(((count, site.function) for site, count in profile.counts.items() if site.kind == 'entry'), reverse=True)
+    if calls:
+        out.write("function calls:\n")
+        for count, function in calls[:top]:
+            out.write(f"  {function}: {count}\n")
+
+def main(argv):
+    import argparse
+    arg_parser = argparse.ArgumentParser(prog='PyLL.py report', description='annotate source lines with execution counts')
+    arg_parser.add_argument('profile', help='profile written by a program compiled with --instrument')
+    arg_parser.add_argument('--source', help='source file (default: the one recorded in the profile)')
+    arg_parser.add_argument('--top', type=int, default=10, metavar='N', help='number of hottest lines to list (default: 10)')
+    args = arg_parser.parse_args(argv)
+
+    try:
+        profile = read_profile(args.profile)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+    code = tree = None
+    source = args.source or profile.source
+    if source and not source.startswith('<'):
+        try:
+            with open(source, 'r', encoding='utf-8') as f:
+                code = f.read()
+        except OSError as e:
+            print(f"warning: cannot read source: {e}", file=sys.stderr)
+    if code is not None:
+        from errors import CompilerError, CompilerErrors
+        from parser import parse_source
+        try:
+            tree = parse_source(code, source)
+        except (CompilerError, CompilerErrors):
+            pass
+    report(profile, code, tree, args.top)
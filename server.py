@@ -0,0 +1,196 @@
+"""
+常驻编译服务：避免每次编译都重复支付 Python 启动、llvmlite 导入和 LLVM 初始化的开销。
+
+    python PyLL.py serve [--socket PATH] [PATH ...]   监听 Unix socket，并可同时监视文件
+    python PyLL.py watch [--interval SEC] PATH ...    监视 .pyll 文件，变化时重新编译
+    python PyLL.py client FILE [-o OUT] [--socket PATH]
+
+socket 协议为每行一个 JSON 请求 / 响应：
+    请求  {"file": "a.pyll", "output": "generated.ll"}  或  {"source": "...", "filename": "a.pyll"}
+          可选字段 "opt_level"（0-3，默认 2）、"memo_cap"、"checked"，含义与命令行选项相同
+    响应  {"ok": true, "ir": "...", "time": 0.01}      或  {"ok": false, "error": "..."}
+请求中给出 output 时，IR 直接写入该文件（以 .bc 结尾时写 LLVM bitcode，与命令行相同），响应中不再携带 ir。
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from codegen import compile_module
+from errors import CompilerError, CompilerErrors
+
+DEFAULT_SOCKET = '/tmp/pyll.sock'
+
+# 请求中可以携带的编译选项，对应 compile_module 的同名参数
+COMPILE_OPTIONS = ('opt_level', 'memo_cap', 'checked')
+
+# 编译器使用全局的 LLVM 模块，同一时刻只能有一个编译任务
+_compile_lock = threading.Lock()
+
+def compile_request(request):
+    """
+    处理一个编译请求（dict），返回响应（dict）。任何编译错误都不会终止服务进程。
+    """
+    start = time.perf_counter()
+    try:
+        if 'source' in request:
+            code = request['source']
+            filename = request.get('filename', '<input>')
+        else:
+            filename = request['file']
+            with open(filename, 'r', encoding='utf-8') as f:
+                code = f.read()
+
+        with _compile_lock:
+            options = {key: request[key] for key in COMPILE_OPTIONS if key in request}
+            module = compile_module(code, filename, **options)
+
+            response = {'ok': True, 'time': time.perf_counter() - start}
+            # 输出文件写不进去（目录不存在等）时与其他错误一样返回给客户端，不能让处理线程异常退出
+            output = request.get('output')
+            if output and output.endswith('.bc'):
+                with open(output, 'wb') as f:
+                    f.write(module.as_bitcode())
+            elif output:
+                with open(output, 'w') as f:
+                    f.write(str(module))
+            else:
+                response['ir'] = str(module)
+        return response
+    except CompilerErrors as e:
+        return {'ok': False, 'error': "\n".join(f"Compiler error: {err}" for err in e.errors)}
+    except CompilerError as e:
+        return {'ok': False, 'error': f"Compiler error: {e}"}
+    except KeyError as e:
+        return {'ok': False, 'error': f"Bad request: missing {e}"}
+    except OSError as e:
+        return {'ok': False, 'error': f"File error: {e}"}
+    except Exception as e:
+        return {'ok': False, 'error': f"Unexpected error: {e}"}
+
+class CompileHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {'ok': False, 'error': f"Bad request: {e}"}
+            else:
+                response = compile_request(request)
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def output_path(path):
+    return os.path.splitext(path)[0] + '.ll'
+
+def collect_sources(paths):
+    """
+    展开路径列表：目录下的所有 .pyll 文件以及直接给出的文件。
+    """
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith('.pyll'):
+                    sources.append(os.path.join(path, name))
+        else:
+            sources.append(path)
+    return sources
+
+def watch(paths, interval=0.2, stop=None):
+    """
+    轮询文件的修改时间，发生变化（或首次出现）时重新编译为同名的 .ll 文件。
+    目录会在每轮重新展开，因此新增的 .pyll 文件也会被编译。
+    """
+    mtimes = {}
+    while stop is None or not stop.is_set():
+        for path in collect_sources(paths):
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                mtimes.pop(path, None)
+                continue
+            if mtimes.get(path) == mtime:
+                continue
+            mtimes[path] = mtime
+            response = compile_request({'file': path, 'output': output_path(path)})
+            if response['ok']:
+                print(f"[pyll] {path} -> {output_path(path)} ({response['time'] * 1000:.1f} ms)", flush=True)
+            else:
+                print(f"[pyll] {path}: {response['error']}", flush=True)
+        time.sleep(interval)
+
+def serve(socket_path=DEFAULT_SOCKET, paths=(), interval=0.2):
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    if paths:
+        threading.Thread(target=watch, args=(paths, interval), daemon=True).start()
+    with CompileServer(socket_path, CompileHandler) as srv:
+        print(f"[pyll] listening on {socket_path}", flush=True)
+        try:
+            srv.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
+def request(req, socket_path=DEFAULT_SOCKET):
+    """
+    向正在运行的编译服务发送一个请求并返回响应。
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        with sock.makefile('rwb') as stream:
+            stream.write(json.dumps(req).encode('utf-8') + b'\n')
+            stream.flush()
+            return json.loads(stream.readline())
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(prog='PyLL.py')
+    sub = arg_parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('serve', help='run the compile server on a Unix socket')
+    p.add_argument('--socket', default=DEFAULT_SOCKET)
+    p.add_argument('--interval', type=float, default=0.2)
+    p.add_argument('paths', nargs='*', help='.pyll files or directories to watch')
+
+    p = sub.add_parser('watch', help='recompile .pyll files when they change')
+    p.add_argument('--interval', type=float, default=0.2)
+    p.add_argument('paths', nargs='+')
+
+    p = sub.add_parser('client', help='compile a file through a running server')
+    p.add_argument('file')
+    p.add_argument('-o', '--output', default='generated.ll')
+    p.add_argument('--socket', default=DEFAULT_SOCKET)
+
+    args = arg_parser.parse_args(argv)
+    if args.command == 'serve':
+        serve(args.socket, args.paths, args.interval)
+    elif args.command == 'watch':
+        try:
+            watch(args.paths, args.interval)
+        except KeyboardInterrupt:
+            pass
+    else:
+        RED = '\033[31m'
+        RESET = '\033[0m'
+        try:
+            response = request({'file': os.path.abspath(args.file), 'output': os.path.abspath(args.output)}, args.socket)
+        except OSError as e:
+            print(f"{RED}Server error: no compile server at '{args.socket}' ({e}).{RESET}")
+            sys.exit(1)
+        if not response['ok']:
+            print(f"{RED}{response['error']}{RESET}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,30 +1,70 @@
+import sys
+
+# 同一作用域中重复定义符号，由语法分析器转换为带位置的编译错误
+class SymbolError(Exception):
+    pass
+
 class Symbol:
-    def __init__(self, name, symbol_type, attributes=None):
+    __slots__ = ('id', 'name', 'type', 'depth', 'data_type', 'length')
+
+    def __init__(self, id, name, symbol_type, depth, data_type=None, length=None):
+        self.id = id                # 整数编号，在整个符号表中唯一
         self.name = name
-        self.type = symbol_type  # 'variable', 'function', 'parameter'
-        self.attributes = attributes or {}
+        self.type = symbol_type     # 'variable', 'function', 'parameter'
+        self.depth = depth          # 定义所在作用域的嵌套深度
+        self.data_type = data_type
+        self.length = length
 
     def __repr__(self):
-        return f"Symbol(name={self.name}, type={self.type}, attributes={self.attributes})"
+        return f"Symbol(id={self.id}, name={self.name}, type={self.type}, data_type={self.data_type}, length={self.length})"
 
 class SymbolTable:
-    def __init__(self, parent=None):
-        self.symbols = {}
-        self.parent = parent
+    """
+    作用域栈式的符号表。每个名字对应一个遮蔽栈（shadow stack），栈顶就是当前可见的定义，
+    因此 lookup 是 O(1) 的，与作用域嵌套深度和程序规模无关。
+    """
+    def __init__(self):
+        self.bindings = {}      # 名字 -> 该名字的定义栈
+        self.scopes = [[]]      # 每层作用域中定义过的名字，退出作用域时据此弹出
+        self.symbols = []       # 按 id 索引的全部符号
+
+    @property
+    def depth(self):
+        return len(self.scopes) - 1
+
+    def push_scope(self):
+        self.scopes.append([])
+
+    def pop_scope(self):
+        bindings = self.bindings
+        for name in self.scopes.pop():
+            stack = bindings[name]
+            stack.pop()
+            if not stack:
+                del bindings[name]
+
+    def restore(self, depth):
+        # 弹出 depth 以内的所有作用域（错误恢复时使用）
+        while self.depth > depth:
+            self.pop_scope()
 
     def define(self, name, symbol_type, **attributes):
-        if name in self.symbols:
-            raise Exception(f"Symbol '{name}' already defined in the current scope.")
-        self.symbols[name] = Symbol(name, symbol_type, attributes)
+        name = sys.intern(name)
+        stack = self.bindings.get(name)
+        if stack and stack[-1].depth == self.depth:
+            raise SymbolError(f"Symbol '{name}' already defined in the current scope.")
+        symbol = Symbol(len(self.symbols), name, symbol_type, self.depth, **attributes)
+        self.symbols.append(symbol)
+        if stack:
+            stack.append(symbol)
+        else:
+            self.bindings[name] = [symbol]
+        self.scopes[-1].append(name)
+        return symbol
 
     def lookup(self, name):
-        symbol = self.symbols.get(name)
-        if symbol:
-            return symbol
-        elif self.parent:
-            return self.parent.lookup(name)
-        else:
-            return None
+        stack = self.bindings.get(name)
+        return stack[-1] if stack else None
 
     def __repr__(self):
-        return f"SymbolTable(symbols={self.symbols}, parent={self.parent})"
+        return f"SymbolTable(depth={self.depth}, bindings={self.bindings})"
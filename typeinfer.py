@@ -0,0 +1,240 @@
+"""
+数值类型推断：在生成代码之前扫描一段函数体，为每个数值变量选择能安全容纳其取值的最窄类型。
+类型从窄到宽依次为 i1（bool）、i32（int）、i64（大整数 / 累加器）和 double（float），
+一个变量的类型是它所有赋值的类型中最宽的那个。只有能证明不会超出 32 位的整数才使用 i32：
+两个 32 位整数的和、差、积可能超出 32 位，按 i64 计算（操作数都是字面量且结果在 32 位之内时除外），
+赋值为这样的结果的变量（以及由这样的实参调用的函数的参数）也是 i64，只有受循环条件约束的计数器例外。
+"""
+import ast
+from llvm import Bool, Int, Long, Double
+
+# 数值类型从窄到宽排列，两个类型运算的结果取较宽者
+NUMERIC_TYPES = [Bool, Int, Long, Double]
+
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+def join(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b, key=NUMERIC_TYPES.index)
+
+def constant_type(value):
+    # bool 是 int 的子类，必须先判断
+    if isinstance(value, bool):
+        return Bool
+    if isinstance(value, int):
+        return Int if INT32_MIN <= value <= INT32_MAX else Long
+    if isinstance(value, float):
+        return Double
+    return None
+
+def constant_int(node):
+    # 整数字面量（包括取负的字面量）的值，其他表达式返回 None
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        value = constant_int(node.operand)
+        return -value if value is not None else None
+    if isinstance(node, ast.Constant) and isinstance(node.value, int) and not isinstance(node.value, bool):
+        return node.value
+    return None
+
+def may_overflow(node):
+    """
+    判断整数运算 node（ast.BinOp）的结果是否可能超出 32 位：加、减、乘的两个操作数都是字面量时在编译时算出结果，
+    否则两个 32 位整数的和、差、积都可能超出 32 位。整除和取模的结果不超过被除数。
+    """
+    if not isinstance(node.op, (ast.Add, ast.Sub, ast.Mult)):
+        return False
+    left, right = constant_int(node.left), constant_int(node.right)
+    if left is None or right is None:
+        return True
+    if isinstance(node.op, ast.Add):
+        value = left + right
+    elif isinstance(node.op, ast.Sub):
+        value = left - right
+    else:
+        value = left * right
+    return not INT32_MIN <= value <= INT32_MAX
+
+def mentions(name, node):
+    return any(isinstance(child, ast.Name) and child.id == name for child in ast.walk(node))
+
+def is_update(target, value):
+    """
+    判断 value 是否由 target 自身经过加、减、乘或取负得到（x = x + 1、x = 2 * x - y 等）。
+    反复执行这样的赋值，x 的值没有上界，在循环中很快就会超出 32 位。
+    """
+    return mentions(target, value) and any(
+        isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub, ast.Mult))
+        or isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) for node in ast.walk(value))
+
+def counter_step(target, value):
+    # i = i + 1 返回 1，i = i - 1 返回 -1，其他赋值返回 None
+    if isinstance(value, ast.BinOp) and isinstance(value.op, (ast.Add, ast.Sub)) and isinstance(value.left, ast.Name) \
+            and value.left.id == target and isinstance(value.right, ast.Constant) and value.right.value == 1:
+        return 1 if isinstance(value.op, ast.Add) else -1
+    return None
+
+class NumericTypes:
+    """
+    对一段语句做流不敏感的类型推断，结果保存在 types（变量名 -> LLVM 类型）和 returns（返回值类型）中，
+    counters 是受循环条件约束、仍在 32 位中计算的计数器加减（i = i + 1 的右边）。
+    params 是参数的类型（由注解和调用处决定），其中 widenable 中的 int 参数在函数体内赋了更宽的值时也随之放宽，
+    其余的不参与推断；functions 是已经编译的用户函数的返回类型。
+    """
+    def __init__(self, body, params=None, functions=None, strings=(), widenable=()):
+        self.body = body
+        self.types = dict(params or {})
+        self.fixed = set(self.types) - set(widenable)
+        self.functions = functions or {}
+        self.strings = set(strings)     # 字符串变量，下标取出的是字符而不是 int
+        self.returns = None
+        # 变量的类型只会变宽，反复扫描直到不再变化
+        self.changed = True
+        while self.changed:
+            self.changed = False
+            self.returns = None
+            self.counters = set()
+            self.walk(body, None)
+
+    def assign(self, name, typ):
+        if name in self.fixed or typ is None:
+            return
+        wider = join(self.types.get(name), typ)
+        if wider != self.types.get(name):
+            self.types[name] = wider
+            self.changed = True
+
+    def walk(self, body, loop):
+        # loop 是最内层的循环语句，不在循环中时为 None
+        for node in body:
+            if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+                target = node.targets[0].id
+                if self.is_string(node.value):
+                    self.strings.add(target)
+                if self.is_bounded_counter(target, node.value, loop):
+                    self.counters.add(node.value)
+                    typ = Int
+                else:
+                    typ = self.expr_type(node.value)
+                    if loop is not None and typ == Int and is_update(target, node.value):
+                        typ = Long
+                self.assign(target, typ)
+            elif isinstance(node, ast.For):
+                if isinstance(node.iter, ast.Call) and isinstance(node.target, ast.Name):
+                    typ = Int
+                    for arg in node.iter.args:
+                        typ = join(typ, self.expr_type(arg))
+                    self.assign(node.target.id, typ)
+                self.walk(node.body, node)
+                self.walk(node.orelse, loop)
+            elif isinstance(node, ast.While):
+                self.walk(node.body, node)
+            elif isinstance(node, ast.If):
+                self.walk(node.body, loop)
+                self.walk(node.orelse, loop)
+            elif isinstance(node, ast.Return) and node.value is not None:
+                self.returns = join(self.returns, self.expr_type(node.value))
+
+    def is_bounded_counter(self, target, value, loop):
+        """
+        while i < n: ... i = i + 1（或 while i > n: ... i = i - 1）中的计数器：n 是 i32，
+        这是 i 在这个循环中唯一的一次赋值，且不在内层循环中，因此每次加减之前 i 都严格在 n 的这一侧，结果不会超出 32 位。
+        条件可以是包含这个比较的 and。
+        """
+        step = counter_step(target, value)
+        if step is None or not isinstance(loop, ast.While) or self.types.get(target) != Int:
+            return False
+        assignments = [node for node in ast.walk(loop) if isinstance(node, ast.Assign)
+                       and isinstance(node.targets[0], ast.Name) and node.targets[0].id == target]
+        if len(assignments) != 1:
+            return False
+        tests = loop.test.values if isinstance(loop.test, ast.BoolOp) and isinstance(loop.test.op, ast.And) else [loop.test]
+        for test in tests:
+            if not (isinstance(test, ast.Compare) and len(test.ops) == 1):
+                continue
+            left, op, right = test.left, test.ops[0], test.comparators[0]
+            if isinstance(right, ast.Name) and right.id == target:
+                # n > i 等价于 i < n
+                left, right = right, left
+                op = {ast.Lt: ast.Gt(), ast.Gt: ast.Lt(), ast.LtE: ast.GtE(), ast.GtE: ast.LtE()}.get(type(op), op)
+            if not (isinstance(left, ast.Name) and left.id == target) or self.expr_type(right) not in (Bool, Int):
+                continue
+            strict = ast.Lt if step > 0 else ast.Gt
+            inclusive = ast.LtE if step > 0 else ast.GtE
+            if isinstance(op, strict):
+                return True
+            if isinstance(op, inclusive) and isinstance(right, ast.Constant) and right.value not in (INT32_MIN, INT32_MAX):
+                return True
+        return False
+
+    def calls(self):
+        """
+        函数体中的各次函数调用：（函数名, 实参列表, 各实参的数值类型），用来决定被调函数的 int 参数是否放宽为 i64。
+        """
+        for stmt in self.body:
+            for node in ast.walk(stmt):
+                if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+                    yield node.func.id, node.args, [self.expr_type(arg) for arg in node.args]
+
+    def is_string(self, node):
+        # 字符串字面量、字符串变量，以及它们的拼接、切片和 str()、read_bytes() 的结果
+        if isinstance(node, ast.Constant):
+            return isinstance(node.value, str)
+        if isinstance(node, ast.Name):
+            return node.id in self.strings
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            return self.is_string(node.left) or self.is_string(node.right)
+        if isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Slice):
+            return self.is_string(node.value)
+        return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in ('str', 'read_bytes')
+
+    def expr_type(self, node):
+        """
+        表达式的数值类型，不是数值（字符串、列表等）时为 None。
+        """
+        if isinstance(node, ast.Constant):
+            return constant_type(node.value)
+        if isinstance(node, ast.Name):
+            return self.types.get(node.id)
+        if isinstance(node, ast.BinOp):
+            left, right = self.expr_type(node.left), self.expr_type(node.right)
+            if left is None or right is None:
+                return None
+            # bool 参与算术运算时按 int 处理
+            typ = join(join(left, right), Int)
+            if typ == Int and may_overflow(node) and node not in self.counters:
+                typ = Long
+            return typ
+        if isinstance(node, ast.UnaryOp):
+            if isinstance(node.op, ast.Not):
+                return Bool
+            return join(self.expr_type(node.operand), Int)
+        if isinstance(node, (ast.Compare, ast.BoolOp)):
+            return Bool
+        if isinstance(node, ast.Subscript):
+            if isinstance(node.slice, ast.Slice) or (isinstance(node.value, ast.Name) and node.value.id in self.strings):
+                return None
+            return Int
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            name = node.func.id
+            if name == 'float':
+                return Double
+            if name == 'int':
+                # double 的整数部分可能超出 32 位，与已经是 i64 的整数一样得到 i64
+                return Long if node.args and self.expr_type(node.args[0]) in (Long, Double) else Int
+            if name == 'len':
+                return Int
+            if name == 'sum':
+                # sum 在 i64 中累加
+                return Long
+            if name in ('min', 'max'):
+                if len(node.args) == 1:
+                    return Int
+                typ = None
+                for arg in node.args:
+                    typ = join(typ, self.expr_type(arg))
+                return typ
+            return self.functions.get(name)
+        return None